@@ -0,0 +1,401 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiohttp
+from tqdm import tqdm
+
+from crawl_journal import PAGE_DONE, PAGE_PARTIAL, PAGE_FAILED, IMAGE_DONE, IMAGE_FAILED, IMAGE_SKIPPED, CrawlJournal
+from downloader import (DEFAULT_PER_HOST, DEFAULT_CHUNK_SIZE, atomic_write, build_image_filename,
+                        record_download, timed_write)
+from html_parser import LISTING_TAGS, find_next_link, parse_html
+from http_session import DEFAULT_HEADERS, get_cache
+from image_filter import ImageRejected, get_image_filter
+from image_store import ImageStore
+from metrics import STAGE_DOWNLOAD, STAGE_FETCH, STAGE_RATE_WAIT, get_metrics
+from pipeline import DEFAULT_PREFETCH_DEPTH, PrefetchedPage
+from rate_limiter import get_rate_limiter
+from retry_policy import RETRY_IMAGE, RETRY_PAGE, RetryQueue, async_call_with_retry, get_circuit_breaker
+
+# 单线程内同时在途的连接总数
+DEFAULT_MAX_CONNECTIONS = 100
+
+
+@asynccontextmanager
+async def polite_get(session, url, **kwargs):
+    """经过按主机的自适应限速器发起 GET，并把响应状态反馈给限速器"""
+    limiter = get_rate_limiter()
+    delay = limiter.reserve(url)
+    get_metrics().observe('stage_seconds', delay, stage=STAGE_RATE_WAIT)
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+    async with session.get(url, **kwargs) as response:
+        limiter.feedback(url, response.status, response.headers.get('Retry-After'))
+        get_metrics().inc('http_requests_total', status=response.status)
+        yield response
+
+
+async def fetch_page(session, url):
+    """获取并解析列表页（带条件请求缓存），解析放到线程中避免阻塞事件循环"""
+    cache = get_cache()
+    headers = cache.validators(url) if cache is not None else {}
+
+    metrics = get_metrics()
+    content = None
+    with metrics.timer(STAGE_FETCH):
+        async with polite_get(session, url, headers=headers) as response:
+            if response.status == 304 and cache is not None:
+                content, _ = await asyncio.to_thread(cache.load, url, response.headers)
+            else:
+                response.raise_for_status()
+                content = await response.read()
+                if cache is not None:
+                    await asyncio.to_thread(cache.put, url, response.headers, content)
+
+        if content is None:
+            # 缓存被外部删除：去掉条件头重新获取完整正文
+            async with polite_get(session, url) as response:
+                response.raise_for_status()
+                content = await response.read()
+    metrics.inc('bytes_total', len(content), kind='page')
+
+    doc = await asyncio.to_thread(parse_html, content, LISTING_TAGS)
+    metrics.inc('pages_total', result='ok')
+    return doc
+
+
+async def download_image(session, img_url, filepath, referer, chunk_size=DEFAULT_CHUNK_SIZE, store=None):
+    """
+    流式下载单张图片，分块写入临时文件（写盘在线程中完成），成功后原子改名
+    传入 store 时写入内容寻址仓库，已见过的 URL 直接链接不再下载
+    :return: None 表示已保存；被图片过滤器拒绝时返回原因
+    """
+    if store is not None:
+        object_path = await asyncio.to_thread(store.lookup, img_url)
+        if object_path:
+            await asyncio.to_thread(store.link, img_url, object_path, filepath)
+            return None
+
+    image_filter = get_image_filter()
+    size = 0
+    write_time = 0.0
+    try:
+        with get_metrics().timer(STAGE_DOWNLOAD):
+            async with polite_get(session, img_url, headers={'Referer': referer}) as response:
+                response.raise_for_status()
+                image_filter.check_headers(response.headers)
+
+                with atomic_write(filepath) if store is None else store.new_object(os.path.splitext(filepath)[1]) as f:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        write_time += await asyncio.to_thread(timed_write, f, chunk)
+                        size += len(chunk)
+                        image_filter.check_size(size)
+                    image_filter.check_size(size, complete=True)
+
+            if store is not None:
+                await asyncio.to_thread(store.link, img_url, f.path, filepath)
+    except ImageRejected as e:
+        return str(e)
+
+    record_download(size, write_time)
+    return None
+
+
+async def download_jobs(session, jobs, save_dir, chunk_size=DEFAULT_CHUNK_SIZE, store=None, journal=None,
+                        retry_queue=None, progress=None, wait_for_circuit=False):
+    """
+    并发执行下载任务，jobs 为 (页码, 序号, 图片地址, Referer) 列表
+    每张图片按重试策略重试，仍失败的放入 retry_queue；被图片过滤器拒绝的记为 skipped
+    :return: (成功数量, 跳过数量, 仍失败的页码集合)
+    """
+    async def task(page_num, idx, img_url, referer):
+        filename = build_image_filename(img_url, page_num, idx)
+        filepath = os.path.join(save_dir, filename)
+        skipped = await async_call_with_retry(
+            lambda: download_image(session, img_url, filepath, referer, chunk_size=chunk_size, store=store),
+            img_url,
+            wait_for_circuit=wait_for_circuit
+        )
+        return filename, skipped
+
+    tasks = {asyncio.ensure_future(task(*job)): job for job in jobs}
+
+    success_count = 0
+    skipped_count = 0
+    failed_pages = set()
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for t in done:
+            page_num, idx, img_url, referer = tasks[t]
+            if progress is not None:
+                progress.update(1)
+            if t.exception() is None:
+                filename, skipped = t.result()
+                if skipped is not None:
+                    skipped_count += 1
+                    get_metrics().inc('images_total', result='skipped')
+                    if journal is not None:
+                        journal.record_image(page_num, img_url, None, IMAGE_SKIPPED, skipped)
+                    continue
+                success_count += 1
+                get_metrics().inc('images_total', result='ok')
+                if journal is not None:
+                    journal.record_image(page_num, img_url, filename, IMAGE_DONE)
+            else:
+                failed_pages.add(page_num)
+                get_metrics().inc('images_total', result='failed')
+                message = f"[X] Download failed [{img_url}]: {str(t.exception())}"
+                if progress is not None:
+                    progress.write(message)
+                else:
+                    print(message)
+                if journal is not None:
+                    journal.record_image(page_num, img_url, None, IMAGE_FAILED, str(t.exception()))
+                if retry_queue is not None:
+                    retry_queue.add_image(page_num, img_url, idx, referer, t.exception())
+
+    if store is not None:
+        await asyncio.to_thread(store.save)
+
+    return success_count, skipped_count, failed_pages
+
+
+async def scrape_images(session, url, page_num, total_pages, save_dir='images',
+                        chunk_size=DEFAULT_CHUNK_SIZE, store=None, journal=None, page=None, retry_queue=None):
+    """从指定URL抓取所有图片（协程版，page 为预取好的 PrefetchedPage 时不再重复请求列表页）"""
+    print(f"\n{'='*60}")
+    print(f"[*] Harvesting page {page_num}/{total_pages}...")
+    print(f"[+] URL: {url}")
+    print(f"{'='*60}")
+
+    try:
+        if page is not None:
+            doc = page.document()
+        else:
+            doc = await async_call_with_retry(lambda: fetch_page(session, url), url)
+    except Exception as e:
+        print(f"[X] Failed to access webpage: {str(e)}")
+        if journal is not None:
+            journal.record_page(page_num, url, PAGE_FAILED)
+        return None, 0
+
+    # 挑选每张图片分辨率最高的地址（srcset / <picture>），并按过滤规则先筛掉缩略图、站点装饰图
+    img_urls, filtered = get_image_filter().select_urls(doc.images(), url)
+    if filtered:
+        print(f"[-] Skipped {filtered} image(s) by filter rules")
+
+    if not img_urls:
+        print("[!] No images found")
+        if journal is not None:
+            journal.record_page(page_num, url, PAGE_DONE)
+        return doc, 0
+
+    print(f"[+] Found {len(img_urls)} images")
+    os.makedirs(save_dir, exist_ok=True)
+
+    # 断点续爬：日志中已完成或已被过滤的图片不再发起网络请求
+    done_urls = journal.done_images(page_num) if journal is not None else {}
+    jobs = [
+        (page_num, idx, img_url, url)
+        for idx, img_url in enumerate(img_urls, 1) if img_url not in done_urls
+    ]
+
+    success_count = sum(1 for status in done_urls.values() if status == IMAGE_DONE)
+    with tqdm(total=len(img_urls), initial=len(img_urls) - len(jobs), desc=f"[>>] Page {page_num} Download",
+              ncols=80) as progress:
+        downloaded, skipped, failed_pages = await download_jobs(
+            session, jobs, save_dir, chunk_size, store, journal, retry_queue, progress
+        )
+        success_count += downloaded
+
+    if journal is not None:
+        journal.record_page(page_num, url, PAGE_DONE if page_num not in failed_pages else PAGE_PARTIAL)
+
+    print(f"[OK] Page {page_num} completed! Downloaded {success_count}/{len(img_urls)} images"
+          f"{f', {skipped} skipped by filter rules' if skipped else ''}")
+    return doc, success_count
+
+
+async def walk_pages(session, start_url, total_pages, journal=None, start_page=1):
+    """沿下一页链接逐页产出 PrefetchedPage，直到页数用完、找不到下一页或抓取失败（列表页按重试策略重试）"""
+    url = start_url
+
+    for page_num in range(start_page, total_pages + 1):
+        # 断点续爬：已完成的页面直接沿用记录的下一页链接，不发起网络请求
+        if journal is not None:
+            skip, next_url = journal.can_skip_page(page_num, total_pages)
+            if skip:
+                yield PrefetchedPage(page_num, url, next_url=next_url, skipped=True)
+                if not next_url:
+                    return
+                url = next_url
+                continue
+
+        try:
+            doc = await async_call_with_retry(lambda: fetch_page(session, url), url)
+        except Exception as e:
+            yield PrefetchedPage(page_num, url, error=e)
+            return
+
+        next_url = None
+        if page_num < total_pages:
+            next_url = find_next_link(doc, url)
+            if next_url and journal is not None:
+                journal.record_next_url(page_num, url, next_url)
+
+        yield PrefetchedPage(page_num, url, doc=doc, next_url=next_url)
+
+        if not next_url:
+            return
+        url = next_url
+
+
+async def prefetch_pages(pages, depth):
+    """流水线翻页：后台任务提前获取最多 depth 个列表页，depth 为 0 时按需串行获取"""
+    if not depth:
+        async for page in pages:
+            yield page
+        return
+
+    page_queue = asyncio.Queue(maxsize=depth)
+
+    async def produce():
+        cancelled = False
+        try:
+            async for page in pages:
+                await page_queue.put(page)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # 被取消说明消费者已经退出：不再放结束标记（队列满时 put 会一直等待，取消也随之丢失）
+            if not cancelled:
+                await page_queue.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            page = await page_queue.get()
+            if page is None:
+                return
+            yield page
+    finally:
+        producer.cancel()
+
+
+async def crawl_pages(session, url, total_pages, save_dir, chunk_size, store, journal, prefetch,
+                      retry_queue, start_page=1):
+    """从 start_page 开始沿下一页链接抓取，失败的列表页与图片放入重试队列，返回成功下载的图片数"""
+    total_images = 0
+
+    pages = prefetch_pages(walk_pages(session, url, total_pages, journal, start_page), prefetch)
+    try:
+        async for page in pages:
+            if page.skipped:
+                print(f"[=] Page {page.page_num} already completed, skipping (resume)")
+                continue
+
+            doc, success_count = await scrape_images(
+                session, page.url, page.page_num, total_pages, save_dir, chunk_size, store, journal, page,
+                retry_queue
+            )
+            total_images += success_count
+
+            if doc is None:
+                # 列表页重试用尽：拿不到下一页链接，留到整轮结束后从这一页继续
+                retry_queue.add_page(page.page_num, page.url)
+                print(f"\n[!] Page {page.page_num} scraping failed, queued for retry at the end of the run")
+                break
+
+            if page.page_num < total_pages:
+                if not page.next_url:
+                    print(f"[!] No next page link found, stopped after {page.page_num} pages")
+                    break
+                print(f"[+] Found next page: {page.next_url}")
+    finally:
+        await pages.aclose()
+
+    return total_images
+
+
+async def retry_failed(session, retry_queue, total_pages, save_dir, chunk_size, store, journal, prefetch):
+    """收尾重试：失败的列表页等主机冷却后从该页继续翻页，失败的图片再下载一次，返回补齐的图片数"""
+    if not len(retry_queue):
+        return 0
+
+    print(f"\n[*] Retrying {len(retry_queue)} failed item(s) from this run...")
+    leftover = RetryQueue()
+    total_images = 0
+
+    for item in retry_queue.take(RETRY_PAGE):
+        await asyncio.sleep(get_circuit_breaker().remaining(item.url))
+        total_images += await crawl_pages(
+            session, item.url, total_pages, save_dir, chunk_size, store, journal, prefetch, leftover,
+            start_page=item.page_num
+        )
+
+    items = retry_queue.take(RETRY_IMAGE)
+    jobs = [(item.page_num, item.idx, item.url, item.referer) for item in items]
+    recovered, _, failed_pages = await download_jobs(
+        session, jobs, save_dir, chunk_size, store, journal, leftover, wait_for_circuit=True
+    )
+    total_images += recovered
+
+    # 失败图片全部补齐的页面标记为完成
+    for page_num, page_url in {item.page_num: item.referer for item in items}.items():
+        if page_num not in failed_pages:
+            journal.record_page(page_num, page_url, PAGE_DONE)
+
+    print(f"[+] Recovered {total_images} image(s) on retry")
+    if len(leftover):
+        print(f"[!] {len(leftover)} item(s) still failing, run again with --resume to pick them up")
+    return total_images
+
+
+async def crawl(url, total_pages, save_dir='images',
+                max_connections=DEFAULT_MAX_CONNECTIONS, per_host=DEFAULT_PER_HOST,
+                chunk_size=DEFAULT_CHUNK_SIZE, dedup=True, resume=False,
+                prefetch=DEFAULT_PREFETCH_DEPTH, trace_configs=None):
+    """
+    自动翻页抓取（列表页流水线预取），整轮结束后重试失败项，返回成功下载的图片总数
+    :param trace_configs: aiohttp.TraceConfig 列表，用于统计请求耗时（基准测试使用）
+    """
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=per_host)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=10)
+
+    # 内容寻址仓库：跨页去重，已见过的 URL 不再下载
+    store = ImageStore(save_dir) if dedup else None
+
+    # 断点续爬日志：记录页面、下一页链接与每张图片的状态
+    journal = CrawlJournal(save_dir, url, resume)
+
+    # 重试用尽的页面与图片不阻塞翻页，整轮结束后统一再试
+    retry_queue = RetryQueue()
+
+    try:
+        async with aiohttp.ClientSession(headers=DEFAULT_HEADERS, connector=connector, timeout=timeout,
+                                         trace_configs=trace_configs) as session:
+            total_images = await crawl_pages(
+                session, url, total_pages, save_dir, chunk_size, store, journal, prefetch, retry_queue
+            )
+            total_images += await retry_failed(
+                session, retry_queue, total_pages, save_dir, chunk_size, store, journal, prefetch
+            )
+    finally:
+        # 出错或 Ctrl+C 时同样关闭日志：已完成的页面与图片都已落盘，可断点续爬
+        journal.close()
+
+    return total_images
+
+
+def run(url, total_pages, save_dir='images',
+        max_connections=DEFAULT_MAX_CONNECTIONS, per_host=DEFAULT_PER_HOST,
+        chunk_size=DEFAULT_CHUNK_SIZE, dedup=True, resume=False, prefetch=DEFAULT_PREFETCH_DEPTH,
+        trace_configs=None):
+    """同步入口，供 CLI 调用"""
+    return asyncio.run(
+        crawl(url, total_pages, save_dir, max_connections, per_host, chunk_size, dedup, resume, prefetch,
+              trace_configs)
+    )
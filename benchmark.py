@@ -0,0 +1,597 @@
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# 可运行的场景：两种图片引擎 + 三个情报提取任务
+GALLERY_SCENARIOS = ('threads', 'async')
+EXTRACTOR_SCENARIOS = ('arxiv', 'douban', 'steam')
+SCENARIOS = GALLERY_SCENARIOS + EXTRACTOR_SCENARIOS
+
+# 基准测试默认关闭限速（按主机每秒 1000 次），测的是引擎本身；传 --rate 2 可把限速器算进去
+BENCH_RATE = 1000.0
+
+# 与基线对比时，吞吐量下降 / 延迟与内存上升超过该比例视为回归
+DEFAULT_TOLERANCE = 0.10
+
+# 对比基线时检查的指标：(指标名, 越大越好)
+COMPARED_METRICS = (
+    ('pages_per_s', True),
+    ('items_per_s', True),
+    ('mb_per_s', True),
+    ('p50_ms', False),
+    ('p99_ms', False),
+    ('peak_rss_mb', False),
+    ('startup_ms', False),
+)
+
+# 启动时间基准：每条命令在全新解释器中运行，测从进程启动到菜单 / 帮助信息出现前的开销
+# 导入 img_scraper 只加载模块，不会打开窗口
+STARTUP_COMMANDS = (
+    ('import data_center', ['-c', 'import data_center']),
+    ('import img_scraper_cli', ['-c', 'import img_scraper_cli']),
+    ('import img_scraper', ['-c', 'import img_scraper']),
+    ('data_center --help', ['data_center.py', '--help']),
+    ('img_scraper_cli --help', ['img_scraper_cli.py', '--help']),
+)
+
+# 启动时间波动大，至少运行这么多次取中位数（另有一次不计入的预热，用来生成 .pyc）
+STARTUP_RUNS = 5
+
+
+class SiteConfig:
+    """合成站点的规模与故障注入参数"""
+
+    def __init__(self, pages=20, images=20, image_size=64 * 1024, latency=0.0,
+                 error_rate=0.0, throttle_rate=0.0, seed=0, papers=500, steam_items=1000):
+        self.pages = pages
+        self.images = images
+        self.image_size = image_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.seed = seed
+        self.papers = papers
+        self.steam_items = steam_items
+
+
+def gallery_page(config, page_num):
+    """图库列表页：images 张图片 + 指向下一页的链接"""
+    imgs = ''.join(f'<img src="/img/{page_num}/{idx}.jpg" alt="{idx}">' for idx in range(config.images))
+    next_link = f'<a href="/gallery/{page_num + 1}" class="next">下一页</a>' if page_num < config.pages else ''
+    return f'<html><body><div class="gallery">{imgs}</div>{next_link}</body></html>'
+
+
+def arxiv_listing(config, category, skip, show):
+    """arXiv 分类列表页：按时间倒序的 <dt>/<dd> 论文条目"""
+    prefix = zlib.crc32(category.encode()) % 9000 + 1000
+    ids = [f"{prefix}.{number:05d}" for number in range(config.papers, 0, -1)][skip:skip + show]
+    abstract = 'Synthetic abstract sentence for the benchmark listing. ' * 20
+    items = ''.join(
+        f'<dt><a name="item{skip + k}">[{skip + k + 1}]</a> '
+        f'<a href="/abs/{arxiv_id}v1" title="Abstract" id="{arxiv_id}">arXiv:{arxiv_id}</a></dt>'
+        f'<dd><div class="meta"><div class="list-title mathjax"><span class="descriptor">Title:</span> '
+        f'Paper {arxiv_id}</div><div class="list-authors"><a>Author</a></div>'
+        f'<p class="mathjax">{abstract}</p></div></dd>'
+        for k, arxiv_id in enumerate(ids)
+    )
+    return f'<html><body><h3>{category}</h3><dl id="articles">{items}</dl></body></html>'
+
+
+def douban_page(start):
+    """豆瓣 Top250 列表页：每页 25 本"""
+    rows = ''.join(
+        f'<tr class="item"><td width="100"><a class="nbg" href="#"><img src="/cover/{start + i}.jpg"></a></td>'
+        f'<td valign="top"><div class="pl2"><a href="/subject/{start + i}/" title="书名 {start + i + 1}">'
+        f'书名 {start + i + 1}</a></div><p class="pl">作者 {start + i + 1} / 出版社 / 2000-1</p>'
+        f'<div class="star clearfix"><span class="allstar45"></span><span class="rating_nums">9.{i % 10}</span>'
+        f'<span class="pl">(12345人评价)</span></div></td></tr>'
+        for i in range(25) if start + i < 250
+    )
+    return f'<html><head><meta charset="utf-8"></head><body><table>{rows}</table></body></html>'
+
+
+def steam_results(config, start, count):
+    """Steam 特惠搜索接口：JSON 包裹的结果行"""
+    rows = []
+    for app_id in range(start + 1, min(start + count, config.steam_items) + 1):
+        original = 1000 + app_id * 10
+        discount = 50 if app_id % 3 else 25
+        final = original * (100 - discount) // 100
+        rows.append(
+            f'<a href="/app/{app_id}/" data-ds-appid="{app_id}" data-ds-itemkey="App_{app_id}" '
+            f'class="search_result_row ds_collapse_flag"><div class="col search_name ellipsis">'
+            f'<span class="title">Game {app_id}</span></div>'
+            f'<div class="discount_block search_discount_block" data-price-final="{final}" data-discount="{discount}">'
+            f'<div class="discount_pct">-{discount}%</div><div class="discount_prices">'
+            f'<div class="discount_original_price">¥ {original / 100:,.2f}</div>'
+            f'<div class="discount_final_price">¥ {final / 100:,.2f}</div></div></div></a>'
+        )
+    return json.dumps({'success': 1, 'results_html': ''.join(rows), 'total_count': config.steam_items, 'start': start})
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端关闭 keep-alive 连接属于正常情况，不打印堆栈
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+
+class BenchServer:
+    """
+    本地替身站点：合成图库、arXiv / 豆瓣 / Steam 形状的页面，
+    可注入固定延迟、5xx 与 429；/_stats 返回累计请求数与发送字节数
+    """
+
+    def __init__(self, config, host='127.0.0.1', port=0):
+        self.config = config
+        self._lock = threading.Lock()
+        self._random = random.Random(config.seed)
+        self._image = os.urandom(config.image_size)
+        self.requests = 0
+        self.bytes_sent = 0
+        self.statuses = {}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.handle(self)
+
+        self.httpd = _QuietServer((host, port), Handler)
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'bytes': self.bytes_sent, 'statuses': dict(self.statuses)}
+
+    def _send(self, handler, status, body, content_type='text/html; charset=utf-8', headers=None):
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += len(body)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def handle(self, handler):
+        url = urlparse(handler.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip('/').split('/')
+
+        if url.path == '/_stats':
+            body = json.dumps(self.stats()).encode()
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'application/json')
+            handler.send_header('Content-Length', str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+            return
+
+        config = self.config
+        if config.latency:
+            time.sleep(config.latency)
+
+        with self._lock:
+            roll = self._random.random()
+        if roll < config.error_rate:
+            self._send(handler, 500, b'injected error')
+            return
+        if roll < config.error_rate + config.throttle_rate:
+            self._send(handler, 429, b'injected throttle', headers={'Retry-After': '0'})
+            return
+
+        try:
+            if parts[0] == 'gallery':
+                page_num = int(parts[1])
+                if not 1 <= page_num <= config.pages:
+                    raise LookupError
+                self._send(handler, 200, gallery_page(config, page_num).encode())
+            elif parts[0] == 'img':
+                # 前 16 字节带上图片编号，每张图片内容不同
+                tag = f"{parts[1]}/{parts[2]}".encode().ljust(16, b'\0')[:16]
+                self._send(handler, 200, tag + self._image[16:], 'image/jpeg')
+            elif parts[0] == 'arxiv':
+                skip, show = int(query['skip'][0]), int(query['show'][0])
+                self._send(handler, 200, arxiv_listing(config, parts[2], skip, show).encode())
+            elif parts[0] == 'douban':
+                self._send(handler, 200, douban_page(int(query.get('start', ['0'])[0])).encode())
+            elif parts[0] == 'steam':
+                start, count = int(query['start'][0]), int(query['count'][0])
+                self._send(handler, 200, steam_results(config, start, count).encode(), 'application/json')
+            else:
+                raise LookupError
+        except (LookupError, ValueError):
+            self._send(handler, 404, b'not found')
+
+
+def percentile(values, fraction):
+    """最近秩百分位数，values 为空时返回 None"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))]
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB），平台不支持时返回 None"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+
+
+def server_stats(server_url):
+    import requests
+
+    return requests.get(f"{server_url}/_stats", timeout=10, proxies={'http': None, 'https': None}).json()
+
+
+def record_thread_latency(latencies):
+    """在共享会话上挂响应钩子，记录每个请求从发出到收到响应头的耗时"""
+    from http_session import get_session
+
+    get_session().hooks['response'].append(
+        lambda response, *args, **kwargs: latencies.append(response.elapsed.total_seconds())
+    )
+
+
+def async_trace_config(latencies):
+    """aiohttp 的 TraceConfig：记录每个请求从发出到收到响应头的耗时"""
+    import asyncio
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.start = asyncio.get_running_loop().time()
+
+    async def on_request_end(session, context, params):
+        latencies.append(asyncio.get_running_loop().time() - context.start)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+def run_gallery(args, work_dir, latencies):
+    """驱动图片引擎抓取合成图库，返回 (列表页数, 下载图片数)"""
+    url = f"{args.server}/gallery/1"
+    save_dir = os.path.join(work_dir, 'images')
+
+    if args.scenario == 'async':
+        import async_engine
+
+        images = async_engine.run(
+            url, args.pages, save_dir, max_connections=args.connections, per_host=args.per_host,
+            prefetch=args.prefetch, trace_configs=[async_trace_config(latencies)]
+        )
+    else:
+        from crawler import crawl
+
+        record_thread_latency(latencies)
+        images = crawl(url, args.pages, save_dir, args.workers, args.per_host, prefetch=args.prefetch)
+    return args.pages, images
+
+
+def run_extractor(args, work_dir, latencies):
+    """把情报任务指向替身站点并运行，返回 (列表页请求数, 提取记录数)"""
+    import data_center
+    from http_session import DIRECT_PROXIES
+    from sinks import configure_sinks
+
+    data_center.CLASH_PROXIES = DIRECT_PROXIES
+    data_center.ARXIV_LIST_URL = f"{args.server}/arxiv/list/{{category}}/recent?skip={{skip}}&show={{show}}"
+    data_center.DOUBAN_TOP250_URL = f"{args.server}/douban/top250"
+    data_center.STEAM_SEARCH_URL = f"{args.server}/steam/search/results/?start={{start}}&count={{count}}"
+    configure_sinks(formats=[args.format], output_dir=work_dir)
+    record_thread_latency(latencies)
+
+    if args.scenario == 'arxiv':
+        max_pages = -(-args.papers // data_center.ARXIV_PAGE_SIZE) + 1
+        items = data_center.academic_radar(max_pages=max_pages)
+    elif args.scenario == 'douban':
+        items = data_center.knowledge_harvest()
+    else:
+        items = data_center.entertainment_monitor()
+    return len(latencies), items
+
+
+def run_scenario(args):
+    """在当前进程中运行一个场景（由父进程以子进程方式调用，峰值内存互不干扰），返回指标字典"""
+    from http_session import configure_cache
+    from rate_limiter import configure_rate_limit
+
+    # 替身站点在本机：绕过系统代理，关闭页面缓存，限速按 --rate
+    os.environ['NO_PROXY'] = os.environ['no_proxy'] = '127.0.0.1,localhost'
+    configure_cache(enabled=False)
+    configure_rate_limit(rate=args.rate, max_rate=args.rate)
+
+    work_dir = tempfile.mkdtemp(prefix=f'bench_{args.scenario}_')
+    latencies = []
+    try:
+        before = server_stats(args.server)
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            if args.scenario in GALLERY_SCENARIOS:
+                pages, items = run_gallery(args, work_dir, latencies)
+            else:
+                pages, items = run_extractor(args, work_dir, latencies)
+        elapsed = time.perf_counter() - start
+        after = server_stats(args.server)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    megabytes = (after['bytes'] - before['bytes']) / (1024 * 1024)
+    p50, p99 = percentile(latencies, 0.50), percentile(latencies, 0.99)
+    rss = peak_rss_mb()
+    return {
+        'scenario': args.scenario,
+        'elapsed_s': round(elapsed, 3),
+        'requests': after['requests'] - before['requests'],
+        'pages': pages,
+        'items': items,
+        'megabytes': round(megabytes, 3),
+        'pages_per_s': round(pages / elapsed, 2),
+        'items_per_s': round(items / elapsed, 2),
+        'mb_per_s': round(megabytes / elapsed, 2),
+        'p50_ms': round(p50 * 1000, 2) if p50 is not None else None,
+        'p99_ms': round(p99 * 1000, 2) if p99 is not None else None,
+        'peak_rss_mb': round(rss, 1) if rss is not None else None,
+    }
+
+
+def spawn_scenario(args, scenario, server_url):
+    """在子进程中运行一个场景，返回指标字典；失败时返回带 error 的字典"""
+    command = [
+        sys.executable, os.path.abspath(__file__), '--child', scenario, '--server', server_url,
+        '--pages', str(args.pages), '--papers', str(args.papers),
+        '--workers', str(args.workers), '--per-host', str(args.per_host),
+        '--connections', str(args.connections), '--prefetch', str(args.prefetch),
+        '--rate', str(args.rate), '--format', args.format,
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        error = (result.stderr.strip().splitlines() or [f"exit code {result.returncode}"])[-1]
+        return {'scenario': scenario, 'error': error}
+    return json.loads(lines[-1])
+
+
+def run_startup(repeat):
+    """逐条运行 STARTUP_COMMANDS，返回 [{'scenario', 'startup_ms', 'min_ms'}]；命令失败时返回带 error 的字典"""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    runs = max(repeat, STARTUP_RUNS)
+    results = []
+    for name, arguments in STARTUP_COMMANDS:
+        command = [sys.executable] + arguments
+        timings = []
+        error = None
+        for run in range(runs + 1):
+            start = time.perf_counter()
+            result = subprocess.run(command, capture_output=True, text=True, cwd=cwd)
+            elapsed = time.perf_counter() - start
+            if result.returncode != 0:
+                error = (result.stderr.strip().splitlines() or [f"exit code {result.returncode}"])[-1]
+                break
+            if run:
+                timings.append(elapsed)
+        if error is not None:
+            results.append({'scenario': f'startup: {name}', 'error': error})
+            continue
+        results.append({
+            'scenario': f'startup: {name}',
+            'startup_ms': round(percentile(timings, 0.50) * 1000, 1),
+            'min_ms': round(min(timings) * 1000, 1),
+        })
+    return results
+
+
+def _fmt(value):
+    return '-' if value is None else f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def print_results(results, columns=('scenario', 'elapsed_s', 'requests', 'pages_per_s', 'items_per_s',
+                                    'mb_per_s', 'p50_ms', 'p99_ms', 'peak_rss_mb')):
+    rows = [columns] + [
+        (result['scenario'],) + (('error: ' + result['error'],) if 'error' in result
+                                 else tuple(_fmt(result.get(name)) for name in columns[1:]))
+        for result in results
+    ]
+    widths = [max(len(row[i]) for row in rows if len(row) == len(columns)) for i in range(len(columns))]
+
+    print(f"\n{'='*60}")
+    for row in rows:
+        if len(row) == 2:
+            print(f"  {row[0].ljust(widths[0])}  {row[1]}")
+        else:
+            print('  ' + '  '.join(cell.rjust(width) if i else cell.ljust(width)
+                                   for i, (cell, width) in enumerate(zip(row, widths))))
+    print(f"{'='*60}")
+
+
+def compare(results, baseline, tolerance):
+    """与基线结果对比，返回回归描述列表"""
+    baseline = {entry['scenario']: entry for entry in baseline.get('results', []) if 'error' not in entry}
+    regressions = []
+    for result in results:
+        old = baseline.get(result['scenario'])
+        if 'error' in result or old is None:
+            continue
+        for name, higher_is_better in COMPARED_METRICS:
+            new_value, old_value = result.get(name), old.get(name)
+            if not new_value or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{result['scenario']}.{name}: {old_value:g} -> {new_value:g} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='benchmark.py',
+        description='Throughput benchmark against a local stand-in server (no real sites are contacted)',
+        epilog='Example: python benchmark.py --scenarios threads,async --latency 20 --error-rate 0.02'
+    )
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated scenarios to run (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--pages', type=int, default=20, help='gallery pages (default: 20)')
+    parser.add_argument('--images', type=int, default=20, help='images per gallery page (default: 20)')
+    parser.add_argument('--image-size', type=int, default=64 * 1024,
+                        help='bytes per synthetic image (default: 65536)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='server-side delay per response in milliseconds (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of responses answered with 500 (default: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='fraction of responses answered with 429 (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for fault injection (default: 0)')
+    parser.add_argument('--papers', type=int, default=500, help='synthetic papers per arXiv category (default: 500)')
+    parser.add_argument('--steam-items', type=int, default=1000, help='synthetic Steam specials (default: 1000)')
+    parser.add_argument('--workers', type=int, default=8, help='thread engine download workers (default: 8)')
+    parser.add_argument('--per-host', type=int, default=8, help='max concurrent downloads per host (default: 8)')
+    parser.add_argument('--connections', type=int, default=100, help='async engine connections (default: 100)')
+    parser.add_argument('--prefetch', type=int, default=2, help='listing pages fetched ahead (default: 2)')
+    parser.add_argument('--rate', type=float, default=BENCH_RATE,
+                        help=f'per-host request rate; pass 2 to include the scraper default limiter '
+                             f'(default: {BENCH_RATE:g}, effectively unthrottled)')
+    parser.add_argument('--format', default='excel', help='output format for the extractor tasks (default: excel)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='runs per scenario, the run with the median elapsed time is reported (default: 1)')
+    parser.add_argument('--startup', action='store_true',
+                        help=f'measure cold start of the entry points instead of throughput '
+                             f'(fresh interpreter per run, median of at least {STARTUP_RUNS} runs)')
+    parser.add_argument('--json', metavar='PATH', help='write the results to a JSON file')
+    parser.add_argument('--compare', metavar='PATH', help='baseline JSON file written by --json')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'relative change counted as a regression (default: {DEFAULT_TOLERANCE:g})')
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument('--server', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        args.scenario = args.child
+        print(json.dumps(run_scenario(args)))
+        return 0
+
+    if args.repeat <= 0:
+        parser.error("--repeat must be greater than 0")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.startup:
+        print(f"[*] Timing startup of {len(STARTUP_COMMANDS)} command(s)...")
+        results = run_startup(args.repeat)
+        print_results(results, columns=('scenario', 'startup_ms', 'min_ms'))
+        return report(args, results, {'startup_runs': max(args.repeat, STARTUP_RUNS)}, baseline)
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown or not scenarios:
+        parser.error(f"unknown scenario(s): {', '.join(unknown) or '(none)'}, choose from {', '.join(SCENARIOS)}")
+    if min(args.pages, args.images, args.image_size, args.papers, args.steam_items,
+           args.workers, args.per_host, args.connections, args.repeat) <= 0 or args.rate <= 0:
+        parser.error("sizes, worker counts, --rate and --repeat must be greater than 0")
+    if args.papers > 99999:
+        parser.error("--papers cannot exceed 99999")
+    if args.image_size < 16:
+        parser.error("--image-size must be at least 16 bytes")
+    if not (0 <= args.error_rate and 0 <= args.throttle_rate and args.error_rate + args.throttle_rate < 1):
+        parser.error("--error-rate and --throttle-rate must be >= 0 and sum to less than 1")
+
+    config = SiteConfig(
+        pages=args.pages, images=args.images, image_size=args.image_size, latency=args.latency / 1000,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, seed=args.seed,
+        papers=args.papers, steam_items=args.steam_items
+    )
+    server = BenchServer(config).start()
+    print(f"[*] Stand-in server on {server.url}")
+
+    results = []
+    try:
+        for scenario in scenarios:
+            runs = []
+            for run in range(args.repeat):
+                print(f"[*] Running {scenario} ({run + 1}/{args.repeat})...")
+                runs.append(spawn_scenario(args, scenario, server.url))
+            ok = sorted((result for result in runs if 'error' not in result), key=lambda result: result['elapsed_s'])
+            results.append(ok[len(ok) // 2] if ok else runs[-1])
+    finally:
+        server.stop()
+
+    print_results(results)
+    return report(args, results, vars(config), baseline)
+
+
+def report(args, results, config, baseline):
+    """写出 JSON、列出失败项并与基线对比，返回进程退出码"""
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+        print(f"[+] Results written to {args.json}")
+
+    failed = [result['scenario'] for result in results if 'error' in result]
+    if failed:
+        print(f"[X] Failed scenario(s): {', '.join(failed)}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"[X] {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"    {line}")
+            return 1
+        print(f"[OK] No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import os
+import time
+import sqlite3
+import threading
+
+# 抓取日志文件（放在保存目录下，以点开头隐藏）
+JOURNAL_FILE = '.crawl_journal.db'
+
+# 页面状态：pending 已找到下一页但图片未完成 / done 全部图片成功 / partial 有图片失败 / failed 页面本身抓取失败
+PAGE_PENDING = 'pending'
+PAGE_DONE = 'done'
+PAGE_PARTIAL = 'partial'
+PAGE_FAILED = 'failed'
+
+IMAGE_DONE = 'done'
+IMAGE_FAILED = 'failed'
+IMAGE_SKIPPED = 'skipped'
+
+
+class CrawlJournal:
+    """
+    SQLite 断点续爬日志
+    以起始 URL 区分每次挂机任务，记录已访问的页面、找到的下一页链接以及每张图片的状态；
+    续爬时已完成的页面和图片直接跳过，不发起任何网络请求
+    """
+
+    def __init__(self, save_dir, start_url, resume=False):
+        os.makedirs(save_dir, exist_ok=True)
+        self.start_url = start_url
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(save_dir, JOURNAL_FILE), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS pages (
+                start_url TEXT NOT NULL,
+                page_num INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                next_url TEXT,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (start_url, page_num)
+            );
+            CREATE TABLE IF NOT EXISTS images (
+                start_url TEXT NOT NULL,
+                page_num INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                filename TEXT,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (start_url, page_num, url)
+            );
+        ''')
+
+        # 非续爬模式：清空该任务的旧记录，从头开始
+        if not resume:
+            with self._conn:
+                self._conn.execute('DELETE FROM pages WHERE start_url = ?', (start_url,))
+                self._conn.execute('DELETE FROM images WHERE start_url = ?', (start_url,))
+
+    def get_page(self, page_num):
+        """返回该页的记录字典（url、next_url、status），未记录时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT url, next_url, status FROM pages WHERE start_url = ? AND page_num = ?',
+                (self.start_url, page_num)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'url': row[0], 'next_url': row[1], 'status': row[2]}
+
+    def can_skip_page(self, page_num, total_pages):
+        """
+        判断该页能否跳过：页面已完成，且要么是最后一页、要么已记录下一页链接
+        :return: (是否跳过, 下一页链接)
+        """
+        page = self.get_page(page_num)
+        if page is None or page['status'] != PAGE_DONE:
+            return False, None
+        if page_num < total_pages and not page['next_url']:
+            return False, None
+        return True, page['next_url']
+
+    def record_page(self, page_num, url, status):
+        """记录页面状态（保留已记录的下一页链接）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                '''INSERT INTO pages VALUES (?, ?, ?, NULL, ?, ?)
+                   ON CONFLICT (start_url, page_num) DO UPDATE SET
+                       url = excluded.url, status = excluded.status, updated_at = excluded.updated_at''',
+                (self.start_url, page_num, url, status, time.time())
+            )
+
+    def record_next_url(self, page_num, url, next_url):
+        """记录该页找到的下一页链接（流水线模式下可能早于页面状态写入）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                '''INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (start_url, page_num) DO UPDATE SET
+                       next_url = excluded.next_url, updated_at = excluded.updated_at''',
+                (self.start_url, page_num, url, next_url, PAGE_PENDING, time.time())
+            )
+
+    def done_images(self, page_num):
+        """返回该页已处理完的图片 {URL: 状态}：已成功下载（done）或被过滤器跳过（skipped）"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT url, status FROM images WHERE start_url = ? AND page_num = ? AND status IN (?, ?)',
+                (self.start_url, page_num, IMAGE_DONE, IMAGE_SKIPPED)
+            ).fetchall()
+        return dict(rows)
+
+    def record_image(self, page_num, url, filename, status, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (self.start_url, page_num, url, filename, status, error, time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
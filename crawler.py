@@ -0,0 +1,390 @@
+import os
+import requests
+from functools import partial
+from contextlib import nullcontext
+
+from downloader import DEFAULT_WORKERS, DEFAULT_PER_HOST, DEFAULT_CHUNK_SIZE, download_images, retry_failed_images
+from crawl_journal import PAGE_DONE, PAGE_PARTIAL, PAGE_FAILED, CrawlJournal
+from image_store import ImageStore
+from pipeline import DEFAULT_PREFETCH_DEPTH, PagePrefetcher, fetch_document
+from detail_pages import DEFAULT_DETAIL_QUEUE, DetailStage, detail_selectors
+from html_parser import find_next_link
+from image_filter import get_image_filter
+from retry_policy import RETRY_DETAIL, RETRY_PAGE, RetryQueue, get_circuit_breaker
+
+# 线程池引擎的抓取流程由命令行与 GUI 共用，两边只是日志文字不同：
+# 键为消息名，值为 str.format 模板
+CLI_MESSAGES = {
+    'no_detail_links': "[!] No detail page links found",
+    'detail_queued': "[+] Found {count} detail pages, queued for full-size download",
+    'filtered': "[-] Skipped {count} image(s) by filter rules",
+    'download_failed': "[X] Download failed [{url}]: {error}",
+    'download_progress': "[>>] Page {page_num} download progress: {done}/{total} - {filename}",
+    'page_done': "[OK] Page {page_num} completed! Downloaded {success}/{total} images",
+    'page_done_skipped': ", {count} skipped by filter rules",
+    'fetch_failed': "[X] Failed to access webpage: {error}",
+    'error': "[X] Error occurred: {error}",
+    'page_resumed': "[=] Page {page_num} already completed, skipping (resume)",
+    'page_queued': "\n[!] Page {page_num} scraping failed, queued for retry at the end of the run",
+    'next_page': "[+] Found next page: {url}",
+    'no_next_page': "[!] No next page link found, stopped after {page_num} pages",
+    'retry_start': "\n[*] Retrying {count} failed item(s) from this run...",
+    'retry_failed': "[X] Retry failed [{url}]: {error}",
+    'recovered': "[+] Recovered {count} image(s) on retry",
+    'still_failing': "[!] {count} item(s) still failing, run again with --resume to pick them up",
+    'detail_start': "[*] Following detail pages ({links}) for full-size images ({image})",
+    'detail_failed': "[X] Detail page failed [{url}]: {error}",
+    'detail_page_done': "[OK] Page {page_num} completed! Downloaded {downloaded}/{total} full-size images",
+    'detail_skipped': ", {count} skipped",
+    'detail_page_failed': ", {count} failed",
+}
+
+GUI_MESSAGES = {
+    'no_detail_links': "[!] 未找到任何详情页链接",
+    'detail_queued': "[+] 找到 {count} 个详情页，已排队下载原图",
+    'filtered': "[-] 按过滤规则跳过 {count} 张图片",
+    'download_failed': "[X] 下载失败 [{url}]: {error}",
+    'download_progress': "[>>] 第{page_num}页 下载进度: {done}/{total} - {filename}",
+    'page_done': "[OK] 第 {page_num} 页完成！成功下载 {success}/{total} 张图片",
+    'page_done_skipped': "，{count} 张不符合过滤规则已跳过",
+    'fetch_failed': "[X] 访问网页失败: {error}",
+    'error': "[X] 发生错误: {error}",
+    'page_resumed': "[=] 第 {page_num} 页已完成，跳过（断点续爬）",
+    'page_queued': "\n[!] 第 {page_num} 页抓取失败，整轮结束后从这一页重试",
+    'next_page': "[+] 找到下一页: {url}",
+    'no_next_page': "[!] 未找到下一页链接，已抓取 {page_num} 页后停止",
+    'retry_start': "\n[*] 整轮结束，重试 {count} 个失败项...",
+    'retry_failed': "[X] 重试失败 [{url}]: {error}",
+    'recovered': "[+] 重试补回 {count} 张图片",
+    'still_failing': "[!] 仍有 {count} 项失败，可勾选断点续爬再次运行",
+    'detail_start': "[*] 跟进详情页（{links}）下载原图（{image}）",
+    'detail_failed': "[X] 详情页处理失败 [{url}]: {error}",
+    'detail_page_done': "[OK] 第 {page_num} 页完成！成功下载 {downloaded}/{total} 张原图",
+    'detail_skipped': "，跳过 {count} 张",
+    'detail_page_failed': "，失败 {count} 张",
+}
+
+
+def find_next_page_link(doc, current_url):
+    """智能查找下一页链接（预编译关键词正则，单次扫描所有链接）"""
+    return find_next_link(doc, current_url)
+
+
+def scrape_images(url, page_num, total_pages, save_dir='images',
+                  max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                  chunk_size=DEFAULT_CHUNK_SIZE, store=None, journal=None, page=None, retry_queue=None,
+                  control=None, log=print, show_progress=True, progress_callback=None, detail=None,
+                  image_filter=None, messages=CLI_MESSAGES):
+    """
+    从指定URL抓取所有图片（page 为流水线预取好的 PrefetchedPage 时不再重复请求列表页）
+    :param control: 可选的 JobControl（调度器任务），取消时抛出 JobCancelled，该页不记入日志，续爬时重新处理
+    :param log: 日志输出函数（多任务时带任务编号前缀，GUI 写入日志队列）
+    :param show_progress: 是否显示逐页 tqdm 进度条（多任务并行或 GUI 时关闭，避免进度条互相覆盖）
+    :param progress_callback: 可选的 progress_callback(页码, 已完成数, 图片总数)，用于任务状态表与 GUI 进度条；
+                              既没有进度条也没有回调时逐张输出下载进度日志
+    :param detail: 可选的 DetailStage：不下载列表页上的缩略图，而是把详情页链接交给第二阶段下载原图，
+                   本函数不等待原图下载完成
+    :param image_filter: 本次任务的 ImageFilter，未给出时使用共享的过滤器
+    :param messages: 日志文字模板，CLI_MESSAGES 或 GUI_MESSAGES
+    """
+    if image_filter is None:
+        image_filter = get_image_filter()
+
+    try:
+        # 获取网页内容
+        log(f"\n{'='*60}")
+        log(f"[*] 正在收割第 {page_num}/{total_pages} 页...")
+        log(f"[+] URL: {url}")
+        log(f"{'='*60}")
+
+        if page is not None:
+            # 流水线模式：列表页已由预取线程获取并解析
+            doc = page.document()
+        else:
+            doc = fetch_document(url)
+
+        if detail is not None:
+            # 两阶段模式：详情页进入有界工作队列，队列有空位即返回，继续翻页
+            detail_urls = detail.detail_links(doc, url)
+            if not detail_urls:
+                log(messages['no_detail_links'])
+                if journal is not None:
+                    journal.record_page(page_num, url, PAGE_DONE)
+                return doc, 0
+
+            log(messages['detail_queued'].format(count=len(detail_urls)))
+            os.makedirs(save_dir, exist_ok=True)
+            detail.submit_page(page_num, url, list(enumerate(detail_urls, 1)), retry_queue=retry_queue)
+            return doc, 0
+
+        # 提取所有图片标签
+        img_tags = doc.images()
+
+        if not img_tags:
+            log("[!] 未找到任何图片")
+            if journal is not None:
+                journal.record_page(page_num, url, PAGE_DONE)
+            return doc, 0
+
+        log(f"[+] 找到 {len(img_tags)} 张图片")
+
+        # 创建保存目录
+        if not os.path.exists(save_dir):
+            os.makedirs(save_dir)
+            log(f"[+] 已创建目录: {save_dir}")
+
+        # 挑选每张图片分辨率最高的地址（srcset / <picture>），并按过滤规则先筛掉缩略图、站点装饰图
+        img_urls, filtered = image_filter.select_urls(img_tags, url)
+        if filtered:
+            log(messages['filtered'].format(count=filtered))
+        if progress_callback is not None:
+            progress_callback(page_num, 0, len(img_urls))
+
+        # 进度条只在终端需要，tqdm 按需导入（GUI 打包时不带它）
+        progress = None
+        if show_progress:
+            from tqdm import tqdm
+            progress = tqdm(total=len(img_urls), desc=f"[>>] Page {page_num} Download", ncols=80)
+
+        # 并发下载图片（有界线程池 + 单主机并发上限），进度条按完成顺序逐张推进
+        with progress if progress is not None else nullcontext():
+
+            done = 0
+            skipped = 0
+            failed = 0
+
+            def on_result(idx, img_url, filename, error):
+                nonlocal done, skipped, failed
+                done += 1
+                if progress is not None:
+                    progress.update(1)
+                if progress_callback is not None:
+                    progress_callback(page_num, done, len(img_urls))
+                if error is not None:
+                    failed += 1
+                    message = messages['download_failed'].format(url=img_url, error=error)
+                    (progress.write if progress is not None else log)(message)
+                elif filename is None:
+                    # 响应头显示大小或类型不符合过滤规则，没有下载响应体
+                    skipped += 1
+                elif progress is None and progress_callback is None:
+                    log(messages['download_progress'].format(page_num=page_num, done=done, total=len(img_urls),
+                                                             filename=filename))
+
+            success_count = download_images(
+                img_urls,
+                page_num,
+                save_dir,
+                referer=url,
+                max_workers=max_workers,
+                per_host=per_host,
+                chunk_size=chunk_size,
+                store=store,
+                journal=journal,
+                on_result=on_result,
+                retry_queue=retry_queue,
+                control=control,
+                image_filter=image_filter
+            )
+
+        if journal is not None:
+            journal.record_page(page_num, url, PAGE_DONE if not failed else PAGE_PARTIAL)
+
+        log(messages['page_done'].format(page_num=page_num, success=success_count, total=len(img_urls))
+            + (messages['page_done_skipped'].format(count=skipped) if skipped else ''))
+
+        return doc, success_count
+
+    except requests.exceptions.RequestException as e:
+        log(messages['fetch_failed'].format(error=e))
+        if journal is not None:
+            journal.record_page(page_num, url, PAGE_FAILED)
+        return None, 0
+    except Exception as e:
+        log(messages['error'].format(error=e))
+        if journal is not None:
+            journal.record_page(page_num, url, PAGE_FAILED)
+        return None, 0
+
+
+def crawl_pages(url, total_pages, save_dir, max_workers, per_host, chunk_size, store, journal,
+                prefetch, retry_queue, start_page=1, control=None, log=print, show_progress=True,
+                progress_callback=None, detail=None, image_filter=None, messages=CLI_MESSAGES):
+    """
+    从 start_page 开始沿下一页链接抓取，失败的列表页与图片放入重试队列，返回成功下载的图片数
+    :param detail: 可选的 DetailStage，原图由第二阶段下载，不计入返回值
+    """
+    total_images = 0
+
+    # 下一页在当前页图片下载期间提前获取；两阶段模式下列表页保留整棵树供详情页链接选择器使用
+    fetch_page = partial(fetch_document, tags=None) if detail is not None else fetch_document
+    with PagePrefetcher(url, total_pages, find_next_page_link, journal,
+                        depth=prefetch, fetch_page=fetch_page, start_page=start_page) as pages:
+        for page in pages:
+            if page.skipped:
+                log(messages['page_resumed'].format(page_num=page.page_num))
+                continue
+
+            if control is not None:
+                control.checkpoint()
+
+            # 抓取当前页
+            doc, success_count = scrape_images(
+                page.url,
+                page.page_num,
+                total_pages,
+                save_dir,
+                max_workers=max_workers,
+                per_host=per_host,
+                chunk_size=chunk_size,
+                store=store,
+                journal=journal,
+                page=page,
+                retry_queue=retry_queue,
+                control=control,
+                log=log,
+                show_progress=show_progress,
+                progress_callback=progress_callback,
+                detail=detail,
+                image_filter=image_filter,
+                messages=messages
+            )
+            total_images += success_count
+
+            if doc is None:
+                # 列表页重试用尽：拿不到下一页链接，留到整轮结束后从这一页继续
+                retry_queue.add_page(page.page_num, page.url)
+                log(messages['page_queued'].format(page_num=page.page_num))
+                break
+
+            # 如果还有下一页，报告预取线程找到的下一页链接
+            if page.page_num < total_pages:
+                if page.next_url:
+                    log(messages['next_page'].format(url=page.next_url))
+                else:
+                    log(messages['no_next_page'].format(page_num=page.page_num))
+                    break
+
+    return total_images
+
+
+def retry_failed(retry_queue, total_pages, save_dir, max_workers, per_host, chunk_size, store, journal, prefetch,
+                 control=None, log=print, show_progress=True, progress_callback=None, detail=None,
+                 image_filter=None, messages=CLI_MESSAGES):
+    """
+    收尾重试：失败的列表页等主机冷却后从该页继续翻页，失败的图片与详情页再处理一次，返回补齐的图片数
+    :param detail: 可选的 DetailStage，调用前其队列应已处理完（join）
+    """
+    if not len(retry_queue):
+        return 0
+
+    log(messages['retry_start'].format(count=len(retry_queue)))
+    leftover = RetryQueue()
+    total_images = 0
+    detail_before = detail.downloaded if detail is not None else 0
+
+    for item in retry_queue.take(RETRY_PAGE):
+        get_circuit_breaker().wait(item.url)
+        total_images += crawl_pages(
+            item.url, total_pages, save_dir, max_workers, per_host, chunk_size, store, journal,
+            prefetch, leftover, start_page=item.page_num, control=control, log=log, show_progress=show_progress,
+            progress_callback=progress_callback, detail=detail, image_filter=image_filter, messages=messages
+        )
+
+    if detail is not None:
+        # 失败的详情页按所在列表页分组重新入队，主机仍在熔断时等待冷却结束
+        pages = {}
+        for item in retry_queue.take(RETRY_DETAIL):
+            pages.setdefault((item.page_num, item.referer), []).append((item.idx, item.url))
+        for (page_num, page_url), details in pages.items():
+            detail.submit_page(page_num, page_url, details, retry_queue=leftover, wait_for_circuit=True)
+        detail.join()
+        total_images += detail.downloaded - detail_before
+
+    def on_result(idx, img_url, filename, error):
+        if error is not None:
+            log(messages['retry_failed'].format(url=img_url, error=error))
+
+    total_images += retry_failed_images(
+        retry_queue, save_dir, max_workers, per_host, chunk_size, store, journal, on_result, leftover, control,
+        image_filter
+    )
+
+    log(messages['recovered'].format(count=total_images))
+    if len(leftover):
+        log(messages['still_failing'].format(count=len(leftover)))
+    return total_images
+
+
+def crawl(url, total_pages, save_dir='images', max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+          chunk_size=DEFAULT_CHUNK_SIZE, dedup=True, resume=False, prefetch=DEFAULT_PREFETCH_DEPTH, control=None,
+          log=print, show_progress=True, progress_callback=None, detail_links=None, detail_image=None,
+          detail_queue=DEFAULT_DETAIL_QUEUE, image_filter=None, messages=CLI_MESSAGES):
+    """
+    线程池引擎：自动翻页抓取（列表页流水线预取），整轮结束后重试失败项，返回成功下载的图片总数
+    :param dedup: 是否启用内容寻址仓库跨页去重
+    :param control: 可选的 JobControl，由 JobScheduler 传入，支持暂停 / 继续 / 取消
+    :param log: 日志输出函数，见 scrape_images
+    :param detail_links: 详情页链接的 CSS 选择器（auto 表示按站点预设）；给出时跟进详情页下载原图，
+                         max_workers 个线程从容量为 detail_queue 的队列中取详情页，与翻页并行
+    :param detail_image: 详情页中原图的 CSS 选择器，见 detail_pages.detail_selectors
+    :param image_filter: 本次任务的 ImageFilter（GUI 每个任务各自一份，后提交的任务不影响正在运行的任务），
+                         未给出时在开始时取共享的过滤器，整次运行使用同一份规则
+    :param messages: 日志文字模板，CLI_MESSAGES 或 GUI_MESSAGES
+    """
+    if image_filter is None:
+        image_filter = get_image_filter()
+
+    # 内容寻址仓库：跨页去重，已见过的 URL 不再下载
+    store = ImageStore(save_dir) if dedup else None
+
+    # 断点续爬日志：记录页面、下一页链接与每张图片的状态
+    journal = CrawlJournal(save_dir, url, resume)
+
+    # 重试用尽的页面与图片不阻塞翻页，整轮结束后统一再试
+    retry_queue = RetryQueue()
+
+    options = dict(control=control, log=log, show_progress=show_progress, progress_callback=progress_callback,
+                   image_filter=image_filter, messages=messages)
+
+    try:
+        detail = None
+        if detail_links:
+            detail_links, detail_image = detail_selectors(url, detail_links, detail_image)
+
+            def on_result(page_num, detail_url, filename, error):
+                if error is not None:
+                    log(messages['detail_failed'].format(url=detail_url, error=error))
+
+            def on_page_done(page):
+                log(messages['detail_page_done'].format(page_num=page.page_num, downloaded=page.downloaded,
+                                                        total=page.total)
+                    + (messages['detail_skipped'].format(count=page.skipped) if page.skipped else '')
+                    + (messages['detail_page_failed'].format(count=page.failed) if page.failed else ''))
+
+            detail = DetailStage(
+                save_dir, detail_links, detail_image, workers=max_workers, per_host=per_host,
+                queue_size=detail_queue, chunk_size=chunk_size, store=store, journal=journal, control=control,
+                on_result=on_result, on_page_done=on_page_done, progress_callback=progress_callback,
+                image_filter=image_filter
+            )
+            log(messages['detail_start'].format(links=detail_links, image=detail_image))
+
+        with detail or nullcontext():
+            total_images = crawl_pages(
+                url, total_pages, save_dir, max_workers, per_host, chunk_size, store, journal, prefetch,
+                retry_queue, detail=detail, **options
+            )
+            if detail is not None:
+                # 翻页已结束，等待排队中的详情页全部处理完再统一重试
+                detail.join()
+                total_images += detail.downloaded
+            total_images += retry_failed(
+                retry_queue, total_pages, save_dir, max_workers, per_host, chunk_size, store, journal, prefetch,
+                detail=detail, **options
+            )
+    finally:
+        # 取消时同样关闭日志：已完成的页面与图片都已落盘，可断点续爬
+        journal.close()
+
+    return total_images
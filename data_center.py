@@ -1,231 +1,546 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+import os
+import re
+import sys
+import argparse
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 import time
 import urllib3
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment
+
+from sinks import DEFAULT_OUTPUT_DIR, NAMING_MODES, SINKS, configure_sinks, export, get_output_dir
+from metrics import STAGE_PARSE, format_summary, get_metrics, write_json, write_prometheus
+from paper_index import PAPER_INDEX_FILE, PaperIndex
+from profiling import DEFAULT_TOP, RunProfiler, default_prefix
+from price_history import PRICE_HISTORY_FILE, PriceHistory, PricePoint
+from html_parser import make_soup, parse_html
+from http_session import fetch, CLASH_PROXIES, DIRECT_PROXIES
 
 # 禁用 SSL 警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# 战术伪装：User-Agent 字典
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-}
 
 
-def beautify_excel(file_path, column_widths):
-    """
-    通用 Excel 美化函数
-    :param file_path: Excel 文件路径
-    :param column_widths: 字典，键为列名，值为列宽
-    """
-    wb = load_workbook(file_path)
-    ws = wb.active
+# --verbose 时才输出逐页调试信息
+VERBOSE = False
+_debug_lock = threading.Lock()
 
-    # 冻结首行
-    ws.freeze_panes = 'A2'
 
-    # 设置表头样式（加粗）
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+def debug(message):
+    """输出调试信息（仅 --verbose）；多个分类并发扫描，加锁保证每行完整、不互相穿插"""
+    if VERBOSE:
+        with _debug_lock:
+            print(message)
 
-    # 设置列宽和自动换行
-    for col_idx, cell in enumerate(ws[1], start=1):
-        col_letter = cell.column_letter
-        col_name = cell.value
 
-        # 设置列宽
-        if col_name in column_widths:
-            ws.column_dimensions[col_letter].width = column_widths[col_name]
-        else:
-            ws.column_dimensions[col_letter].width = 15  # 默认宽度
+# arXiv 分类列表页：按时间倒序，通过 skip / show 翻页
+ARXIV_LIST_URL = "https://arxiv.org/list/{category}/recent?skip={skip}&show={show}"
+ARXIV_CATEGORIES = ('cs.AI', 'cs.LG', 'cs.CL')
+ARXIV_SHOW_CHOICES = (25, 50, 100, 250, 500, 1000, 2000)
+ARXIV_PAGE_SIZE = 100
+ARXIV_MAX_PAGES = 5
 
-    # 设置所有数据单元格自动换行
-    for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-        for cell in row:
-            cell.alignment = Alignment(vertical='top', wrap_text=True)
+# Excel 报表中摘要的展示长度（论文库与数据文件保留全文）
+ABSTRACT_PREVIEW_CHARS = 200
 
-    wb.save(file_path)
-    print(f"[✓] Excel 美化完成: {file_path}")
+# 从 /abs/2410.12345v2 形式的链接中取出不带版本号的 arXiv ID
+ARXIV_ID_PATTERN = re.compile(r'/abs/([^?#]+?)(?:v\d+)?$')
 
 
+def parse_arxiv_listing(content):
+    """解析列表页，返回 [(arXiv ID, <dd> 节点)]，页面结构变化找不到 <dl> 时返回 None"""
+    # 快速解析：只构建论文列表 <dl> 子树
+    with get_metrics().timer(STAGE_PARSE):
+        soup = make_soup(content, parse_only='dl')
+    dl_list = soup.find('dl')
+    if not dl_list:
+        return None
 
-def academic_radar():
-    """[1] 学术前沿雷达 - 抓取 arXiv 最新 CS 论文"""
-    print("\n[*] 启动学术前沿雷达...")
+    entries = []
+    for entry, desc in zip(dl_list.find_all('dt'), dl_list.find_all('dd')):
+        link = entry.find('a', href=ARXIV_ID_PATTERN)
+        if link:
+            entries.append((ARXIV_ID_PATTERN.search(link['href']).group(1), desc))
+    return entries
 
-    url = "https://arxiv.org/list/cs.AI/recent"
 
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=10, verify=False, proxies={"http": "http://127.0.0.1:7897", "https": "http://127.0.0.1:7897"})
-        print(f"[DEBUG] HTTP 状态码: {response.status_code}")
+def extract_arxiv_paper(desc):
+    """从 <dd> 中提取 (标题, 完整摘要)"""
+    # 暴力提取标题：优先从 <dd> 中找，因为标题通常在描述部分
+    title = ""
+    title_div = desc.find('div', class_='list-title')
+    if title_div:
+        title = title_div.get_text(strip=True).replace('Title:', '').strip()
+    else:
+        # 备用方案：直接从 <dd> 中找第一个有实质内容的文本
+        all_text = desc.get_text(strip=True)
+        if 'Title:' in all_text:
+            title = all_text.split('Title:')[1].split('Authors:')[0].strip()
+
+    # 暴力提取摘要：直接从 <dd> 容器榨取所有文本
+    abstract = desc.get_text(separator=' ', strip=True)
+    # 清理干扰词
+    abstract = abstract.replace('Abstract:', '').replace('▽ More', '').replace('△ Less', '')
+    abstract = abstract.replace('Title:', '').replace('Authors:', '').replace('Comments:', '')
+    abstract = abstract.replace('Subjects:', '').replace('Cite as:', '').strip()
+
+    return title, abstract
+
+
+def scan_arxiv_category(category, index, show=ARXIV_PAGE_SIZE, max_pages=ARXIV_MAX_PAGES):
+    """
+    增量扫描一个分类：列表按时间倒序，一页里没有新论文就说明后面都见过了，立即停止翻页
+    只读取论文库，新论文由 academic_radar 在导出成功后统一收录
+    :return: (本次看到的论文数, 新论文列表)
+    """
+    seen = 0
+    new_papers = []
+    collected = set()
+
+    for page in range(max_pages):
+        url = ARXIV_LIST_URL.format(category=category, skip=page * show, show=show)
+        response = fetch(url, timeout=10, verify=False, proxies=CLASH_PROXIES)
+        debug(f"[DEBUG] {category} 第 {page + 1} 页 HTTP 状态码: {response.status_code}")
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        papers = []
-        dl_list = soup.find('dl')
-
-        if not dl_list:
-            print("[!] 未找到 <dl> 标签，页面结构可能已变化")
-            return
-
-        entries = dl_list.find_all('dt')
-        descriptions = dl_list.find_all('dd')
-
-        print(f"[DEBUG] 找到 {len(entries)} 个 <dt> 标签和 {len(descriptions)} 个 <dd> 标签")
-
-        for i, (entry, desc) in enumerate(zip(entries, descriptions)):
-            # 暴力提取标题：优先从 <dd> 中找，因为标题通常在描述部分
-            title = ""
-            title_div = desc.find('div', class_='list-title')
-            if title_div:
-                title = title_div.get_text(strip=True).replace('Title:', '').strip()
-            else:
-                # 备用方案：直接从 <dd> 中找第一个有实质内容的文本
-                all_text = desc.get_text(strip=True)
-                if 'Title:' in all_text:
-                    title = all_text.split('Title:')[1].split('Authors:')[0].strip()
-
-            # 暴力提取摘要：直接从 <dd> 容器榨取所有文本
-            abstract = desc.get_text(separator=' ', strip=True)
-            # 清理干扰词
-            abstract = abstract.replace('Abstract:', '').replace('▽ More', '').replace('△ Less', '')
-            abstract = abstract.replace('Title:', '').replace('Authors:', '').replace('Comments:', '')
-            abstract = abstract.replace('Subjects:', '').replace('Cite as:', '').strip()
-
-            # 截取前 200 字符
-            if len(abstract) > 200:
-                abstract = abstract[:200] + "..."
-
-            # 如果找到了标题和摘要就添加
-            if title and abstract and len(abstract) > 20:  # 确保摘要有实质内容
-                papers.append({
-                    '序号': i + 1,
-                    '论文标题': title,
-                    '摘要': abstract
-                })
-            else:
-                print(f"[DEBUG] 第 {i+1} 篇论文解析失败 - 标题: {'有' if title else '无'}, 摘要长度: {len(abstract) if abstract else 0}")
+        entries = parse_arxiv_listing(response.text)
+        if entries is None:
+            print(f"[!] {category} 未找到 <dl> 标签，页面结构可能已变化")
+            break
+        seen += len(entries)
+
+        # 只处理索引里没有的论文（翻页期间列表更新时同一篇论文可能出现在相邻两页）
+        known = index.known(arxiv_id for arxiv_id, _ in entries)
+        fresh = 0
+        for arxiv_id, desc in entries:
+            if arxiv_id in known or arxiv_id in collected:
+                continue
+            title, abstract = extract_arxiv_paper(desc)
+            if not (title and abstract and len(abstract) > 20):  # 确保摘要有实质内容
+                debug(f"[DEBUG] {category} {arxiv_id} 解析失败 - 标题: {'有' if title else '无'}, 摘要长度: {len(abstract) if abstract else 0}")
+                continue
+            collected.add(arxiv_id)
+            fresh += 1
+            new_papers.append({'arXiv ID': arxiv_id, '分类': category, '论文标题': title, '摘要': abstract})
+
+        debug(f"[DEBUG] {category} 第 {page + 1} 页: {len(entries)} 篇，新论文 {fresh} 篇")
+        if fresh == 0 or len(entries) < show:
+            break
 
-        if papers:
-            df = pd.DataFrame(papers)
-            file_path = 'university_courses_intel.xlsx'
-            df.to_excel(file_path, index=False, engine='openpyxl')
-            print(f"[✓] 成功抓取 {len(papers)} 篇论文，已导出至 {file_path}")
+    return seen, new_papers
 
-            # 美化 Excel
-            beautify_excel(file_path, {
-                '序号': 8,
-                '论文标题': 40,
-                '摘要': 80
-            })
-        else:
+
+def academic_radar(categories=ARXIV_CATEGORIES, show=ARXIV_PAGE_SIZE, max_pages=ARXIV_MAX_PAGES):
+    """
+    [1] 学术前沿雷达 - 增量抓取 arXiv 多个 CS 分类的最新论文
+    各分类并发扫描，每次运行只导出新论文；导出成功后才按 arXiv ID 收录进本地论文库，
+    导出失败时这些论文下次运行仍算新论文
+    :return: 本次扫描到的论文数（没有新论文也算成功）
+    """
+    print("\n[*] 启动学术前沿雷达...")
+
+    # 各分类并发扫描；个别分类失败不影响其余分类
+    results = []
+    errors = []
+    index = PaperIndex(os.path.join(get_output_dir(), PAPER_INDEX_FILE))
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(categories))) as pool:
+            futures = [pool.submit(scan_arxiv_category, category, index, show, max_pages) for category in categories]
+            for category, future in zip(categories, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append(e)
+                    print(f"[!] 分类 {category} 抓取失败: {e}")
+
+        if errors and not results:
+            raise errors[0]
+
+        seen = sum(count for count, _ in results)
+
+        # 交叉发布的论文会出现在多个分类里，只保留排在前面的分类
+        papers = {}
+        for _, new_papers in results:
+            for paper in new_papers:
+                papers.setdefault(paper['arXiv ID'], paper)
+        papers = list(papers.values())
+
+        if not seen:
             print("[!] 未能解析到任何论文数据，请检查页面结构")
+            return 0
 
-    except Exception as e:
-        print(f"[✗] 任务失败: {e}")
+        if not papers:
+            print(f"[=] 扫描 {seen} 篇论文，没有新论文（论文库共 {len(index)} 篇）")
+            return seen
 
+        for idx, paper in enumerate(papers, 1):
+            paper['序号'] = idx
 
-def knowledge_harvest():
-    """[2] 高分知识收割 - 抓取豆瓣读书 Top250"""
+        # 写入所有已配置的输出格式（默认 Excel），摘要只在 Excel 中截断展示
+        paths = export('university_courses_intel', papers, {
+            '序号': 8,
+            'arXiv ID': 16,
+            '分类': 8,
+            '论文标题': 40,
+            '摘要': 80
+        }, truncate={'摘要': ABSTRACT_PREVIEW_CHARS})
+
+        # 导出成功后再收录：导出途中出错时论文库保持不变
+        index.add_many((paper['arXiv ID'], paper['分类'], paper['论文标题'], paper['摘要']) for paper in papers)
+        total = len(index)
+    finally:
+        index.close()
+
+    print(f"[✓] 新增 {len(papers)} 篇论文（论文库共 {total} 篇），已导出至 {', '.join(paths)}")
+
+    return seen
+
+
+# 豆瓣读书 Top250：每页 25 本，共 10 页（?start=0, 25, ..., 225）
+DOUBAN_TOP250_URL = "https://book.douban.com/top250"
+DOUBAN_PAGE_SIZE = 25
+DOUBAN_MAX_PAGES = 10
+
+# 一次扫描取出每本书的三个字段：书名链接、作者信息、评分（按文档顺序依次出现）
+DOUBAN_FIELDS_SELECTOR = 'tr.item div.pl2 > a, tr.item p.pl, tr.item span.rating_nums'
+
+
+def parse_douban_page(content, start=0):
+    """
+    单次扫描解析一页 Top250：遇到书名链接即开始一条新记录，随后的作者信息与评分归入该记录
+    :param start: 该页的起始偏移，用于计算排名
+    """
+    books = []
+    current = None
+    position = 0
+
+    for tag, attrs, text in parse_html(content).select_nodes(DOUBAN_FIELDS_SELECTOR):
+        if tag == 'a':
+            position += 1
+            current = {'排名': start + position, '书名': attrs.get('title', '').strip(), '作者信息': '', '评分': ''}
+            books.append(current)
+        elif current is not None and tag == 'p':
+            current['作者信息'] = text
+        elif current is not None and tag == 'span':
+            current['评分'] = text
+
+    return [book for book in books if book['书名'] and book['作者信息'] and book['评分']]
+
+
+def fetch_douban_page(start):
+    # 偏移写进 URL 而不是 params：条件请求缓存按完整 URL 区分各页
+    response = fetch(f"{DOUBAN_TOP250_URL}?start={start}", timeout=10, verify=False, proxies=DIRECT_PROXIES)
+    response.raise_for_status()
+    return parse_douban_page(response.content, start)
+
+
+def knowledge_harvest(pages=DOUBAN_MAX_PAGES):
+    """
+    [2] 高分知识收割 - 抓取豆瓣读书 Top250
+    :param pages: 抓取的页数（1-10，每页 25 本），各页并发获取，共用按主机限速
+    """
     print("\n[*] 启动高分知识收割...")
 
-    url = "https://book.douban.com/top250"
+    starts = [page * DOUBAN_PAGE_SIZE for page in range(max(1, min(pages, DOUBAN_MAX_PAGES)))]
 
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=10, verify=False, proxies={"http": None, "https": None})
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        books = []
-        items = soup.find_all('tr', class_='item')
-
-        for idx, item in enumerate(items[:25], 1):
-            title_tag = item.find('div', class_='pl2').find('a')
-            info_tag = item.find('p', class_='pl')
-            rating_tag = item.find('span', class_='rating_nums')
-
-            if title_tag and info_tag and rating_tag:
-                title = title_tag.get('title', '').strip()
-                author_info = info_tag.get_text(strip=True)
-                rating = rating_tag.get_text(strip=True)
-
-                books.append({
-                    '排名': idx,
-                    '书名': title,
-                    '作者信息': author_info,
-                    '评分': rating
-                })
+    # 并发获取各页，按排名顺序合并；个别页失败不影响其余页
+    books = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=len(starts)) as pool:
+        futures = [pool.submit(fetch_douban_page, start) for start in starts]
+        for start, future in zip(starts, futures):
+            try:
+                books.extend(future.result())
+            except Exception as e:
+                errors.append(e)
+                print(f"[!] 第 {start // DOUBAN_PAGE_SIZE + 1} 页获取失败: {e}")
 
-        df = pd.DataFrame(books)
-        file_path = 'cognitive_improvement_intel.xlsx'
-        df.to_excel(file_path, index=False, engine='openpyxl')
-        print(f"[✓] 成功抓取 {len(books)} 本图书，已导出至 {file_path}")
+    if errors and not books:
+        raise errors[0]
 
-        # 美化 Excel
-        beautify_excel(file_path, {
-            '排名': 8,
-            '书名': 35,
-            '作者信息': 50,
-            '评分': 10
-        })
+    # 写入所有已配置的输出格式（默认 Excel）
+    paths = export('cognitive_improvement_intel', books, {
+        '排名': 8,
+        '书名': 35,
+        '作者信息': 50,
+        '评分': 10
+    })
+    print(f"[✓] 成功抓取 {len(books)} 本图书，已导出至 {', '.join(paths)}")
 
-    except Exception as e:
-        print(f"[✗] 任务失败: {e}")
+    return len(books)
 
 
-def entertainment_monitor():
-    """[3] 赛博娱乐监控 - 抓取 Steam 热门特惠"""
-    print("\n[*] 启动赛博娱乐监控...")
+# Steam 特惠搜索的分页接口：返回 JSON，results_html 为本页的搜索结果行，total_count 为结果总数
+STEAM_SEARCH_URL = ("https://store.steampowered.com/search/results/"
+                    "?specials=1&filter=topsellers&infinite=1&start={start}&count={count}")
+STEAM_PAGE_SIZE = 100
+STEAM_WORKERS = 8
 
-    url = "https://store.steampowered.com/search/?specials=1&filter=topsellers"
+# 一次扫描取出每个商品的字段：结果行（商品键）、名称、折扣块（最终价格 / 折扣率）、原价与折扣价文本
+STEAM_FIELDS_SELECTOR = ('a.search_result_row, a.search_result_row span.title, '
+                         'a.search_result_row div.discount_block, '
+                         'a.search_result_row div.discount_original_price, '
+                         'a.search_result_row div.discount_final_price')
 
+# 价格文本中的数字部分，例如 "¥ 1,234.00"、"19,99€"、"$59.99"
+PRICE_NUMBER_PATTERN = re.compile(r'\d[\d.,\s]*')
+
+
+def parse_price(text):
+    """
+    把价格文本规整为数字，兼容千分位与逗号小数点；免费返回 0.0，无法识别时返回 None
+    """
+    if not text:
+        return None
+    if text.strip().lower() in ('free', 'free to play', '免费', '免费开玩'):
+        return 0.0
+
+    match = PRICE_NUMBER_PATTERN.search(text)
+    if not match:
+        return None
+    number = re.sub(r'\s', '', match.group()).rstrip('.,')
+
+    # 最后一个分隔符后面是一到两位数字时视为小数点（12,5€ / 19.99），三位时是千分位（₩12,000 / 1.234），
+    # 其余分隔符都是千分位
+    last_sep = max(number.rfind('.'), number.rfind(','))
+    if last_sep != -1 and len(number) - last_sep - 1 in (1, 2):
+        number = number[:last_sep].replace('.', '').replace(',', '') + '.' + number[last_sep + 1:]
+    else:
+        number = number.replace('.', '').replace(',', '')
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10, verify=False, proxies={"http": "http://127.0.0.1:7897", "https": "http://127.0.0.1:7897"})
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        return float(number)
+    except ValueError:
+        return None
+
+
+def parse_steam_results(content):
+    """单次扫描解析一页搜索结果，返回 [PricePoint]；遇到结果行即开始一条新记录"""
+    points = []
+    current = None
+
+    for tag, attrs, text in parse_html(content).select_nodes(STEAM_FIELDS_SELECTOR):
+        if tag == 'a':
+            # 商品键优先用 App_123 / Sub_456 / Bundle_789 形式的 itemkey，旧版页面退回 appid
+            item_key = attrs.get('data-ds-itemkey') or (
+                f"App_{attrs['data-ds-appid']}" if attrs.get('data-ds-appid') else ''
+            )
+            current = PricePoint(item_key, '', None, None, 0)
+            points.append(current)
+        elif current is None:
+            continue
+        elif tag == 'span':
+            current.title = text
+        elif 'discount_block' in attrs.get('class', ''):
+            # data-price-final 以分为单位，比解析文本可靠
+            if attrs.get('data-price-final', '').isdigit():
+                current.final = int(attrs['data-price-final']) / 100
+            if attrs.get('data-discount', '').isdigit():
+                current.discount = int(attrs['data-discount'])
+        elif 'discount_original_price' in attrs.get('class', ''):
+            current.original = parse_price(text)
+        elif 'discount_final_price' in attrs.get('class', '') and current.final is None:
+            current.final = parse_price(text)
+
+    return [point for point in points if point.item_key and point.title and point.final is not None]
+
+
+def fetch_steam_page(start, count=STEAM_PAGE_SIZE):
+    """获取一页特惠搜索结果，返回 (结果总数, [PricePoint])"""
+    # 偏移写进 URL 而不是 params：条件请求缓存按完整 URL 区分各页
+    response = fetch(STEAM_SEARCH_URL.format(start=start, count=count),
+                     timeout=10, verify=False, proxies=CLASH_PROXIES)
+    response.raise_for_status()
+    data = response.json()
+    if not data.get('success'):
+        raise ValueError(f"Steam 搜索接口返回失败: start={start}")
+    return int(data.get('total_count') or 0), parse_steam_results(data.get('results_html', ''))
+
+
+def price_delta(point, last):
+    """判断本次价格相对上次记录是否值得报告，返回变化类型或 None"""
+    if point.discount <= 0:
+        return None
+    if last is None or last.discount <= 0:
+        return '新折扣'
+    if last.final is not None and point.final < last.final:
+        return '降价'
+    return None
+
+
+def entertainment_monitor(max_pages=None):
+    """
+    [3] 赛博娱乐监控 - 追踪 Steam 全部特惠的价格变化
+    先取第一页得到结果总数，其余页并发获取；价格按商品键追加进本地价格时间序列，
+    报表只列出相对上次运行的新折扣与降价
+    :param max_pages: 最多获取的页数（每页 100 个），None 表示全部
+    :return: 本次扫描到的特惠商品数（没有变化也算成功）
+    """
+    print("\n[*] 启动赛博娱乐监控...")
+
+    total_count, points = fetch_steam_page(0)
+    full_pages = max(1, -(-total_count // STEAM_PAGE_SIZE))
+    pages = full_pages if max_pages is None else max(1, min(full_pages, max_pages))
+    print(f"[*] 特惠商品共 {total_count} 个，获取 {pages}/{full_pages} 页")
+
+    # 其余页并发获取，共用按主机限速；个别页失败不影响其余页
+    starts = [page * STEAM_PAGE_SIZE for page in range(1, pages)]
+    errors = []
+    if starts:
+        with ThreadPoolExecutor(max_workers=min(STEAM_WORKERS, len(starts))) as pool:
+            futures = [pool.submit(fetch_steam_page, start) for start in starts]
+            for start, future in zip(starts, futures):
+                try:
+                    points.extend(future.result()[1])
+                except Exception as e:
+                    errors.append(e)
+                    print(f"[!] 第 {start // STEAM_PAGE_SIZE + 1} 页获取失败: {e}")
+
+    # 翻页期间排序可能变化，同一商品只保留第一次出现
+    unique = {}
+    for point in points:
+        unique.setdefault(point.item_key, point)
+    points = list(unique.values())
+    if not points:
+        print("[!] 未能解析到任何特惠商品，请检查页面结构")
+        return 0
+
+    history = PriceHistory(os.path.join(get_output_dir(), PRICE_HISTORY_FILE))
+    try:
+        run_time = time.time()
+        # 先只读对比，报表导出成功后才写入价格库：导出失败时下次运行仍会报告这些变化
+        changes = history.changes(points)
+
+        # 完整扫描了全部结果时，上次还在打折、这次不在特惠列表里的商品记为折扣结束（恢复原价），
+        # 下次再打折时才能识别为新折扣；扫描不完整时无法区分，不做推断
+        ended = []
+        if not errors and pages == full_pages:
+            seen_keys = {point.item_key for point in points}
+            ended = history.changes([
+                PricePoint(key, last.title, last.original, last.original, 0)
+                for key, last in history.on_sale().items() if key not in seen_keys
+            ])
+
+        deltas = []
+        for point, last in changes:
+            kind = price_delta(point, last)
+            if kind:
+                deltas.append({
+                    '序号': len(deltas) + 1,
+                    '变化': kind,
+                    '商品': point.item_key,
+                    '游戏名称': point.title,
+                    '原价': point.original,
+                    '折扣价': point.final,
+                    '折扣': f"-{point.discount}%",
+                    '上次价格': last.final if last else None,
+                })
 
-        games = []
-        items = soup.find_all('a', class_='search_result_row')
+        # 写入所有已配置的输出格式（默认 Excel）
+        paths = []
+        if deltas:
+            paths = export('entertainment_and_leisure_intel', deltas, {
+                '序号': 8,
+                '变化': 10,
+                '商品': 16,
+                '游戏名称': 40,
+                '原价': 12,
+                '折扣价': 12,
+                '折扣': 8,
+                '上次价格': 12
+            })
 
-        for idx, item in enumerate(items[:20], 1):
-            title_tag = item.find('span', class_='title')
-            price_div = item.find('div', class_='discount_prices')
+        history.record([point for point, _ in changes + ended], run_time)
+        total = len(history)
+    finally:
+        history.close()
 
-            if title_tag and price_div:
-                title = title_tag.get_text(strip=True)
-                original_price = price_div.find('div', class_='discount_original_price')
-                final_price = price_div.find('div', class_='discount_final_price')
+    print(f"[*] 价格有变化 {len(changes)} 个，折扣结束 {len(ended)} 个（价格库共 {total} 个商品）")
+    if not deltas:
+        print(f"[=] 扫描 {len(points)} 个特惠商品，没有新折扣或降价")
+        return len(points)
 
-                original = original_price.get_text(strip=True) if original_price else "N/A"
-                final = final_price.get_text(strip=True) if final_price else "N/A"
+    print(f"[✓] 新折扣 / 降价 {len(deltas)} 款（共扫描 {len(points)} 个特惠商品），已导出至 {', '.join(paths)}")
 
-                games.append({
-                    '序号': idx,
-                    '游戏名称': title,
-                    '原价': original,
-                    '折扣价': final
-                })
+    return len(points)
 
-        df = pd.DataFrame(games)
-        file_path = 'entertainment_and_leisure_intel.xlsx'
-        df.to_excel(file_path, index=False, engine='openpyxl')
-        print(f"[✓] 成功抓取 {len(games)} 款游戏，已导出至 {file_path}")
 
-        # 美化 Excel
-        beautify_excel(file_path, {
-            '序号': 8,
-            '游戏名称': 40,
-            '原价': 12,
-            '折扣价': 12
-        })
+# 可调度的情报任务：命令行名称 -> (菜单编号, 任务函数, 任务名称)
+# 各任务在自己的函数里选择代理通道（arXiv / Steam 走 Clash，豆瓣直连），并发运行互不影响
+TASKS = {
+    'arxiv': ('1', academic_radar, '学术前沿雷达'),
+    'douban': ('2', knowledge_harvest, '高分知识收割'),
+    'steam': ('3', entertainment_monitor, '赛博娱乐监控'),
+}
+
 
+def run_task(name, **kwargs):
+    """
+    运行单个任务并计时，任务抛出的异常在这里捕获并打印
+    :param kwargs: 传给任务函数的参数（例如豆瓣的 pages）
+    :return: 字典 {'name', 'count', 'elapsed', 'error'}，count 为导出的记录数
+    """
+    _, func, _ = TASKS[name]
+    start = time.perf_counter()
+    count, error = 0, None
+    try:
+        count = func(**kwargs) or 0
     except Exception as e:
+        error = e
         print(f"[✗] 任务失败: {e}")
+    return {'name': name, 'count': count, 'elapsed': time.perf_counter() - start, 'error': error}
+
+
+def run_tasks(names, task_kwargs=None):
+    """
+    并发运行多个任务（每个任务一个线程），总耗时取决于最慢的数据源，返回与 names 顺序一致的结果
+    :param task_kwargs: 字典，键为任务名，值为传给该任务的参数字典
+    """
+    task_kwargs = task_kwargs or {}
+    with ThreadPoolExecutor(max_workers=max(1, len(names))) as pool:
+        futures = [pool.submit(run_task, name, **task_kwargs.get(name, {})) for name in names]
+        return [future.result() for future in futures]
+
+
+def parse_task_list(spec):
+    """解析 --tasks 参数，例如 "arxiv,steam" 或 "all"，保持顺序并去重"""
+    names = []
+    for name in spec.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name == 'all':
+            names.extend(TASKS)
+        elif name in TASKS:
+            names.append(name)
+        else:
+            raise ValueError(f"未知任务: {name}，可选: {', '.join(TASKS)}, all")
+    names = list(dict.fromkeys(names))
+    if not names:
+        raise ValueError("至少需要指定一个任务")
+    return names
+
+
+def print_summary(results, elapsed):
+    """打印多任务汇总，返回是否全部成功（任务报错或没有抓到数据都算失败）"""
+    print("\n" + "="*60)
+    print(f"[*] 任务汇总 | 总耗时 {elapsed:.1f}s")
+    print("="*60)
+
+    all_ok = True
+    for result in results:
+        label = TASKS[result['name']][2]
+        head = f"{result['name']:<8} {label}"
+        if result['error'] is not None:
+            all_ok = False
+            print(f"  [✗] {head}  失败 ({result['elapsed']:.1f}s): {result['error']}")
+        elif not result['count']:
+            all_ok = False
+            print(f"  [!] {head}  未抓到任何数据 ({result['elapsed']:.1f}s)")
+        else:
+            print(f"  [✓] {head}  {result['count']} 条记录 ({result['elapsed']:.1f}s)")
+
+    print("="*60)
+    return all_ok
 
 
 def print_menu():
@@ -243,23 +558,22 @@ def print_menu():
     print("\n[任务列表]")
     print("  [1] 学术前沿雷达      -> arXiv 最新 CS 论文抓取")
     print("  [2] 高分知识收割      -> 豆瓣读书 Top250 数据采集")
-    print("  [3] 赛博娱乐监控      -> Steam 热门特惠游戏追踪")
+    print("  [3] 赛博娱乐监控      -> Steam 特惠新折扣 / 降价追踪")
     print("  [0] 退出系统")
     print("="*60)
 
 
-def main():
-    """主程序入口"""
+def interactive_menu(task_kwargs=None):
+    """交互式菜单：一次运行一个任务"""
+    task_kwargs = task_kwargs or {}
+    menu = {key: name for name, (key, _, _) in TASKS.items()}
+
     while True:
         print_menu()
         choice = input("\n[>] 请输入任务编号: ").strip()
 
-        if choice == '1':
-            academic_radar()
-        elif choice == '2':
-            knowledge_harvest()
-        elif choice == '3':
-            entertainment_monitor()
+        if choice in menu:
+            run_task(menu[choice], **task_kwargs.get(menu[choice], {}))
         elif choice == '0':
             print("\n[*] 系统关闭中...")
             print("[✓] 感谢使用全能赛博情报中心！")
@@ -270,5 +584,127 @@ def main():
         time.sleep(1)
 
 
+def main(argv=None):
+    """
+    主程序入口：不带参数时进入交互菜单；带 --tasks 时无界面并发运行并返回退出码
+    退出码：0 全部成功，1 有任务失败或没有抓到数据，2 参数错误
+    """
+    parser = argparse.ArgumentParser(
+        prog='data_center.py',
+        description='全能赛博情报中心 | Cyber Intelligence Hub',
+        epilog='示例: python data_center.py --tasks arxiv,douban,steam'
+    )
+    parser.add_argument('--tasks',
+                        help=f"逗号分隔的任务列表，all 表示全部（可选: {', '.join(TASKS)}），不指定时进入交互菜单")
+    parser.add_argument('--arxiv-categories', default=','.join(ARXIV_CATEGORIES),
+                        help=f"逗号分隔的 arXiv 分类（默认 {','.join(ARXIV_CATEGORIES)}）")
+    parser.add_argument('--arxiv-show', type=int, choices=ARXIV_SHOW_CHOICES, default=ARXIV_PAGE_SIZE,
+                        help=f'arXiv 列表每页篇数（默认 {ARXIV_PAGE_SIZE}）')
+    parser.add_argument('--arxiv-pages', type=int, default=ARXIV_MAX_PAGES,
+                        help=f'每个分类最多翻页数，遇到整页都是已收录论文时提前停止（默认 {ARXIV_MAX_PAGES}）')
+    parser.add_argument('--douban-pages', type=int, default=DOUBAN_MAX_PAGES,
+                        help=f'豆瓣 Top250 抓取页数，1-{DOUBAN_MAX_PAGES}，每页 25 本（默认 {DOUBAN_MAX_PAGES}）')
+    parser.add_argument('--steam-pages', type=int,
+                        help=f'Steam 特惠最多获取页数，每页 {STEAM_PAGE_SIZE} 个（默认获取全部）')
+    parser.add_argument('--formats', default='excel',
+                        help=f"逗号分隔的输出格式（可选: {', '.join(SINKS)}，默认 excel）")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help='输出目录（默认当前目录）')
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help='运行结束后把各阶段计数与耗时直方图写入 JSON 文件')
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help='运行结束后把指标写成 Prometheus 文本文件（node_exporter textfile 采集）')
+    parser.add_argument('--profile', nargs='?', const='', metavar='PREFIX',
+                        help='（仅 --tasks）用 cProfile 剖析整次运行（含所有线程），输出 PREFIX.prof 与热点函数报告 '
+                             'PREFIX.txt（默认前缀 profile_data_center_<时间>）')
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP,
+                        help=f'剖析报告每节列出的函数个数（默认 {DEFAULT_TOP}）')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='配合 --profile，同时用 tracemalloc 记录内存分配热点（更慢）')
+    parser.add_argument('--naming', choices=NAMING_MODES, default='overwrite',
+                        help='输出文件命名：overwrite 固定文件名 / timestamp 带时间戳 / partition 按日期分区目录')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='输出逐页调试信息（HTTP 状态码、每页论文数、解析失败的条目）')
+    args = parser.parse_args(argv)
+
+    global VERBOSE
+    VERBOSE = args.verbose
+
+    try:
+        configure_sinks(
+            formats=[name.strip().lower() for name in args.formats.split(',') if name.strip()],
+            output_dir=args.output_dir,
+            naming=args.naming
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not 1 <= args.douban_pages <= DOUBAN_MAX_PAGES:
+        parser.error(f"--douban-pages 必须在 1-{DOUBAN_MAX_PAGES} 之间")
+
+    if args.steam_pages is not None and args.steam_pages <= 0:
+        parser.error("--steam-pages 必须大于 0")
+
+    if args.profile_top <= 0:
+        parser.error("--profile-top 必须大于 0")
+
+    if args.profile_memory and args.profile is None:
+        parser.error("--profile-memory 需要同时指定 --profile")
+
+    if args.profile is not None and args.tasks is None:
+        parser.error("--profile 只能用于 --tasks 无界面模式")
+
+    if args.arxiv_pages <= 0:
+        parser.error("--arxiv-pages 必须大于 0")
+
+    categories = tuple(dict.fromkeys(name.strip() for name in args.arxiv_categories.split(',') if name.strip()))
+    if not categories:
+        parser.error("--arxiv-categories 至少需要一个分类")
+
+    task_kwargs = {
+        'arxiv': {'categories': categories, 'show': args.arxiv_show, 'max_pages': args.arxiv_pages},
+        'douban': {'pages': args.douban_pages},
+        'steam': {'max_pages': args.steam_pages},
+    }
+
+    if args.tasks is None:
+        interactive_menu(task_kwargs)
+        return 0
+
+    try:
+        names = parse_task_list(args.tasks)
+    except ValueError as e:
+        parser.error(str(e))
+
+    profiler = None
+    if args.profile is not None:
+        profiler = RunProfiler(args.profile or default_prefix('data_center'), args.profile_top, args.profile_memory)
+        print(f"[*] 已开启性能剖析{'（含 tracemalloc）' if args.profile_memory else ''}，运行会变慢")
+
+    print(f"[*] 并发运行 {len(names)} 个任务: {', '.join(names)}")
+    start = time.perf_counter()
+    with profiler or nullcontext():
+        results = run_tasks(names, task_kwargs)
+    all_ok = print_summary(results, time.perf_counter() - start)
+
+    # 各阶段耗时：判断瓶颈在网络（fetch）、解析（parse）还是导出（export）
+    for line in format_summary():
+        print(f"  {line}")
+
+    if args.metrics_json:
+        write_json(args.metrics_json)
+        print(f"[+] 指标已写入 {args.metrics_json}")
+    if args.metrics_prom:
+        write_prometheus(args.metrics_prom)
+        print(f"[+] Prometheus 指标已写入 {args.metrics_prom}")
+
+    if profiler is not None:
+        print(f"[+] 剖析结果已写入 {profiler.profile_path}，热点报告: {profiler.report_path}")
+        for cumulative, func in profiler.top_lines():
+            print(f"    {cumulative:8.2f}s  {func}")
+
+    return 0 if all_ok else 1
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
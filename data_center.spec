@@ -10,9 +10,15 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # 精简构建：排除项目用不到、只因可选依赖被分析器牵连进来的大型包，减小 onefile 每次启动时的解压量；
+    # pyarrow（及其依赖的 numpy）保留：--formats parquet 需要它，只在写 Parquet 时才导入，不影响启动
+    excludes=[
+        'pandas', 'matplotlib', 'scipy', 'IPython', 'PIL',
+        'unittest', 'pydoc', 'doctest', 'xmlrpc', 'lib2to3',
+        'tkinter', 'aiohttp', 'tqdm',
+    ],
     noarchive=False,
-    optimize=0,
+    optimize=1,
 )
 pyz = PYZ(a.pure)
 
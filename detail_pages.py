@@ -0,0 +1,312 @@
+import os
+import queue
+import threading
+from contextlib import nullcontext
+from urllib.parse import urljoin, urlparse
+
+from crawl_journal import PAGE_DONE, PAGE_PARTIAL, IMAGE_DONE, IMAGE_FAILED, IMAGE_SKIPPED
+from downloader import (DEFAULT_WORKERS, DEFAULT_PER_HOST, DEFAULT_CHUNK_SIZE, HostLimiter, build_image_filename,
+                        download_image)
+from html_parser import get_backend, parse_html
+from http_session import fetch
+from image_filter import PICTURE_SRCSET, get_image_filter, parse_srcset
+from job_scheduler import JobCancelled
+from metrics import get_metrics
+from retry_policy import call_with_retry, get_circuit_breaker
+
+# 详情页工作队列容量：列表页阶段最多领先详情页阶段这么多个详情页，队列满时翻页暂停等待
+DEFAULT_DETAIL_QUEUE = 64
+
+# 详情页中原图的默认选择器：在全部 <img> 中取通过过滤器、声明宽度最大的一张
+DEFAULT_DETAIL_IMAGE = 'img'
+
+# 常见站点的预设 (详情页链接选择器, 原图选择器)，链接选择器写 auto 时按主机名选用
+DETAIL_PRESETS = {
+    'pic.netbian.com': ('.slist li a[href]', '.photo-pic img'),
+}
+
+_STOP = object()
+
+
+def validate_selector(selector):
+    """提前检查 CSS 选择器语法，避免每个页面都因同一个错误失败"""
+    backend = get_backend()
+    try:
+        backend.select(backend.parse(b'<html><body></body></html>'), selector)
+    except Exception as e:
+        raise ValueError(f"invalid CSS selector '{selector}': {e}")
+
+
+def detail_selectors(url, links, image=None):
+    """
+    解析详情页选择器：links 为 auto 时按起始网址的主机名使用预设，
+    image 未给出时沿用预设的原图选择器，没有预设则在详情页全部 <img> 中挑选
+    :return: (详情页链接选择器, 原图选择器)
+    """
+    host = urlparse(url).hostname or ''
+    preset = DETAIL_PRESETS.get(host)
+    if links == 'auto':
+        if preset is None:
+            raise ValueError(f"no detail preset for {host or url}, pass a CSS selector instead "
+                             f"(presets: {', '.join(DETAIL_PRESETS)})")
+        links = preset[0]
+    if not image:
+        image = preset[1] if preset is not None and links == preset[0] else DEFAULT_DETAIL_IMAGE
+    validate_selector(links)
+    validate_selector(image)
+    return links, image
+
+
+def declared_width(attrs):
+    """<img> 声明的最大宽度（srcset 宽度描述符或 width 属性），都未声明时为 0"""
+    widths = [
+        width for key in (PICTURE_SRCSET, 'srcset', 'data-srcset')
+        for _, width, _ in parse_srcset(attrs.get(key)) if width
+    ]
+    width = (attrs.get('width') or '').strip()
+    if width.isdigit():
+        widths.append(int(width))
+    return max(widths, default=0)
+
+
+def fetch_detail(url, timeout=10):
+    """获取并解析详情页（保留整棵树，原图选择器可能依赖外层容器）"""
+    response = fetch(url, timeout=timeout)
+    response.raise_for_status()
+    return parse_html(response.content)
+
+
+class DetailPage:
+    """一个列表页在详情页阶段的进度"""
+
+    def __init__(self, page_num, url, total, retry_queue, wait_for_circuit):
+        self.page_num = page_num
+        self.url = url
+        self.total = total
+        self.remaining = total
+        self.downloaded = 0
+        self.skipped = 0
+        self.failed = 0
+        self.retry_queue = retry_queue
+        self.wait_for_circuit = wait_for_circuit
+
+
+class DetailStage:
+    """
+    第二阶段：从列表页跟进详情页下载原图
+    列表页阶段把每页的详情页链接放进有界队列后立即翻到下一页（队列满时等待，形成背压），
+    workers 个线程从队列取出详情页，获取解析、挑出原图地址后直接下载，与翻页重叠进行；
+    一个列表页的详情页全部处理完后才在断点续爬日志中标记该页完成。
+    日志以详情页地址为键，续爬时已完成的详情页不再请求
+    """
+
+    def __init__(self, save_dir, link_selector, image_selector=DEFAULT_DETAIL_IMAGE, workers=DEFAULT_WORKERS,
+                 per_host=DEFAULT_PER_HOST, queue_size=DEFAULT_DETAIL_QUEUE, chunk_size=DEFAULT_CHUNK_SIZE,
+                 store=None, journal=None, control=None, on_result=None, on_page_done=None,
+                 progress_callback=None, image_filter=None):
+        """
+        :param on_result: 每个详情页处理完后的回调 on_result(页码, 详情页地址, 文件名, 错误)，在工作线程中执行；
+                          错误为 None 表示成功，文件名与错误都为 None 表示被过滤器跳过
+        :param on_page_done: 一个列表页的详情页全部处理完后的回调 on_page_done(DetailPage)
+        :param progress_callback: 可选的 progress_callback(页码, 已完成数, 详情页总数)
+        :param image_filter: 本次任务的 ImageFilter，未给出时使用共享的过滤器
+        """
+        self.save_dir = save_dir
+        self.link_selector = link_selector
+        self.image_selector = image_selector
+        self.chunk_size = chunk_size
+        self.store = store
+        self.journal = journal
+        self.control = control
+        self.on_result = on_result
+        self.on_page_done = on_page_done
+        self.progress_callback = progress_callback
+        self.image_filter = image_filter if image_filter is not None else get_image_filter()
+        self.downloaded = 0
+
+        self._limiter = HostLimiter(per_host)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._cancelled = threading.Event()
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def detail_links(self, doc, page_url):
+        """列表页中的详情页绝对地址（保持页面顺序、去掉重复）"""
+        urls = []
+        seen = set()
+        for attrs in doc.select(self.link_selector):
+            href = (attrs.get('href') or '').strip()
+            if not href or href.startswith(('#', 'javascript:')):
+                continue
+            url = urljoin(page_url, href)
+            if url not in seen:
+                seen.add(url)
+                urls.append(url)
+        return urls
+
+    def submit_page(self, page_num, page_url, details, retry_queue=None, wait_for_circuit=False):
+        """
+        把一个列表页的详情页放进工作队列，details 为 (序号, 详情页地址) 列表；队列满时阻塞
+        :param retry_queue: 可选的 RetryQueue，重试用尽仍失败的详情页留到整轮结束后再试
+        :param wait_for_circuit: True 时主机熔断则等待冷却结束（收尾重试使用）
+        """
+        # 断点续爬：日志中已完成或已被过滤的详情页不再发起网络请求
+        done = self.journal.done_images(page_num) if self.journal is not None else {}
+        pending = [(idx, url) for idx, url in details if url not in done]
+
+        page = DetailPage(page_num, page_url, len(details), retry_queue, wait_for_circuit)
+        page.skipped = sum(1 for idx, url in details if done.get(url) == IMAGE_SKIPPED)
+        page.downloaded = len(details) - len(pending) - page.skipped
+        page.remaining = len(pending)
+        with self._lock:
+            self.downloaded += page.downloaded
+
+        if not pending:
+            self._finish_page(page)
+            return
+
+        if self.progress_callback is not None:
+            self.progress_callback(page_num, page.total - page.remaining, page.total)
+        for idx, url in pending:
+            self._queue.put((page, idx, url))
+
+    def _fetch_original(self, page, idx, detail_url):
+        """
+        获取详情页并下载其中的原图
+        :return: (文件名, 跳过原因)，原图被过滤器拒绝或详情页中没有匹配的图片时文件名为 None
+        """
+        if page.wait_for_circuit:
+            get_circuit_breaker().wait(detail_url)
+        try:
+            doc = fetch_detail(detail_url)
+        except Exception:
+            get_metrics().inc('detail_pages_total', result='failed')
+            raise
+        get_metrics().inc('detail_pages_total', result='ok')
+
+        # 选择器匹配多个元素时取通过过滤器、声明宽度最大的一个（都未声明时取第一个）；
+        # <a href> 形式的"下载原图"链接按图片地址处理
+        img_url = None
+        best_width = -1
+        filtered = 0
+        for attrs in doc.select(self.image_selector):
+            attrs = dict(attrs, src=attrs.get('src') or attrs.get('href'))
+            url, reason = self.image_filter.select(attrs, detail_url)
+            if url is None:
+                filtered += bool(reason)
+                continue
+            width = declared_width(attrs)
+            if width > best_width:
+                img_url, best_width = url, width
+        if img_url is None:
+            return None, "filtered by rules" if filtered else f"no image matched '{self.image_selector}'"
+
+        filename = build_image_filename(img_url, page.page_num, idx)
+        filepath = os.path.join(self.save_dir, filename)
+
+        def attempt():
+            # 退避等待期间不占用该主机的并发名额，也不占用调度器的全局下载名额
+            with self._limiter.get(img_url), self.control.slot() if self.control is not None else nullcontext():
+                return download_image(img_url, filepath, detail_url, chunk_size=self.chunk_size, store=self.store,
+                                      image_filter=self.image_filter)
+
+        skipped = call_with_retry(attempt, img_url, wait_for_circuit=page.wait_for_circuit)
+        return (None, skipped) if skipped is not None else (filename, None)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                # 任务已取消：丢弃排队中的详情页（不记入日志，续爬时重新处理），只负责把队列排空
+                if not self._cancelled.is_set():
+                    self._process(*item)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, page, idx, detail_url):
+        filename = skipped = error = None
+        try:
+            if self.control is not None:
+                self.control.checkpoint()
+            filename, skipped = self._fetch_original(page, idx, detail_url)
+        except JobCancelled:
+            self._cancelled.set()
+            return
+        except Exception as e:
+            error = e
+
+        metrics = get_metrics()
+        if error is not None:
+            metrics.inc('images_total', result='failed')
+            if page.retry_queue is not None:
+                page.retry_queue.add_detail(page.page_num, detail_url, idx, page.url, error)
+        elif skipped is not None:
+            metrics.inc('images_total', result='skipped')
+        else:
+            metrics.inc('images_total', result='ok')
+
+        if self.journal is not None:
+            if error is not None:
+                self.journal.record_image(page.page_num, detail_url, None, IMAGE_FAILED, str(error))
+            elif skipped is not None:
+                self.journal.record_image(page.page_num, detail_url, None, IMAGE_SKIPPED, skipped)
+            else:
+                self.journal.record_image(page.page_num, detail_url, filename, IMAGE_DONE)
+
+        if self.on_result is not None:
+            self.on_result(page.page_num, detail_url, filename, error)
+
+        with self._lock:
+            if error is not None:
+                page.failed += 1
+            elif skipped is not None:
+                page.skipped += 1
+            else:
+                page.downloaded += 1
+                self.downloaded += 1
+            page.remaining -= 1
+            finished = page.remaining == 0
+
+        if self.progress_callback is not None:
+            self.progress_callback(page.page_num, page.total - page.remaining, page.total)
+        if finished:
+            self._finish_page(page)
+
+    def _finish_page(self, page):
+        if self.journal is not None:
+            self.journal.record_page(page.page_num, page.url, PAGE_DONE if not page.failed else PAGE_PARTIAL)
+        if self.on_page_done is not None:
+            self.on_page_done(page)
+
+    def join(self):
+        """等待队列中的详情页全部处理完；期间任务被取消时抛出 JobCancelled"""
+        self._queue.join()
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def close(self, abort=False):
+        """
+        停止工作线程并保存去重仓库索引，进行中的下载照常写完
+        :param abort: True 时丢弃还在排队的详情页（出错退出时使用）
+        """
+        if abort:
+            self._cancelled.set()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        if self.store is not None:
+            self.store.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(abort=exc_type is not None)
+        if exc_type is None and self._cancelled.is_set():
+            raise JobCancelled()
+        return False
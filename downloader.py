@@ -0,0 +1,296 @@
+import os
+import time
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from crawl_journal import PAGE_DONE, IMAGE_DONE, IMAGE_FAILED, IMAGE_SKIPPED
+from http_session import get_session
+from image_filter import ImageRejected, get_image_filter
+from job_scheduler import JobCancelled
+from metrics import STAGE_DISK_WRITE, STAGE_DOWNLOAD, get_metrics
+from retry_policy import RETRY_IMAGE, call_with_retry
+
+# 默认并发参数：全局工作线程数 / 单个主机同时下载数
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 4
+
+# 流式下载每次读取的块大小（字节）
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# mkstemp 创建的临时文件权限为 0600，落盘时按进程 umask 还原为普通文件权限（第一次落盘时读取一次）
+_file_mode = None
+_file_mode_lock = threading.Lock()
+
+
+class HostLimiter:
+    """按主机限制并发下载数，避免同时轰炸同一个 CDN"""
+
+    def __init__(self, per_host=DEFAULT_PER_HOST):
+        self.per_host = max(1, per_host)
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def get(self, url):
+        """返回该 URL 所属主机的信号量"""
+        host = urlparse(url).netloc
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.per_host)
+                self._semaphores[host] = sem
+            return sem
+
+
+def build_image_filename(img_url, page_num, idx):
+    """根据图片 URL 生成保存文件名（带页码前缀避免重名）"""
+    filename = os.path.basename(urlparse(img_url).path)
+
+    # 如果文件名为空或无扩展名，使用序号命名
+    if not filename or '.' not in filename:
+        return f"page{page_num}_image_{idx}.jpg"
+
+    name, ext = os.path.splitext(filename)
+    return f"page{page_num}_{name}{ext}"
+
+
+def _read_umask():
+    """读取进程 umask：Linux 直接读 /proc，不改动 umask；其他平台只能设置再还原"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    # 设置再还原的间隙里其他线程新建的文件只会偏严格（0077），不会变成所有人可写
+    umask = os.umask(0o077)
+    os.umask(umask)
+    return umask
+
+
+def file_mode():
+    """落盘文件的权限位（0666 去掉 umask），只计算一次"""
+    global _file_mode
+    if _file_mode is None:
+        with _file_mode_lock:
+            if _file_mode is None:
+                _file_mode = 0o666 & ~_read_umask()
+    return _file_mode
+
+
+@contextmanager
+def atomic_write(filepath):
+    """写入同目录下的临时文件，成功后原子改名到位，失败则删除临时文件"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or '.', prefix='.', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.chmod(tmp_path, file_mode())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def timed_write(f, chunk):
+    """写入一块数据，返回写盘耗时（秒），用于区分网络瓶颈与磁盘瓶颈"""
+    start = time.perf_counter()
+    f.write(chunk)
+    return time.perf_counter() - start
+
+
+def record_download(size, write_time):
+    """记录一张图片的字节数与写盘耗时"""
+    metrics = get_metrics()
+    metrics.inc('bytes_total', size, kind='image')
+    metrics.observe('stage_seconds', write_time, stage=STAGE_DISK_WRITE)
+
+
+def download_image(img_url, filepath, referer, timeout=10, chunk_size=DEFAULT_CHUNK_SIZE, store=None,
+                   image_filter=None):
+    """
+    流式下载单张图片到磁盘，内存占用只有一个块（复用共享会话的 keep-alive 连接）
+    传入 store 时内容写入内容寻址仓库，filepath 以硬链接指向仓库对象；
+    仓库已记录过该 URL 时直接链接，不发起网络请求
+    :param image_filter: 本次任务的 ImageFilter，未给出时使用共享的过滤器
+    :return: None 表示已保存；被图片过滤器拒绝时返回原因（响应体不读取或读到一半即丢弃）
+    """
+    if store is not None:
+        object_path = store.lookup(img_url)
+        if object_path:
+            store.link(img_url, object_path, filepath)
+            return None
+
+    if image_filter is None:
+        image_filter = get_image_filter()
+    size = 0
+    write_time = 0.0
+    try:
+        with get_metrics().timer(STAGE_DOWNLOAD):
+            with get_session().get(img_url, headers={'Referer': referer}, timeout=timeout,
+                                   stream=True) as img_response:
+                img_response.raise_for_status()
+                image_filter.check_headers(img_response.headers)
+
+                with atomic_write(filepath) if store is None else store.new_object(os.path.splitext(filepath)[1]) as f:
+                    for chunk in img_response.iter_content(chunk_size=chunk_size):
+                        write_time += timed_write(f, chunk)
+                        size += len(chunk)
+                        image_filter.check_size(size)
+                    image_filter.check_size(size, complete=True)
+
+            if store is not None:
+                store.link(img_url, f.path, filepath)
+    except ImageRejected as e:
+        return str(e)
+
+    record_download(size, write_time)
+    return None
+
+
+def _download_jobs(jobs, save_dir, max_workers, per_host, chunk_size, store, journal, on_result,
+                   retry_queue, wait_for_circuit=False, control=None, image_filter=None):
+    """
+    并发执行下载任务，jobs 为 (页码, 序号, 图片地址, Referer) 列表
+    每张图片按重试策略重试，仍失败的放入 retry_queue
+    任务被取消时尚未开始的图片直接跳过（不记为失败），已开始的照常下载并记录，全部收尾后抛出 JobCancelled
+    被图片过滤器拒绝的图片既不算成功也不算失败，记为 skipped，续爬时不再请求
+    :return: (成功数量, 仍失败的页码集合)
+    """
+    limiter = HostLimiter(per_host)
+
+    def worker(page_num, idx, img_url, referer):
+        filename = build_image_filename(img_url, page_num, idx)
+        filepath = os.path.join(save_dir, filename)
+
+        def attempt():
+            # 退避等待期间不占用该主机的并发名额，也不占用调度器的全局下载名额
+            with limiter.get(img_url), control.slot() if control is not None else nullcontext():
+                return download_image(img_url, filepath, referer, chunk_size=chunk_size, store=store,
+                                      image_filter=image_filter)
+
+        if control is not None:
+            control.checkpoint()
+        skipped = call_with_retry(attempt, img_url, wait_for_circuit=wait_for_circuit)
+        return filename, skipped
+
+    success_count = 0
+    failed_pages = set()
+    cancelled = False
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(worker, *job): job for job in jobs}
+
+        for future in as_completed(futures):
+            page_num, idx, img_url, referer = futures[future]
+            try:
+                filename, skipped = future.result()
+                error = None
+                if skipped is None:
+                    success_count += 1
+                    get_metrics().inc('images_total', result='ok')
+                else:
+                    filename = None
+                    get_metrics().inc('images_total', result='skipped')
+            except JobCancelled:
+                cancelled = True
+                continue
+            except Exception as e:
+                filename = skipped = None
+                error = e
+                failed_pages.add(page_num)
+                get_metrics().inc('images_total', result='failed')
+                if retry_queue is not None:
+                    retry_queue.add_image(page_num, img_url, idx, referer, e)
+
+            if journal is not None:
+                if skipped is not None:
+                    journal.record_image(page_num, img_url, None, IMAGE_SKIPPED, skipped)
+                elif error is None:
+                    journal.record_image(page_num, img_url, filename, IMAGE_DONE)
+                else:
+                    journal.record_image(page_num, img_url, None, IMAGE_FAILED, str(error))
+
+            if on_result:
+                on_result(idx, img_url, filename, error)
+
+    if store is not None:
+        store.save()
+
+    if cancelled:
+        raise JobCancelled()
+    return success_count, failed_pages
+
+
+def download_images(img_urls, page_num, save_dir, referer,
+                    max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                    chunk_size=DEFAULT_CHUNK_SIZE, store=None, journal=None, on_result=None,
+                    retry_queue=None, control=None, image_filter=None):
+    """
+    使用有界线程池并发下载一页的全部图片
+    :param img_urls: 图片绝对地址列表
+    :param referer: 下载时携带的 Referer，防止防盗链拦截
+    :param chunk_size: 流式写盘的块大小（字节）
+    :param store: 可选的 ImageStore，启用跨页去重
+    :param journal: 可选的 CrawlJournal，跳过已完成的图片并记录每张图片的状态
+    :param on_result: 每张图片完成后的回调 on_result(idx, img_url, filename, error)，
+                      在调用线程中执行，error 为 None 表示成功，filename 与 error 都为 None 表示被过滤器跳过
+    :param retry_queue: 可选的 RetryQueue，重试用尽仍失败的图片留到整轮结束后再试
+    :param control: 可选的 JobControl，每张图片开始前检查暂停 / 取消，并占用调度器的全局下载名额
+    :param image_filter: 本次任务的 ImageFilter，按响应头过滤，未给出时使用共享的过滤器
+    :return: 成功下载的数量
+    """
+    # 断点续爬：日志中已完成或已被过滤的图片不再发起网络请求
+    done_urls = journal.done_images(page_num) if journal is not None else {}
+
+    success_count = 0
+    jobs = []
+    for idx, img_url in enumerate(img_urls, 1):
+        if img_url in done_urls:
+            skipped = done_urls[img_url] == IMAGE_SKIPPED
+            if not skipped:
+                success_count += 1
+            if on_result:
+                on_result(idx, img_url, None if skipped else build_image_filename(img_url, page_num, idx), None)
+            continue
+        jobs.append((page_num, idx, img_url, referer))
+
+    downloaded, _ = _download_jobs(
+        jobs, save_dir, max_workers, per_host, chunk_size, store, journal, on_result, retry_queue, control=control,
+        image_filter=image_filter
+    )
+    return success_count + downloaded
+
+
+def retry_failed_images(retry_queue, save_dir, max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                        chunk_size=DEFAULT_CHUNK_SIZE, store=None, journal=None, on_result=None,
+                        leftover=None, control=None, image_filter=None):
+    """
+    收尾重试：重新下载重试队列中的失败图片，主机仍在熔断时等待冷却结束
+    失败图片全部补齐的页面在日志中标记为完成
+    :param leftover: 可选的 RetryQueue，收集这一轮仍然失败的图片
+    :param control: 可选的 JobControl，见 download_images
+    :param image_filter: 见 download_images
+    :return: 成功补齐的数量
+    """
+    items = retry_queue.take(RETRY_IMAGE)
+    if not items:
+        return 0
+
+    jobs = [(item.page_num, item.idx, item.url, item.referer) for item in items]
+    success_count, failed_pages = _download_jobs(
+        jobs, save_dir, max_workers, per_host, chunk_size, store, journal, on_result, leftover,
+        wait_for_circuit=True, control=control, image_filter=image_filter
+    )
+
+    if journal is not None:
+        for page_num, page_url in {item.page_num: item.referer for item in items}.items():
+            if page_num not in failed_pages:
+                journal.record_page(page_num, page_url, PAGE_DONE)
+
+    return success_count
@@ -0,0 +1,65 @@
+import os
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment
+from openpyxl.utils import get_column_letter
+
+# 未在 column_widths 中指定的列宽
+DEFAULT_COLUMN_WIDTH = 15
+
+# 共享样式对象：所有单元格引用同一份字体 / 对齐方式，工作簿里只登记一次
+HEADER_FONT = Font(bold=True)
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='center', wrap_text=True)
+BODY_ALIGNMENT = Alignment(vertical='top', wrap_text=True)
+
+
+def _styled_cell(ws, value, font=None, alignment=None):
+    cell = WriteOnlyCell(ws, value=value)
+    if font is not None:
+        cell.font = font
+    if alignment is not None:
+        cell.alignment = alignment
+    return cell
+
+
+def write_excel(file_path, records, column_widths, columns=None, sheet_title='Sheet1'):
+    """
+    单次流式写出带排版的 Excel 报表（openpyxl write-only 模式）
+    表头加粗居中、首行冻结、列宽与自动换行在写入时一并设置，不再回读文件二次美化；
+    数据行逐行写入临时文件，内存占用不随行数增长
+    :param file_path: 输出文件路径（先写同目录临时文件，完成后原子替换）
+    :param records: 字典的可迭代对象，可以是生成器
+    :param column_widths: 字典，键为列名，值为列宽
+    :param columns: 列顺序，默认按 column_widths 的键顺序
+    :return: 写入的数据行数
+    """
+    columns = list(columns or column_widths)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+
+    # 列宽与冻结窗格必须在写入第一行之前设置
+    ws.freeze_panes = 'A2'
+    for col_idx, name in enumerate(columns, start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = column_widths.get(name, DEFAULT_COLUMN_WIDTH)
+
+    ws.append([_styled_cell(ws, name, HEADER_FONT, HEADER_ALIGNMENT) for name in columns])
+
+    count = 0
+    for record in records:
+        ws.append([_styled_cell(ws, record.get(name), alignment=BODY_ALIGNMENT) for name in columns])
+        count += 1
+
+    tmp_path = file_path + '.tmp'
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return count
@@ -0,0 +1,235 @@
+import re
+from importlib import import_module
+from importlib.util import find_spec
+from urllib.parse import urljoin
+
+from image_filter import PICTURE_SRCSET
+from metrics import STAGE_NEXT_LINK, STAGE_PARSE, get_metrics
+
+# 常见的"下一页"关键词，预编译为一个正则，单次扫描即可判断
+NEXT_KEYWORDS = ['下一页', '下页', 'next', 'Next', 'NEXT', '›', '»', '→']
+NEXT_LINK_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in NEXT_KEYWORDS))
+
+# 列表页只需要这几类标签：<img> 取图片地址，<picture> 连同其中的 <source> 提供高分辨率候选，<a> 找下一页
+LISTING_TAGS = ('img', 'picture', 'a')
+
+
+def _has_module(name):
+    """只查找不导入：bs4 / lxml / selectolax 都在第一次解析时才加载，缩短启动时间"""
+    try:
+        return find_spec(name) is not None
+    except ImportError:
+        return False
+
+
+# BeautifulSoup 的树构建器：有 lxml 时用 C 实现的 lxml，否则退回标准库 html.parser
+SOUP_BUILDER = 'lxml' if _has_module('lxml') else 'html.parser'
+
+
+def make_soup(markup, parse_only=None):
+    """
+    构建 BeautifulSoup 树（快速路径：lxml 构建器 + SoupStrainer 只保留需要的标签）
+    :param parse_only: 标签名、标签名元组或 SoupStrainer，None 表示解析整棵树
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    if parse_only is not None and not isinstance(parse_only, SoupStrainer):
+        parse_only = SoupStrainer(list(parse_only) if isinstance(parse_only, (tuple, list)) else parse_only)
+    return BeautifulSoup(markup, SOUP_BUILDER, parse_only=parse_only)
+
+
+class SoupBackend:
+    """BeautifulSoup 解析后端（lxml 或 html.parser 构建器）"""
+
+    name = 'bs4'
+
+    def parse(self, markup, tags=None):
+        return make_soup(markup, parse_only=tags)
+
+    def images(self, doc):
+        images = []
+        for img in doc.find_all('img'):
+            attrs = {key: ' '.join(value) if isinstance(value, list) else value for key, value in img.attrs.items()}
+            # lxml 会把 <source> 当成容器，<img> 不一定是 <picture> 的直接子节点
+            picture = img.find_parent('picture')
+            if picture is not None:
+                srcsets = [source.get('srcset') or source.get('data-srcset') for source in picture.find_all('source')]
+                attrs[PICTURE_SRCSET] = ', '.join(srcset for srcset in srcsets if srcset)
+            images.append(attrs)
+        return images
+
+    def links(self, doc):
+        for link in doc.find_all('a', href=True):
+            yield (
+                link['href'],
+                link.get_text(strip=True),
+                link.get('title', ''),
+                ' '.join(link.get('class', []))
+            )
+
+    def select(self, doc, selector):
+        return [
+            {key: ' '.join(value) if isinstance(value, list) else value for key, value in node.attrs.items()}
+            for node in doc.select(selector)
+        ]
+
+    def select_nodes(self, doc, selector):
+        for node in doc.select(selector):
+            yield (
+                node.name,
+                {key: ' '.join(value) if isinstance(value, list) else value for key, value in node.attrs.items()},
+                node.get_text(strip=True)
+            )
+
+
+class SelectolaxBackend:
+    """selectolax (lexbor) 解析后端：C 实现的 HTML5 解析器，适合大列表页"""
+
+    name = 'selectolax'
+
+    # lexbor 模块是否可用：第一次解析时才导入确认（旧版 selectolax 没有 lexbor），None 表示尚未确认
+    _available = None
+
+    @classmethod
+    def available(cls):
+        if cls._available is None:
+            try:
+                import_module('selectolax.lexbor')
+                cls._available = True
+            except ImportError:
+                cls._available = False
+        return cls._available
+
+    def parse(self, markup, tags=None):
+        from selectolax.lexbor import LexborHTMLParser
+
+        # 字节流按 <meta charset> / BOM 探测编码（例如 GBK 站点），统一转成 str
+        if isinstance(markup, bytes):
+            from bs4.dammit import UnicodeDammit
+
+            markup = UnicodeDammit(markup, is_html=True).unicode_markup
+        return LexborHTMLParser(markup)
+
+    def images(self, doc):
+        images = []
+        for node in doc.css('img'):
+            attrs = {key: value or '' for key, value in node.attributes.items()}
+            parent = node.parent
+            if parent is not None and parent.tag == 'picture':
+                srcsets = [source.attributes.get('srcset') or source.attributes.get('data-srcset')
+                           for source in parent.css('source')]
+                attrs[PICTURE_SRCSET] = ', '.join(srcset for srcset in srcsets if srcset)
+            images.append(attrs)
+        return images
+
+    def links(self, doc):
+        for node in doc.css('a[href]'):
+            attrs = node.attributes
+            yield (
+                attrs.get('href') or '',
+                node.text(strip=True),
+                attrs.get('title') or '',
+                attrs.get('class') or ''
+            )
+
+    def select(self, doc, selector):
+        return [
+            {key: value or '' for key, value in node.attributes.items()}
+            for node in doc.css(selector)
+        ]
+
+    def select_nodes(self, doc, selector):
+        for node in doc.css(selector):
+            yield (
+                node.tag,
+                {key: value or '' for key, value in node.attributes.items()},
+                node.text(strip=True)
+            )
+
+
+BACKENDS = {
+    'bs4': SoupBackend,
+    'selectolax': SelectolaxBackend,
+}
+
+# 默认后端：装了 selectolax 用它，否则用 BeautifulSoup
+# （只查找顶层包：查找 selectolax.lexbor 会导入 selectolax 本身，lexbor 是否可用留到第一次解析时确认）
+DEFAULT_BACKEND = 'selectolax' if _has_module('selectolax') else 'bs4'
+
+_backend = BACKENDS[DEFAULT_BACKEND]()
+
+
+def set_backend(name):
+    """切换全局解析后端（'bs4' 或 'selectolax'）"""
+    global _backend
+
+    if name not in BACKENDS:
+        raise ValueError(f"未知的解析后端: {name}，可选: {', '.join(BACKENDS)}")
+    _backend = BACKENDS[name]()
+
+
+def get_backend():
+    """当前解析后端；selectolax 的 lexbor 模块不可用时退回 BeautifulSoup"""
+    global _backend
+
+    if isinstance(_backend, SelectolaxBackend) and not _backend.available():
+        _backend = SoupBackend()
+    return _backend
+
+
+def match_next_link(links, base_url):
+    """
+    单次扫描找下一页：links 为 (href, 文本, title, class) 序列，
+    三处任一命中关键词正则即返回该链接的绝对地址
+    """
+    for href, text, title, css_class in links:
+        if NEXT_LINK_PATTERN.search(text) or NEXT_LINK_PATTERN.search(title) or NEXT_LINK_PATTERN.search(css_class):
+            return urljoin(base_url, href)
+    return None
+
+
+class Document:
+    """与后端无关的已解析页面"""
+
+    def __init__(self, backend, tree):
+        self.backend = backend
+        self.tree = tree
+
+    def images(self):
+        """按出现顺序返回每个 <img> 的属性字典"""
+        return self.backend.images(self.tree)
+
+    def links(self):
+        return self.backend.links(self.tree)
+
+    def next_link(self, base_url):
+        return match_next_link(self.links(), base_url)
+
+    def select(self, selector):
+        """按 CSS 选择器返回匹配节点的属性字典"""
+        return self.backend.select(self.tree, selector)
+
+    def select_nodes(self, selector):
+        """
+        按文档顺序产出匹配节点的 (标签名, 属性字典, 文本)
+        选择器可以用逗号组合多个，一次扫描取出一条记录的全部字段
+        """
+        return self.backend.select_nodes(self.tree, selector)
+
+
+def parse_html(markup, tags=None, backend=None):
+    """
+    用当前后端解析页面
+    :param tags: 只需要的标签名元组（仅 BeautifulSoup 后端据此裁剪，selectolax 本身足够快）
+    """
+    backend = backend or get_backend()
+    with get_metrics().timer(STAGE_PARSE):
+        return Document(backend, backend.parse(markup, tags))
+
+
+def find_next_link(doc, base_url):
+    """从 Document 或 BeautifulSoup 树中找下一页链接"""
+    with get_metrics().timer(STAGE_NEXT_LINK):
+        if isinstance(doc, Document):
+            return doc.next_link(base_url)
+        return match_next_link(SoupBackend().links(doc), base_url)
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# 默认缓存目录与容量上限（字节）
+DEFAULT_CACHE_DIR = '.http_cache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 随缓存一起保存的响应头（正文已解压，不能保存 Content-Encoding）
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class HttpCache:
+    """
+    磁盘 HTTP 条件请求缓存
+    保存响应正文与校验信息（ETag / Last-Modified），再次请求时携带 If-None-Match / If-Modified-Since，
+    服务器返回 304 时直接复用缓存正文；总大小超过上限时按最近最少使用淘汰
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # 内存中的 LRU 账本：键 -> (正文大小, 最近访问时间)
+        self._entries = {}
+        for name in os.listdir(cache_dir):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-5]
+            meta = self._read_meta(key)
+            if meta is not None and os.path.exists(self._body_path(key)):
+                self._entries[key] = (meta.get('size', 0), meta.get('last_access', 0))
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key + '.body')
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, key, meta):
+        tmp_path = self._meta_path(key) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self._meta_path(key))
+
+    def _remove(self, key):
+        for path in (self._body_path(key), self._meta_path(key)):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self._entries.pop(key, None)
+
+    def _evict(self):
+        """总大小超过上限时，从最久未访问的条目开始删除"""
+        total = sum(size for size, _ in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            self._remove(key)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def validators(self, url):
+        """返回该 URL 的条件请求头，没有缓存时返回空字典"""
+        key = self._key(url)
+        with self._lock:
+            if key not in self._entries:
+                return {}
+            meta = self._read_meta(key)
+
+        headers = {}
+        if meta:
+            if meta['headers'].get('ETag'):
+                headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+        return headers
+
+    def load(self, url, fresh_headers=None):
+        """
+        服务器返回 304 后读取缓存：返回 (正文, 响应头字典)，缓存已丢失时返回 (None, None)
+        :param fresh_headers: 304 响应头，其中新的校验信息会写回缓存
+        """
+        key = self._key(url)
+        with self._lock:
+            meta = self._read_meta(key)
+            try:
+                with open(self._body_path(key), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                body = None
+            if meta is None or body is None:
+                self._remove(key)
+                return None, None
+
+            for name in ('ETag', 'Last-Modified'):
+                if fresh_headers and fresh_headers.get(name):
+                    meta['headers'][name] = fresh_headers[name]
+            meta['last_access'] = time.time()
+            self._write_meta(key, meta)
+            self._entries[key] = (meta['size'], meta['last_access'])
+
+        return body, meta['headers']
+
+    def put(self, url, headers, body):
+        """保存带校验信息的响应，服务器未提供 ETag / Last-Modified 时不缓存"""
+        kept = {name: headers[name] for name in KEPT_HEADERS if headers.get(name)}
+        if 'ETag' not in kept and 'Last-Modified' not in kept:
+            return
+
+        key = self._key(url)
+        meta = {'url': url, 'headers': kept, 'size': len(body), 'last_access': time.time()}
+        with self._lock:
+            tmp_path = self._body_path(key) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, self._body_path(key))
+            self._write_meta(key, meta)
+            self._entries[key] = (meta['size'], meta['last_access'])
+            self._evict()
+
+    def get(self, session, url, **kwargs):
+        """通过 requests 会话发起带条件头的 GET，304 时返回由缓存正文构造的 200 响应"""
+        headers = dict(kwargs.pop('headers', None) or {})
+        headers.update(self.validators(url))
+        response = session.get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304:
+            body, cached_headers = self.load(url, response.headers)
+            if body is None:
+                # 缓存被外部删除：去掉条件头重新获取完整正文，再按普通 200 写回缓存
+                headers.pop('If-None-Match', None)
+                headers.pop('If-Modified-Since', None)
+                response = session.get(url, headers=headers, **kwargs)
+            else:
+                return self._build_response(response, body, cached_headers)
+
+        if response.ok:
+            self.put(url, response.headers, response.content)
+        return response
+
+    @staticmethod
+    def _build_response(not_modified, body, cached_headers):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response._content = body
+        response.headers = CaseInsensitiveDict(cached_headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response.from_cache = True
+        return response
@@ -0,0 +1,155 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, HttpCache
+from metrics import STAGE_FETCH, get_metrics
+from rate_limiter import get_rate_limiter
+from retry_policy import call_with_retry
+
+# 战术伪装：所有抓取器共用的默认请求头
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
+}
+
+# 代理分流预设：Clash 隐秘通道 / 国内直连（显式置空以绕过系统代理）
+CLASH_PROXIES = {"http": "http://127.0.0.1:7897", "https": "http://127.0.0.1:7897"}
+DIRECT_PROXIES = {"http": None, "https": None}
+
+# 连接池参数：缓存的主机连接池个数 / 每个主机保持的 keep-alive 连接数
+DEFAULT_POOL_CONNECTIONS = 16
+DEFAULT_POOL_MAXSIZE = 16
+
+_lock = threading.Lock()
+_session = None
+_pool_config = {
+    'pool_connections': DEFAULT_POOL_CONNECTIONS,
+    'pool_maxsize': DEFAULT_POOL_MAXSIZE,
+    'host_pool_sizes': {},
+}
+
+_cache = None
+_cache_config = {
+    'enabled': True,
+    'cache_dir': DEFAULT_CACHE_DIR,
+    'max_bytes': DEFAULT_MAX_BYTES,
+}
+
+
+class PoliteSession(requests.Session):
+    """每个请求发出前经过按主机的自适应限速器，收到响应后把状态码反馈给限速器"""
+
+    def request(self, method, url, *args, **kwargs):
+        limiter = get_rate_limiter()
+        limiter.wait(url)
+        response = super().request(method, url, *args, **kwargs)
+        limiter.feedback(url, response.status_code, response.headers.get('Retry-After'))
+        get_metrics().inc('http_requests_total', status=response.status_code)
+        return response
+
+
+def _build_session():
+    session = PoliteSession()
+    session.headers.update(DEFAULT_HEADERS)
+
+    adapter = HTTPAdapter(
+        pool_connections=_pool_config['pool_connections'],
+        pool_maxsize=_pool_config['pool_maxsize']
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    # 为指定主机单独挂载更大/更小的连接池（前缀越长匹配优先级越高）
+    for host, size in _pool_config['host_pool_sizes'].items():
+        host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        session.mount(f'http://{host}/', host_adapter)
+        session.mount(f'https://{host}/', host_adapter)
+
+    return session
+
+
+def configure_pool(pool_connections=None, pool_maxsize=None, host_pool_sizes=None):
+    """
+    调整共享会话的连接池大小，下次 get_session() 时生效
+    :param pool_connections: 缓存的主机连接池个数
+    :param pool_maxsize: 每个主机保持的连接数（应不小于下载并发数）
+    :param host_pool_sizes: 字典，键为主机名，值为该主机的连接池大小
+    """
+    global _session
+
+    with _lock:
+        if pool_connections is not None:
+            _pool_config['pool_connections'] = pool_connections
+        if pool_maxsize is not None:
+            _pool_config['pool_maxsize'] = pool_maxsize
+        if host_pool_sizes is not None:
+            _pool_config['host_pool_sizes'] = dict(host_pool_sizes)
+
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    """返回进程内共享的 keep-alive 会话（页面、图片、情报任务共用）"""
+    global _session
+
+    with _lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def configure_cache(enabled=None, cache_dir=None, max_bytes=None):
+    """
+    调整页面条件请求缓存，下次 fetch() 时生效
+    :param enabled: 是否启用缓存
+    :param cache_dir: 缓存目录
+    :param max_bytes: 缓存总大小上限（字节），超出后按 LRU 淘汰
+    """
+    global _cache
+
+    with _lock:
+        if enabled is not None:
+            _cache_config['enabled'] = enabled
+        if cache_dir is not None:
+            _cache_config['cache_dir'] = cache_dir
+        if max_bytes is not None:
+            _cache_config['max_bytes'] = max_bytes
+        _cache = None
+
+
+def get_cache():
+    """返回共享的 HttpCache，缓存被禁用时返回 None"""
+    global _cache
+
+    with _lock:
+        if not _cache_config['enabled']:
+            return None
+        if _cache is None:
+            _cache = HttpCache(_cache_config['cache_dir'], _cache_config['max_bytes'])
+        return _cache
+
+
+def fetch(url, **kwargs):
+    """
+    通过共享会话获取页面：启用缓存时携带 ETag / Last-Modified 条件头，
+    未变化的页面（304）直接复用磁盘缓存正文；
+    超时、断连、429 与 5xx 按重试策略退避重试，重试用尽后抛出最后一次的异常
+    """
+    cache = get_cache()
+
+    def attempt():
+        metrics = get_metrics()
+        with metrics.timer(STAGE_FETCH):
+            if cache is None:
+                response = get_session().get(url, **kwargs)
+            else:
+                response = cache.get(get_session(), url, **kwargs)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        metrics.inc('bytes_total', len(response.content), kind='page')
+        return response
+
+    return call_with_retry(attempt, url)
@@ -0,0 +1,271 @@
+import re
+import mimetypes
+from urllib.parse import urljoin, urlparse
+
+# 解析后端把 <picture> 中各 <source> 的 srcset 合并到 <img> 属性字典的这个键下
+PICTURE_SRCSET = 'data-picture-srcset'
+
+# 过滤规则中的类型简写：jpg / png 等展开为完整的 MIME 类型
+MIME_ALIASES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+    'bmp': 'image/bmp',
+    'svg': 'image/svg+xml',
+}
+
+# 过滤规则名称（--filter / GUI 过滤规则输入框）
+FILTER_RULES = ('min-size', 'max-size', 'min-width', 'min-height', 'types', 'include', 'exclude')
+
+# 规则之间的逗号：只有后面紧跟 "规则名=" 的逗号才是分隔符，正则里的逗号（如 \d{1,3}）原样保留
+RULE_SEPARATOR = re.compile(r',(?=\s*(?:%s)\s*=)' % '|'.join(map(re.escape, FILTER_RULES)))
+
+SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 * 1024, 'mb': 1024 * 1024}
+SIZE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*$')
+DESCRIPTOR_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)([wx])$')
+
+
+class ImageRejected(Exception):
+    """图片不满足过滤条件（下载途中发现时抛出，临时文件随之删除）"""
+
+
+def parse_size(text):
+    """解析字节数，支持 k / m 后缀，例如 "50k"、"2.5M" """
+    match = SIZE_PATTERN.match(text)
+    if not match or match.group(2).lower() not in SIZE_UNITS:
+        raise ValueError(f"invalid size '{text}', expected e.g. 50k or 2M")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+def _int_attr(value):
+    """width / height 属性只认纯数字（"100%"、"auto" 等视为未声明）"""
+    value = (value or '').strip()
+    if value.endswith('px'):
+        value = value[:-2]
+    return int(value) if value.isdigit() else None
+
+
+def parse_srcset(value):
+    """
+    解析 srcset，返回 [(地址, 宽度描述符, 倍率描述符)]，未写描述符时两者都为 None
+    地址本身可能含逗号（例如 data: URI），按规范逐个读取"地址 + 描述符"而不是简单按逗号切分
+    """
+    candidates = []
+    pos = 0
+    length = len(value or '')
+    while pos < length:
+        while pos < length and (value[pos].isspace() or value[pos] == ','):
+            pos += 1
+        start = pos
+        while pos < length and not value[pos].isspace():
+            pos += 1
+        url = value[start:pos]
+        descriptor = ''
+        if url.endswith(','):
+            url = url.rstrip(',')
+        else:
+            start = pos
+            while pos < length and value[pos] != ',':
+                pos += 1
+            descriptor = value[start:pos].strip()
+        if not url:
+            continue
+
+        width = density = None
+        match = DESCRIPTOR_PATTERN.match(descriptor)
+        if match:
+            if match.group(2) == 'w':
+                width = int(float(match.group(1)))
+            else:
+                density = float(match.group(1))
+        candidates.append((url, width, density))
+    return candidates
+
+
+class ImageFilter:
+    """
+    下载前的图片过滤器
+    列表页阶段：从 src / data-src / srcset / <picture> 中挑选分辨率最高的地址，
+    按 URL 包含 / 排除规则、扩展名推断的类型和声明的尺寸先筛掉一批，不发起任何请求；
+    下载阶段：收到响应头后按 Content-Length 与 Content-Type 判断，不满足条件时不读取响应体
+    """
+
+    def __init__(self, min_bytes=0, max_bytes=None, min_width=0, min_height=0, mime_types=None,
+                 include=(), exclude=()):
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.min_width = min_width
+        self.min_height = min_height
+        self.mime_types = frozenset(mime_types) if mime_types else None
+        self.include = [re.compile(pattern) for pattern in include]
+        self.exclude = [re.compile(pattern) for pattern in exclude]
+
+    def candidates(self, attrs):
+        """<img> 的全部候选地址 [(地址, 宽度, 倍率)]：srcset 在前，src / data-src 作为 1x 候选"""
+        candidates = []
+        for key in (PICTURE_SRCSET, 'srcset', 'data-srcset'):
+            candidates.extend(parse_srcset(attrs.get(key)))
+        for key in ('src', 'data-src'):
+            url = (attrs.get(key) or '').strip()
+            # 懒加载占位图常用 data: URI，真实地址在 data-src 中
+            if url and not url.startswith('data:'):
+                candidates.append((url, None, None))
+                break
+        return [candidate for candidate in candidates if not candidate[0].startswith('data:')]
+
+    def select(self, attrs, base_url):
+        """
+        挑选一个 <img> 要下载的地址
+        :return: (绝对地址, None) 或 (None, 跳过原因)；没有任何可用地址时返回 (None, None)
+        """
+        candidates = self.candidates(attrs)
+        if not candidates:
+            return None, None
+
+        declared_width = _int_attr(attrs.get('width'))
+        declared_height = _int_attr(attrs.get('height'))
+
+        def resolution(candidate):
+            # 宽度描述符直接比较；倍率按声明宽度换算（未声明宽度时只比较倍率）
+            _, width, density = candidate
+            if width is not None:
+                return width, 0.0
+            density = density or 1.0
+            return (declared_width or 0) * density, density
+
+        url, width, density = max(candidates, key=resolution)
+        url = urljoin(base_url, url)
+
+        reason = self.check_url(url)
+        if reason:
+            return None, reason
+
+        # 估算实际像素：宽度描述符优先，其次按倍率放大声明的宽高；
+        # 只有宽度描述符、没有声明宽度时无从换算高度，不按高度过滤
+        scale = density or 1.0
+        height = None
+        if width is None:
+            if declared_width is not None:
+                width = int(declared_width * scale)
+            if declared_height is not None:
+                height = int(declared_height * scale)
+        elif declared_width and declared_height is not None:
+            height = int(declared_height * width / declared_width)
+        if self.min_width and width is not None and width < self.min_width:
+            return None, f"width {width} < {self.min_width}"
+        if self.min_height and height is not None and height < self.min_height:
+            return None, f"height {height} < {self.min_height}"
+        return url, None
+
+    def check_url(self, url):
+        """URL 包含 / 排除规则与按扩展名推断的类型，不满足时返回原因"""
+        if self.include and not any(pattern.search(url) for pattern in self.include):
+            return "not matched by include rules"
+        for pattern in self.exclude:
+            if pattern.search(url):
+                return f"excluded by '{pattern.pattern}'"
+        if self.mime_types is not None:
+            guessed, _ = mimetypes.guess_type(urlparse(url).path)
+            if guessed and guessed.startswith('image/') and guessed not in self.mime_types:
+                return f"type {guessed} not allowed"
+        return None
+
+    def select_urls(self, images, base_url):
+        """
+        从页面的 <img> 属性字典列表中挑出要下载的地址（保持页面顺序、去掉重复）
+        :return: (地址列表, 被过滤掉的数量)
+        """
+        urls = []
+        seen = set()
+        skipped = 0
+        for attrs in images:
+            url, reason = self.select(attrs, base_url)
+            if url is None:
+                if reason:
+                    skipped += 1
+                continue
+            if url not in seen:
+                seen.add(url)
+                urls.append(url)
+        return urls, skipped
+
+    def check_headers(self, headers):
+        """收到响应头后调用：Content-Length / Content-Type 不满足条件时抛出 ImageRejected"""
+        length = headers.get('Content-Length')
+        if length and length.isdigit():
+            self.check_size(int(length), complete=True)
+
+        if self.mime_types is not None:
+            content_type = (headers.get('Content-Type') or '').split(';')[0].strip().lower()
+            if content_type and content_type not in self.mime_types:
+                raise ImageRejected(f"type {content_type} not allowed")
+
+    def check_size(self, size, complete=False):
+        """
+        检查已知的字节数：下载途中超过上限立即中止；complete 为 True 时同时检查下限
+        没有 Content-Length 的响应只能边下边查，低于下限的在写完后丢弃
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            raise ImageRejected(f"size {size} > {self.max_bytes} bytes")
+        if complete and size < self.min_bytes:
+            raise ImageRejected(f"size {size} < {self.min_bytes} bytes")
+
+
+def parse_filter_spec(spec):
+    """
+    解析过滤规则，例如 "min-size=50k,min-width=800,types=jpg|png,exclude=qqonline|/icons/"
+    语法：RULE=VALUE[,RULE=VALUE...]，RULE 为 FILTER_RULES 之一
+      - 只有后面紧跟 "规则名=" 的逗号才分隔规则，正则中的逗号原样保留："include=/[0-9]{2,4}/,min-size=5k"
+      - types 的值用 | 分隔多个类型；include / exclude 的值是一整条正则，其中的 | 是正则的"或"
+      - include / exclude 可重复出现：任一 include 匹配即保留，任一 exclude 匹配即跳过；其余规则以最后一次为准
+    :param spec: 规则字符串，或多条规则字符串（例如多次传入的 --filter），合并解析
+    :return: ImageFilter 的关键字参数字典
+    """
+    specs = [spec] if isinstance(spec, str) else spec
+    options = {}
+    for part in (part for spec in specs for part in RULE_SEPARATOR.split(spec.strip().strip(','))):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.partition('=')
+        name, value = name.strip(), value.strip()
+        if not sep or name not in FILTER_RULES or not value:
+            raise ValueError(f"invalid filter rule '{part}', expected RULE=VALUE with RULE in {', '.join(FILTER_RULES)}")
+
+        if name == 'min-size':
+            options['min_bytes'] = parse_size(value)
+        elif name == 'max-size':
+            options['max_bytes'] = parse_size(value)
+        elif name in ('min-width', 'min-height'):
+            if not value.isdigit():
+                raise ValueError(f"invalid pixel count in '{part}'")
+            options[name.replace('-', '_')] = int(value)
+        elif name == 'types':
+            types = [MIME_ALIASES.get(item.strip().lower(), item.strip().lower()) for item in value.split('|')]
+            options['mime_types'] = [item for item in types if item]
+        else:
+            try:
+                re.compile(value)
+            except re.error as e:
+                raise ValueError(f"invalid pattern in '{part}': {e}")
+            options.setdefault(name, []).append(value)
+
+    if options.get('max_bytes') is not None and options.get('min_bytes', 0) > options['max_bytes']:
+        raise ValueError("min-size cannot be greater than max-size")
+    return options
+
+
+_filter = ImageFilter()
+
+
+def configure_image_filter(**options):
+    """替换共享的图片过滤器，参数见 ImageFilter（通常来自 parse_filter_spec）"""
+    global _filter
+    _filter = ImageFilter(**options)
+
+
+def get_image_filter():
+    return _filter
@@ -0,0 +1,131 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from downloader import file_mode
+
+# 仓库目录与索引文件（放在保存目录下，以点开头隐藏）
+OBJECTS_DIR = '.objects'
+INDEX_FILE = '.image_index.json'
+
+
+class ObjectWriter:
+    """边写边计算 SHA-256 的写入器，写完后 path 指向仓库中的对象文件"""
+
+    def __init__(self, f):
+        self._f = f
+        self._hash = hashlib.sha256()
+        self.path = None
+
+    def write(self, chunk):
+        self._hash.update(chunk)
+        self._f.write(chunk)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class ImageStore:
+    """
+    内容寻址图片仓库
+    同一份内容只在 .objects/<哈希前两位>/<哈希><扩展名> 存一次，
+    带页码前缀的文件名以硬链接指向它；URL→对象 索引持久化到 .image_index.json，
+    已见过的 URL 直接链接，不再发起网络请求
+    """
+
+    def __init__(self, save_dir):
+        self.save_dir = save_dir
+        self.objects_dir = os.path.join(save_dir, OBJECTS_DIR)
+        self.index_path = os.path.join(save_dir, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        # 索引结构：urls 为 URL→对象名，names 为文件名→对象名（清单）
+        self._index = {'urls': {}, 'names': {}}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._index['urls'].update(data.get('urls', {}))
+                self._index['names'].update(data.get('names', {}))
+            except (OSError, ValueError):
+                # 索引损坏时从空索引开始，对象文件仍可被新下载复用
+                pass
+
+    def _object_path(self, object_name):
+        return os.path.join(self.objects_dir, object_name[:2], object_name)
+
+    def lookup(self, url):
+        """返回该 URL 已入库的对象路径，未见过或对象已被删除时返回 None"""
+        with self._lock:
+            object_name = self._index['urls'].get(url)
+        if object_name:
+            path = self._object_path(object_name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    @contextmanager
+    def new_object(self, ext):
+        """
+        写入一个新对象：先写临时文件并计算哈希，成功后按哈希改名入库，
+        内容已存在时丢弃临时文件，失败时删除临时文件
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, prefix='.', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer = ObjectWriter(f)
+                yield writer
+
+            object_name = writer.hexdigest() + ext.lower()
+            path = self._object_path(object_name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+            else:
+                os.chmod(tmp_path, file_mode())
+                os.replace(tmp_path, path)
+            writer.path = path
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def link(self, url, object_path, filepath):
+        """把对象以硬链接形式放到目标文件名，并记录 URL 与文件名索引"""
+        if not (os.path.exists(filepath) and os.path.samefile(filepath, object_path)):
+            tmp_path = f"{filepath}.{threading.get_ident()}.link"
+            try:
+                os.link(object_path, tmp_path)
+            except OSError:
+                # 文件系统不支持硬链接时退化为复制
+                shutil.copyfile(object_path, tmp_path)
+            os.replace(tmp_path, filepath)
+
+        object_name = os.path.basename(object_path)
+        with self._lock:
+            self._index['urls'][url] = object_name
+            self._index['names'][os.path.basename(filepath)] = object_name
+            self._dirty = True
+
+    def save(self):
+        """把索引原子写回磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._index, ensure_ascii=False)
+            self._dirty = False
+
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.index_path)
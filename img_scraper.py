@@ -1,140 +1,34 @@
-import os
-import requests
-import time
-import random
+import queue
 import tkinter as tk
-from tkinter import scrolledtext, messagebox
-import threading
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-
-
-def find_next_page_link(soup, current_url):
-    """智能查找下一页链接"""
-    # 常见的"下一页"关键词
-    next_keywords = ['下一页', '下页', 'next', 'Next', 'NEXT', '›', '»', '→']
-
-    # 查找所有链接
-    all_links = soup.find_all('a', href=True)
-
-    for link in all_links:
-        link_text = link.get_text(strip=True)
-        link_title = link.get('title', '')
-        link_class = ' '.join(link.get('class', []))
-
-        # 检查链接文本、title 或 class 是否包含"下一页"关键词
-        for keyword in next_keywords:
-            if keyword in link_text or keyword in link_title or keyword in link_class:
-                next_url = urljoin(current_url, link['href'])
-                return next_url
-
-    return None
-
-
-def scrape_images(url, page_num, total_pages, save_dir='images', log_callback=None):
-    """从指定URL抓取所有图片"""
-
-    def log(msg):
-        """统一日志输出"""
-        if log_callback:
-            log_callback(msg)
-        else:
-            print(msg)
-
-    # 伪装浏览器身份（更新为最新 Chrome 版本）
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
-    }
-
-    try:
-        # 获取网页内容
-        log(f"\n{'='*60}")
-        log(f"[*] 正在收割第 {page_num}/{total_pages} 页...")
-        log(f"[+] URL: {url}")
-        log(f"{'='*60}")
-
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        # 防封印护盾：模拟人类浏览速度
-        time.sleep(random.uniform(0.8, 1.5))
-
-        # 解析HTML
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # 提取所有图片标签
-        img_tags = soup.find_all('img')
-
-        if not img_tags:
-            log("[!] 未找到任何图片")
-            return soup, 0
-
-        log(f"[+] 找到 {len(img_tags)} 张图片")
-
-        # 创建保存目录
-        if not os.path.exists(save_dir):
-            os.makedirs(save_dir)
-            log(f"[+] 已创建目录: {save_dir}")
-
-        # 提取图片链接并转换为绝对路径
-        img_urls = []
-        for img in img_tags:
-            img_url = img.get('src') or img.get('data-src')
-            if img_url:
-                # 转换相对路径为绝对路径
-                absolute_url = urljoin(url, img_url)
-                img_urls.append(absolute_url)
-
-        # 下载图片
-        success_count = 0
-        for idx, img_url in enumerate(img_urls, 1):
-            try:
-                # 获取文件名
-                parsed_url = urlparse(img_url)
-                filename = os.path.basename(parsed_url.path)
-
-                # 如果文件名为空或无扩展名，使用序号命名
-                if not filename or '.' not in filename:
-                    filename = f"page{page_num}_image_{idx}.jpg"
-                else:
-                    # 添加页码前缀避免重名
-                    name, ext = os.path.splitext(filename)
-                    filename = f"page{page_num}_{name}{ext}"
-
-                filepath = os.path.join(save_dir, filename)
+from tkinter import scrolledtext, messagebox, ttk
 
-                # 下载图片时添加 Referer 防止防盗链拦截
-                download_headers = headers.copy()
-                download_headers['Referer'] = url
+from crawler import GUI_MESSAGES, crawl
+from downloader import DEFAULT_WORKERS
+from detail_pages import detail_selectors
+from image_filter import ImageFilter, parse_filter_spec
+from metrics import get_metrics, reset_metrics
+from job_scheduler import (DEFAULT_MAX_JOBS, JOB_CANCELLED, JOB_CANCELLING, JOB_DONE, JOB_FAILED, JOB_PAUSED,
+                           JOB_QUEUED, JOB_RUNNING, JobCancelled, JobScheduler, job_save_dir)
 
-                img_response = requests.get(img_url, headers=download_headers, timeout=10)
-                img_response.raise_for_status()
+# GUI 日志：后台线程只往队列里放消息，主线程每隔这么多毫秒批量写入一次文本框
+LOG_FLUSH_INTERVAL_MS = 100
 
-                # 保存图片
-                with open(filepath, 'wb') as f:
-                    f.write(img_response.content)
+# 日志文本框最多保留的行数，超出后丢弃最早的行（长时间挂机内存不再增长）
+LOG_MAX_LINES = 2000
 
-                success_count += 1
-                log(f"[>>] 第{page_num}页 下载进度: {idx}/{len(img_urls)} - {filename}")
+# 任务列表刷新间隔（毫秒）
+JOB_REFRESH_INTERVAL_MS = 500
 
-                # 防封印护盾：每下载几张图片就休息一下
-                if idx % 5 == 0:
-                    time.sleep(random.uniform(0.3, 0.8))
-
-            except Exception as e:
-                log(f"[X] 下载失败 [{img_url}]: {str(e)}")
-                continue
-
-        log(f"[OK] 第 {page_num} 页完成！成功下载 {success_count}/{len(img_urls)} 张图片")
-
-        return soup, success_count
-
-    except requests.exceptions.RequestException as e:
-        log(f"[X] 访问网页失败: {str(e)}")
-        return None, 0
-    except Exception as e:
-        log(f"[X] 发生错误: {str(e)}")
-        return None, 0
+# 任务状态的界面文字
+JOB_STATE_LABELS = {
+    JOB_QUEUED: '排队中',
+    JOB_RUNNING: '运行中',
+    JOB_PAUSED: '已暂停',
+    JOB_CANCELLING: '取消中',
+    JOB_DONE: '已完成',
+    JOB_FAILED: '失败',
+    JOB_CANCELLED: '已取消',
+}
 
 
 def main():
@@ -164,41 +58,16 @@ def main():
         except ValueError:
             print("[X] 请输入有效的数字")
 
+    # 断点续爬：从上次中断处继续
+    resume = input("是否从上次中断处继续？(y/N): ").strip().lower() == 'y'
+
     print(f"\n[*] 开始挂机模式：将自动抓取 {total_pages} 页")
-    print("[*] 防封印护盾已启动，模拟人类浏览速度...")
+    print("[*] 防封印护盾已启动，按主机自适应限速...")
 
     # 创建保存目录
     save_dir = 'images'
 
-    # 开始自动翻页抓取
-    current_url = url
-    total_images = 0
-
-    for page_num in range(1, total_pages + 1):
-        # 抓取当前页
-        soup, success_count = scrape_images(current_url, page_num, total_pages, save_dir)
-        total_images += success_count
-
-        if soup is None:
-            print(f"\n[!] 第 {page_num} 页抓取失败，停止翻页")
-            break
-
-        # 如果还有下一页，查找下一页链接
-        if page_num < total_pages:
-            print(f"\n[?] 正在查找下一页链接...")
-            next_url = find_next_page_link(soup, current_url)
-
-            if next_url:
-                print(f"[+] 找到下一页: {next_url}")
-                current_url = next_url
-
-                # 防封印护盾：翻页前休息一下
-                wait_time = random.uniform(1.5, 3.0)
-                print(f"[Z] 休息 {wait_time:.1f} 秒后继续...")
-                time.sleep(wait_time)
-            else:
-                print(f"[!] 未找到下一页链接，已抓取 {page_num} 页后停止")
-                break
+    total_images = crawl(url, total_pages, save_dir, resume=resume, show_progress=False, messages=GUI_MESSAGES)
 
     # 最终统计
     print(f"\n{'='*60}")
@@ -213,7 +82,7 @@ class CyberScraperGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("4K壁纸赛博收割机 V1.0")
-        self.root.geometry("800x600")
+        self.root.geometry("800x760")
         self.root.resizable(True, True)
 
         # 设置赛博风格配色
@@ -223,8 +92,12 @@ class CyberScraperGUI:
 
         self.root.configure(bg=bg_color)
 
-        # 是否正在运行
-        self.is_running = False
+        # 后台线程写入的日志队列，由主线程定时取走
+        self._log_queue = queue.SimpleQueue()
+
+        # 任务调度器：多个收割任务同时运行或排队，可暂停 / 继续 / 取消
+        self.scheduler = JobScheduler(log=self.log)
+        self._refreshing = False
 
         # 标题
         title_label = tk.Label(
@@ -282,6 +155,122 @@ class CyberScraperGUI:
         self.pages_entry.insert(0, "3")
         self.pages_entry.grid(row=1, column=1, pady=5, padx=10)
 
+        # 并发下载线程数
+        workers_label = tk.Label(
+            input_frame,
+            text="并发线程:",
+            font=("Consolas", 11),
+            bg=bg_color,
+            fg=fg_color
+        )
+        workers_label.grid(row=2, column=0, sticky="w", pady=5)
+
+        self.workers_entry = tk.Entry(
+            input_frame,
+            font=("Consolas", 10),
+            bg=button_color,
+            fg=fg_color,
+            insertbackground=fg_color,
+            width=60
+        )
+        self.workers_entry.insert(0, str(DEFAULT_WORKERS))
+        self.workers_entry.grid(row=2, column=1, pady=5, padx=10)
+
+        # 断点续爬开关
+        self.resume_var = tk.BooleanVar(value=False)
+        resume_check = tk.Checkbutton(
+            input_frame,
+            text="断点续爬（从上次中断处继续）",
+            variable=self.resume_var,
+            font=("Consolas", 10),
+            bg=bg_color,
+            fg=fg_color,
+            selectcolor=button_color,
+            activebackground=bg_color,
+            activeforeground=fg_color
+        )
+        resume_check.grid(row=7, column=1, sticky="w", pady=5, padx=10)
+
+        # 同时运行的任务数
+        jobs_label = tk.Label(
+            input_frame,
+            text="同时任务:",
+            font=("Consolas", 11),
+            bg=bg_color,
+            fg=fg_color
+        )
+        jobs_label.grid(row=3, column=0, sticky="w", pady=5)
+
+        self.jobs_entry = tk.Entry(
+            input_frame,
+            font=("Consolas", 10),
+            bg=button_color,
+            fg=fg_color,
+            insertbackground=fg_color,
+            width=60
+        )
+        self.jobs_entry.insert(0, str(DEFAULT_MAX_JOBS))
+        self.jobs_entry.grid(row=3, column=1, pady=5, padx=10)
+
+        # 下载前的图片过滤规则（留空表示不过滤）
+        filter_label = tk.Label(
+            input_frame,
+            text="过滤规则:",
+            font=("Consolas", 11),
+            bg=bg_color,
+            fg=fg_color
+        )
+        filter_label.grid(row=4, column=0, sticky="w", pady=5)
+
+        self.filter_entry = tk.Entry(
+            input_frame,
+            font=("Consolas", 10),
+            bg=button_color,
+            fg=fg_color,
+            insertbackground=fg_color,
+            width=60
+        )
+        self.filter_entry.grid(row=4, column=1, pady=5, padx=10)
+
+        # 两阶段抓取：详情页链接选择器（留空只下载列表页图片，auto 使用站点预设）与原图选择器
+        detail_label = tk.Label(
+            input_frame,
+            text="详情页链接:",
+            font=("Consolas", 11),
+            bg=bg_color,
+            fg=fg_color
+        )
+        detail_label.grid(row=5, column=0, sticky="w", pady=5)
+
+        self.detail_entry = tk.Entry(
+            input_frame,
+            font=("Consolas", 10),
+            bg=button_color,
+            fg=fg_color,
+            insertbackground=fg_color,
+            width=60
+        )
+        self.detail_entry.grid(row=5, column=1, pady=5, padx=10)
+
+        detail_image_label = tk.Label(
+            input_frame,
+            text="原图选择器:",
+            font=("Consolas", 11),
+            bg=bg_color,
+            fg=fg_color
+        )
+        detail_image_label.grid(row=6, column=0, sticky="w", pady=5)
+
+        self.detail_image_entry = tk.Entry(
+            input_frame,
+            font=("Consolas", 10),
+            bg=button_color,
+            fg=fg_color,
+            insertbackground=fg_color,
+            width=60
+        )
+        self.detail_image_entry.grid(row=6, column=1, pady=5, padx=10)
+
         # 开始收割按钮
         self.start_button = tk.Button(
             root,
@@ -298,6 +287,88 @@ class CyberScraperGUI:
         )
         self.start_button.pack(pady=15)
 
+        # 任务列表：每个任务的状态与进度，选中后可暂停 / 继续 / 取消（未选中时作用于全部任务）
+        jobs_frame = tk.Frame(root, bg=bg_color)
+        jobs_frame.pack(padx=20, fill="x")
+
+        style = ttk.Style(root)
+        style.theme_use('clam')
+        style.configure(
+            "Cyber.Treeview",
+            background="#0d1117",
+            fieldbackground="#0d1117",
+            foreground=fg_color,
+            font=("Consolas", 9)
+        )
+        style.configure("Cyber.Treeview.Heading", background=button_color, foreground=fg_color)
+
+        self.jobs_table = ttk.Treeview(
+            jobs_frame,
+            style="Cyber.Treeview",
+            columns=("id", "state", "progress", "images", "url"),
+            show="headings",
+            height=5
+        )
+        for column, heading, width in (("id", "任务", 50), ("state", "状态", 70), ("progress", "进度", 120),
+                                       ("images", "图片", 60), ("url", "网址", 360)):
+            self.jobs_table.heading(column, text=heading)
+            self.jobs_table.column(column, width=width, anchor="w", stretch=column == "url")
+        self.jobs_table.pack(side="left", fill="x", expand=True)
+
+        buttons_frame = tk.Frame(jobs_frame, bg=bg_color)
+        buttons_frame.pack(side="left", padx=(10, 0))
+        for text, command in (("⏸ 暂停", self.scheduler.pause), ("▶ 继续", self.scheduler.resume),
+                              ("✖ 取消", self.scheduler.cancel)):
+            tk.Button(
+                buttons_frame,
+                text=text,
+                font=("Consolas", 10),
+                bg=button_color,
+                fg=fg_color,
+                activebackground=bg_color,
+                activeforeground=fg_color,
+                command=lambda action=command: self.control_jobs(action),
+                cursor="hand2",
+                width=8
+            ).pack(pady=2)
+
+        # 实时速率（运行期间每秒刷新）
+        self.rate_label = tk.Label(
+            root,
+            text="",
+            font=("Consolas", 10),
+            bg=bg_color,
+            fg=fg_color
+        )
+        self.rate_label.pack()
+
+        # 当前页下载进度条（代替逐张图片的日志行）：显示选中的任务，未选中时显示第一个运行中的任务
+        style.configure(
+            "Cyber.Horizontal.TProgressbar",
+            troughcolor=button_color,
+            background=fg_color,
+            bordercolor=bg_color,
+            lightcolor=fg_color,
+            darkcolor=fg_color
+        )
+        self.progress_bar = ttk.Progressbar(
+            root,
+            style="Cyber.Horizontal.TProgressbar",
+            orient="horizontal",
+            mode="determinate",
+            maximum=1
+        )
+        self.progress_bar.pack(pady=(8, 0), padx=20, fill="x")
+
+        self.progress_label = tk.Label(
+            root,
+            text="",
+            font=("Consolas", 10),
+            bg=bg_color,
+            fg=fg_color
+        )
+        self.progress_label.pack()
+
         # 日志区域标签
         log_label = tk.Label(
             root,
@@ -326,24 +397,52 @@ class CyberScraperGUI:
         self.log("请输入目标网址和抓取页数，然后点击【开始收割】按钮")
         self.log("=" * 80)
 
+        self.flush_log()
+
     def log(self, message):
-        """线程安全的日志输出"""
-        def append():
-            self.log_text.insert(tk.END, message + "\n")
-            self.log_text.see(tk.END)
+        """线程安全的日志输出：只入队，由 flush_log 在主线程批量写入"""
+        self._log_queue.put(message)
 
-        # 使用 after 确保在主线程中更新 GUI
-        self.root.after(0, append)
+    def flush_log(self):
+        """主线程定时任务：一次取走队列中的全部日志，合并为一次插入，并把文本框裁剪到 LOG_MAX_LINES 行"""
+        messages = []
+        try:
+            while True:
+                messages.append(self._log_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if messages:
+            # 一批里超过上限的部分反正会被裁掉，直接跳过
+            if len(messages) > LOG_MAX_LINES:
+                messages = messages[-LOG_MAX_LINES:]
+
+            # 用户向上翻看历史时不强制滚到底部
+            at_bottom = self.log_text.yview()[1] >= 0.999
+            self.log_text.insert(tk.END, "\n".join(messages) + "\n")
+
+            # end-1c 是最后一个换行符所在行，行数 = 该行号 - 1
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+            if at_bottom:
+                self.log_text.see(tk.END)
+
+        job = self.progress_job()
+        if job is not None and job.progress is not None:
+            page_num, done, total = job.progress
+            self.progress_bar.config(maximum=max(total, 1), value=done)
+            self.progress_label.config(text=f"任务 #{job.id} 第 {page_num} 页 下载进度: {done}/{total}")
+
+        self.root.after(LOG_FLUSH_INTERVAL_MS, self.flush_log)
 
     def start_scraping(self):
-        """开始抓取（在后台线程运行）"""
-        if self.is_running:
-            messagebox.showwarning("警告", "收割机正在运行中，请等待完成！")
-            return
-
+        """提交一个收割任务（由调度器在后台线程运行，已有任务在跑时排队或并行）"""
         # 获取输入
         url = self.url_entry.get().strip()
         pages_str = self.pages_entry.get().strip()
+        workers_str = self.workers_entry.get().strip()
+        jobs_str = self.jobs_entry.get().strip()
 
         # 验证输入
         if not url:
@@ -363,89 +462,150 @@ class CyberScraperGUI:
             messagebox.showerror("错误", "请输入有效的页数！")
             return
 
-        # 禁用按钮
-        self.start_button.config(state="disabled", text="⏳ 收割中...")
-        self.is_running = True
+        try:
+            max_workers = int(workers_str)
+            if max_workers <= 0:
+                messagebox.showerror("错误", "并发线程数必须大于0！")
+                return
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的并发线程数！")
+            return
 
-        # 清空日志
-        self.log_text.delete(1.0, tk.END)
+        try:
+            max_jobs = int(jobs_str)
+            if max_jobs <= 0:
+                messagebox.showerror("错误", "同时任务数必须大于0！")
+                return
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的同时任务数！")
+            return
 
-        # 在后台线程运行爬虫
-        thread = threading.Thread(
-            target=self.run_scraper,
-            args=(url, total_pages),
-            daemon=True
+        try:
+            image_filter = ImageFilter(**parse_filter_spec(self.filter_entry.get().strip()))
+        except ValueError as e:
+            messagebox.showerror("错误", f"过滤规则无效：{e}")
+            return
+
+        detail_links = self.detail_entry.get().strip() or None
+        detail_image = self.detail_image_entry.get().strip() or None
+        if detail_image and not detail_links:
+            messagebox.showerror("错误", "填写原图选择器时必须同时填写详情页链接！")
+            return
+        if detail_links:
+            try:
+                detail_selectors(url, detail_links, detail_image)
+            except ValueError as e:
+                messagebox.showerror("错误", f"详情页选择器无效：{e}")
+                return
+
+        if not self.scheduler.active():
+            # 没有任务在跑：清空日志与进度，重新开始统计速率
+            self.log_text.delete(1.0, tk.END)
+            self.progress_bar.config(value=0)
+            self.progress_label.config(text="")
+            reset_metrics()
+
+        # 每个任务单独的保存目录，并行任务的文件名与断点续爬日志互不干扰
+        save_dir = job_save_dir('images', url)
+        resume = self.resume_var.get()
+
+        # 每个任务使用提交时的过滤规则，修改规则后再提交的任务不影响正在运行的任务
+        self.scheduler.set_max_jobs(max_jobs)
+        job = self.scheduler.submit(
+            url, lambda job: self.run_scraper(job, url, total_pages, save_dir, max_workers, resume,
+                                              detail_links, detail_image, image_filter)
+        )
+        self.jobs_table.insert("", tk.END, iid=str(job.id), values=(f"#{job.id}", "", "", "", url))
+        self.log(f"[+] 任务 #{job.id} 已提交: {url} -> {save_dir}")
+
+        if not self._refreshing:
+            self._refreshing = True
+            self.refresh_jobs()
+
+    def control_jobs(self, action):
+        """对选中的任务（未选中时为全部任务）执行暂停 / 继续 / 取消"""
+        selected = {int(iid) for iid in self.jobs_table.selection()} or None
+        action(selected)
+        self.update_job_table()
+
+    def progress_job(self):
+        """进度条显示的任务：选中的第一个任务，否则第一个运行中的任务"""
+        selected = self.jobs_table.selection()
+        if selected:
+            return self.scheduler.get(int(selected[0]))
+        for job in self.scheduler.jobs():
+            if job.state == JOB_RUNNING:
+                return job
+        return None
+
+    def update_job_table(self):
+        for job in self.scheduler.jobs():
+            status = job.status()
+            progress = ''
+            if status['progress'] is not None:
+                page_num, done, total = status['progress']
+                progress = f"第{page_num}页 {done}/{total}"
+            self.jobs_table.item(str(job.id), values=(
+                f"#{job.id}",
+                JOB_STATE_LABELS[status['state']],
+                progress,
+                '' if status['result'] is None else status['result'],
+                status['name']
+            ))
+
+    def refresh_jobs(self):
+        """在主线程中定时刷新任务列表与实时速率，全部任务结束后停止并弹出汇总"""
+        self.update_job_table()
+
+        metrics = get_metrics()
+        pages_per_s, images_per_s, mb_per_s = metrics.rates()
+        self.rate_label.config(
+            text=f"📈 {pages_per_s:.2f} 页/秒 | {images_per_s:.2f} 张/秒 | {mb_per_s:.2f} MB/秒 | "
+                 f"失败重试 {metrics.total('errors_total')} 次"
         )
-        thread.start()
 
-    def run_scraper(self, url, total_pages):
-        """后台线程运行的爬虫逻辑"""
+        if self.scheduler.active():
+            self.root.after(JOB_REFRESH_INTERVAL_MS, self.refresh_jobs)
+            return
+
+        self._refreshing = False
+        jobs = self.scheduler.jobs()
+        done = [job for job in jobs if job.state == JOB_DONE]
+        cancelled = sum(1 for job in jobs if job.state == JOB_CANCELLED)
+        failed = sum(1 for job in jobs if job.state == JOB_FAILED)
+        messagebox.showinfo(
+            "收割完成",
+            f"全部任务已结束：完成 {len(done)} 个，共下载 {sum(job.result for job in done)} 张图片"
+            f"{f'；取消 {cancelled} 个（勾选断点续爬可继续）' if cancelled else ''}"
+            f"{f'；失败 {failed} 个' if failed else ''}"
+        )
+
+    def run_scraper(self, job, url, total_pages, save_dir, max_workers=DEFAULT_WORKERS, resume=False,
+                    detail_links=None, detail_image=None, image_filter=None):
+        """调度器线程中运行的爬虫逻辑，返回成功下载的图片数"""
         try:
-            self.log(f"\n[*] 开始挂机模式：将自动抓取 {total_pages} 页")
-            self.log("[*] 防封印护盾已启动，模拟人类浏览速度...")
-
-            # 创建保存目录
-            save_dir = 'images'
-
-            # 开始自动翻页抓取
-            current_url = url
-            total_images = 0
-
-            for page_num in range(1, total_pages + 1):
-                # 抓取当前页
-                soup, success_count = scrape_images(
-                    current_url,
-                    page_num,
-                    total_pages,
-                    save_dir,
-                    log_callback=self.log
-                )
-                total_images += success_count
-
-                if soup is None:
-                    self.log(f"\n[!] 第 {page_num} 页抓取失败，停止翻页")
-                    break
-
-                # 如果还有下一页，查找下一页链接
-                if page_num < total_pages:
-                    self.log(f"\n[?] 正在查找下一页链接...")
-                    next_url = find_next_page_link(soup, current_url)
-
-                    if next_url:
-                        self.log(f"[+] 找到下一页: {next_url}")
-                        current_url = next_url
-
-                        # 防封印护盾：翻页前休息一下
-                        wait_time = random.uniform(1.5, 3.0)
-                        self.log(f"[Z] 休息 {wait_time:.1f} 秒后继续...")
-                        time.sleep(wait_time)
-                    else:
-                        self.log(f"[!] 未找到下一页链接，已抓取 {page_num} 页后停止")
-                        break
+            job.log(f"\n[*] 开始挂机模式：将自动抓取 {total_pages} 页")
+            job.log("[*] 防封印护盾已启动，按主机自适应限速...")
+
+            total_images = crawl(url, total_pages, save_dir, max_workers, resume=resume, control=job.control,
+                                 log=job.log, show_progress=False, progress_callback=job.report_progress,
+                                 detail_links=detail_links, detail_image=detail_image, image_filter=image_filter,
+                                 messages=GUI_MESSAGES)
 
             # 最终统计
-            self.log(f"\n{'='*80}")
-            self.log(f"[OK] 挂机完成！")
-            self.log(f"[+] 总共成功下载 {total_images} 张图片到 {save_dir} 目录")
-            self.log(f"{'='*80}")
-
-            # 显示完成对话框
-            self.root.after(0, lambda: messagebox.showinfo(
-                "收割完成",
-                f"成功下载 {total_images} 张图片到 {save_dir} 目录！"
-            ))
+            job.log(f"\n{'='*80}")
+            job.log(f"[OK] 挂机完成！")
+            job.log(f"[+] 总共成功下载 {total_images} 张图片到 {save_dir} 目录")
+            job.log(f"{'='*80}")
+            return total_images
+
+        except JobCancelled:
+            job.log("[!] 任务已取消，进行中的下载已收尾，勾选断点续爬可从中断处继续")
+            raise
 
         except Exception as e:
-            self.log(f"\n[X] 发生严重错误: {str(e)}")
-            self.root.after(0, lambda: messagebox.showerror("错误", f"发生错误: {str(e)}"))
-
-        finally:
-            # 恢复按钮
-            self.is_running = False
-            self.root.after(0, lambda: self.start_button.config(
-                state="normal",
-                text="⚡ 开始收割 ⚡"
-            ))
+            job.log(f"\n[X] 发生严重错误: {str(e)}")
+            raise
 
 
 def launch_gui():
@@ -10,9 +10,14 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # 精简构建：排除项目用不到、只因可选依赖被分析器牵连进来的大型包，减小 onefile 每次启动时的解压量
+    excludes=[
+        'pandas', 'numpy', 'matplotlib', 'scipy', 'IPython', 'PIL', 'pyarrow',
+        'unittest', 'pydoc', 'doctest', 'xmlrpc', 'lib2to3',
+        'aiohttp', 'tqdm', 'openpyxl', 'async_engine', 'sinks', 'excel_writer',
+    ],
     noarchive=False,
-    optimize=0,
+    optimize=1,
 )
 pyz = PYZ(a.pure)
 
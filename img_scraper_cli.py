@@ -1,131 +1,85 @@
-import os
 import sys
-import requests
-import time
-import random
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+import argparse
+import threading
+from contextlib import nullcontext
 from tqdm import tqdm
 
-
-def find_next_page_link(soup, current_url):
-    """智能查找下一页链接"""
-    # 常见的"下一页"关键词
-    next_keywords = ['下一页', '下页', 'next', 'Next', 'NEXT', '›', '»', '→']
-
-    # 查找所有链接
-    all_links = soup.find_all('a', href=True)
-
-    for link in all_links:
-        link_text = link.get_text(strip=True)
-        link_title = link.get('title', '')
-        link_class = ' '.join(link.get('class', []))
-
-        # 检查链接文本、title 或 class 是否包含"下一页"关键词
-        for keyword in next_keywords:
-            if keyword in link_text or keyword in link_title or keyword in link_class:
-                next_url = urljoin(current_url, link['href'])
-                return next_url
-
-    return None
-
-
-def scrape_images(url, page_num, total_pages, save_dir='images'):
-    """从指定URL抓取所有图片"""
-
-    # 伪装浏览器身份（更新为最新 Chrome 版本）
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
+from crawler import crawl
+from downloader import DEFAULT_WORKERS, DEFAULT_PER_HOST, DEFAULT_CHUNK_SIZE
+from http_session import DEFAULT_POOL_MAXSIZE, configure_cache, configure_pool
+from rate_limiter import DEFAULT_RATE, DEFAULT_MAX_RATE, configure_rate_limit
+from pipeline import DEFAULT_PREFETCH_DEPTH
+from detail_pages import DEFAULT_DETAIL_QUEUE, DETAIL_PRESETS, detail_selectors
+from html_parser import BACKENDS, DEFAULT_BACKEND, set_backend
+from image_filter import configure_image_filter, parse_filter_spec
+from metrics import format_summary, write_json, write_prometheus
+from profiling import DEFAULT_TOP, RunProfiler, default_prefix
+from job_scheduler import (DEFAULT_DOWNLOAD_BUDGET, DEFAULT_MAX_JOBS, JOB_CANCELLED, JOB_DONE, JobScheduler,
+                           job_save_dir)
+from retry_policy import DEFAULT_FAILURE_THRESHOLD, DEFAULT_COOLDOWN, configure_retry, parse_retry_spec
+
+# 运行期间可在终端输入的任务控制命令
+COMMAND_HELP = ("[*] Commands: s = status, p [ids] = pause, r [ids] = resume, c [ids] = cancel "
+                "(all jobs when no ids are given)")
+
+# 默认每隔多少秒打印一次任务状态表
+DEFAULT_STATUS_INTERVAL = 30.0
+
+
+def format_job(status):
+    """任务状态表中的一行"""
+    progress = ''
+    if status['progress'] is not None:
+        page_num, done, total = status['progress']
+        progress = f"page {page_num} {done}/{total}"
+    result = f"{status['result']} images" if status['result'] is not None else (status['error'] or '')
+    return (f"    #{status['id']:<3} {status['state']:<11}{progress:<18}{status['elapsed']:>8.1f}s  "
+            f"{status['name']}  {result}".rstrip())
+
+
+def print_status(scheduler):
+    print("[=] Jobs:")
+    for job in scheduler.jobs():
+        print(format_job(job.status()))
+
+
+def command_loop(scheduler):
+    """后台线程：从终端读取任务控制命令，例如 "p 2" 暂停 2 号任务，"c" 取消全部任务"""
+    actions = {
+        'p': ('Paused', scheduler.pause), 'pause': ('Paused', scheduler.pause),
+        'r': ('Resumed', scheduler.resume), 'resume': ('Resumed', scheduler.resume),
+        'c': ('Cancelling', scheduler.cancel), 'cancel': ('Cancelling', scheduler.cancel),
     }
-
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+        command = parts[0].lower()
+        if command in ('s', 'status'):
+            print_status(scheduler)
+            continue
+        if command not in actions:
+            print(COMMAND_HELP)
+            continue
+        try:
+            job_ids = {int(part.lstrip('#')) for part in parts[1:]} or None
+        except ValueError:
+            print("[X] Job ids must be numbers, e.g. \"p 2 3\"")
+            continue
+        label, action = actions[command]
+        jobs = action(job_ids)
+        print(f"[*] {label} job(s): {', '.join(f'#{job.id}' for job in jobs) or 'none'}")
+
+
+def run_jobs(scheduler, status_interval):
+    """等待全部任务结束；Ctrl+C 取消全部任务并等进行中的下载收尾，再按一次强制退出"""
     try:
-        # 获取网页内容
-        print(f"\n{'='*60}")
-        print(f"[*] 正在收割第 {page_num}/{total_pages} 页...")
-        print(f"[+] URL: {url}")
-        print(f"{'='*60}")
-
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        # 防封印护盾：模拟人类浏览速度
-        time.sleep(random.uniform(0.8, 1.5))
-
-        # 解析HTML
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # 提取所有图片标签
-        img_tags = soup.find_all('img')
-
-        if not img_tags:
-            print("[!] 未找到任何图片")
-            return soup, 0
-
-        print(f"[+] 找到 {len(img_tags)} 张图片")
-
-        # 创建保存目录
-        if not os.path.exists(save_dir):
-            os.makedirs(save_dir)
-            print(f"[+] 已创建目录: {save_dir}")
-
-        # 提取图片链接并转换为绝对路径
-        img_urls = []
-        for img in img_tags:
-            img_url = img.get('src') or img.get('data-src')
-            if img_url:
-                # 转换相对路径为绝对路径
-                absolute_url = urljoin(url, img_url)
-                img_urls.append(absolute_url)
-
-        # 下载图片
-        success_count = 0
-        for idx, img_url in enumerate(tqdm(img_urls, desc=f"[>>] Page {page_num} Download", ncols=80), 1):
-            try:
-                # 获取文件名
-                parsed_url = urlparse(img_url)
-                filename = os.path.basename(parsed_url.path)
-
-                # 如果文件名为空或无扩展名，使用序号命名
-                if not filename or '.' not in filename:
-                    filename = f"page{page_num}_image_{idx}.jpg"
-                else:
-                    # 添加页码前缀避免重名
-                    name, ext = os.path.splitext(filename)
-                    filename = f"page{page_num}_{name}{ext}"
-
-                filepath = os.path.join(save_dir, filename)
-
-                # 下载图片时添加 Referer 防止防盗链拦截
-                download_headers = headers.copy()
-                download_headers['Referer'] = url
-
-                img_response = requests.get(img_url, headers=download_headers, timeout=10)
-                img_response.raise_for_status()
-
-                # 保存图片
-                with open(filepath, 'wb') as f:
-                    f.write(img_response.content)
-
-                success_count += 1
-
-                # 防封印护盾：每下载几张图片就休息一下
-                if idx % 5 == 0:
-                    time.sleep(random.uniform(0.3, 0.8))
-
-            except Exception as e:
-                print(f"\n[X] Download failed [{img_url}]: {str(e)}")
-                continue
-
-        print(f"[OK] Page {page_num} completed! Downloaded {success_count}/{len(img_urls)} images")
-
-        return soup, success_count
-
-    except requests.exceptions.RequestException as e:
-        print(f"[X] Failed to access webpage: {str(e)}")
-        return None, 0
-    except Exception as e:
-        print(f"[X] Error occurred: {str(e)}")
-        return None, 0
+        while not scheduler.wait(status_interval or None):
+            print_status(scheduler)
+    except KeyboardInterrupt:
+        print("\n[!] Interrupted: cancelling jobs, waiting for in-flight downloads (Ctrl+C again to abort)")
+        scheduler.cancel()
+        scheduler.wait()
 
 
 def main():
@@ -134,15 +88,88 @@ def main():
     print("=" * 60)
 
     # 从命令行参数获取URL和页数
-    if len(sys.argv) < 3:
-        print("\nUsage: python img_scraper_cli.py <URL> <pages>")
-        print("Example: python img_scraper_cli.py https://example.com 3")
-        return
-
-    url = sys.argv[1].strip()
+    parser = argparse.ArgumentParser(
+        prog='img_scraper_cli.py',
+        description='Image Scraper - Auto Mode',
+        epilog='Example: python img_scraper_cli.py https://example.com 3 --workers 16'
+    )
+    parser.add_argument('urls', nargs='+', metavar='url',
+                        help='start page URL; several URLs run as separate jobs, each saved to images/<site-path>')
+    parser.add_argument('pages', help='number of pages to scrape (per URL)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'concurrent image downloads (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f'max concurrent downloads per host (default: {DEFAULT_PER_HOST})')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_MAXSIZE,
+                        help=f'keep-alive connections kept per host (default: {DEFAULT_POOL_MAXSIZE})')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'streaming download chunk size in bytes (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--no-dedup', action='store_true',
+                        help='save every image as a separate file instead of hardlinking into the content store')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='always refetch listing pages instead of revalidating the on-disk HTTP cache')
+    parser.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH_DEPTH,
+                        help=f'listing pages fetched ahead while images download, 0 = serial (default: {DEFAULT_PREFETCH_DEPTH})')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_MAX_JOBS,
+                        help=f'URLs crawled at the same time, the rest wait in the queue (default: {DEFAULT_MAX_JOBS})')
+    parser.add_argument('--download-budget', type=int, default=DEFAULT_DOWNLOAD_BUDGET,
+                        help=f'image downloads in flight across all jobs (default: {DEFAULT_DOWNLOAD_BUDGET})')
+    parser.add_argument('--status-interval', type=float, default=DEFAULT_STATUS_INTERVAL,
+                        help=f'seconds between job status tables, 0 = only at the end '
+                             f'(default: {DEFAULT_STATUS_INTERVAL:g})')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue the last run for this URL from the crawl journal')
+    parser.add_argument('--parser', choices=sorted(BACKENDS), default=DEFAULT_BACKEND,
+                        help=f'HTML parser backend for listing pages (default: {DEFAULT_BACKEND})')
+    parser.add_argument('--filter', action='append', default=[], metavar='RULES',
+                        help='skip images before downloading them, e.g. "min-size=50k,min-width=800,types=jpg|png,'
+                             'exclude=qqonline|/icons/" (rules: min-size, max-size, min-width, min-height, types, '
+                             'include, exclude). A comma only separates rules when a rule name and = follow it, so '
+                             'regexes may contain commas. | separates types, but inside include/exclude it is regex '
+                             'alternation. Repeat --filter to add more rules; include/exclude accumulate. srcset and '
+                             '<picture> always pick the highest resolution')
+    parser.add_argument('--detail-links', metavar='SELECTOR',
+                        help='follow the links matched by this CSS selector on each listing page and download the '
+                             'full-size image from every detail page instead of the listing thumbnails, in parallel '
+                             f'with pagination; "auto" uses a site preset ({", ".join(DETAIL_PRESETS)})')
+    parser.add_argument('--detail-image', metavar='SELECTOR',
+                        help='CSS selector for the full-size image on a detail page, <img> or <a href> '
+                             '(default: the site preset, otherwise the first <img> that passes --filter)')
+    parser.add_argument('--detail-queue', type=int, default=DEFAULT_DETAIL_QUEUE,
+                        help=f'detail pages queued ahead of the --workers detail threads before pagination waits '
+                             f'(default: {DEFAULT_DETAIL_QUEUE})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help=f'initial requests per second per host, adapted at runtime (default: {DEFAULT_RATE})')
+    parser.add_argument('--max-rate', type=float, default=DEFAULT_MAX_RATE,
+                        help=f'upper bound for the adaptive per-host rate (default: {DEFAULT_MAX_RATE})')
+    parser.add_argument('--retry', default='',
+                        help='max attempts per error class, e.g. "timeout=5,server=2" '
+                             '(classes: timeout, connection, throttled, server, client, other)')
+    parser.add_argument('--breaker-threshold', type=int, default=DEFAULT_FAILURE_THRESHOLD,
+                        help=f'consecutive failures that open a host circuit (default: {DEFAULT_FAILURE_THRESHOLD})')
+    parser.add_argument('--breaker-cooldown', type=float, default=DEFAULT_COOLDOWN,
+                        help=f'seconds an open host circuit waits before a probe request (default: {DEFAULT_COOLDOWN:g})')
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help='write per-stage counters and latency histograms to a JSON file')
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help='write the same metrics as a Prometheus textfile (node_exporter textfile collector)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='PREFIX',
+                        help='profile the run with cProfile (all threads) and write PREFIX.prof plus a '
+                             'PREFIX.txt hot-function report (default prefix: profile_img_scraper_<time>)')
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP,
+                        help=f'functions listed per section of the profile report (default: {DEFAULT_TOP})')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='with --profile, also trace allocations with tracemalloc (slower)')
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                        help='crawl backend: thread pool (requests) or asyncio (aiohttp)')
+    parser.add_argument('--connections', type=int, default=100,
+                        help='max in-flight connections for the async engine (default: 100)')
+    args = parser.parse_args()
+
+    urls = [url.strip() for url in args.urls]
 
     try:
-        total_pages = int(sys.argv[2])
+        total_pages = int(args.pages)
         if total_pages <= 0:
             print("[X] Pages must be greater than 0")
             return
@@ -150,52 +177,187 @@ def main():
         print("[X] Please provide a valid number for pages")
         return
 
-    # 确保URL包含协议
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
+    if min(args.workers, args.per_host, args.pool_size, args.chunk_size, args.connections,
+           args.jobs, args.download_budget, args.detail_queue) <= 0:
+        print("[X] --workers, --per-host, --pool-size, --chunk-size, --connections, --jobs, --download-budget "
+              "and --detail-queue must be greater than 0")
+        return
 
-    print(f"\n[*] Starting auto mode: will scrape {total_pages} pages")
-    print("[*] Anti-ban shield activated, simulating human browsing speed...")
+    if args.status_interval < 0:
+        print("[X] --status-interval cannot be negative")
+        return
 
-    # 创建保存目录
-    save_dir = 'images'
+    if args.engine == 'async' and len(urls) > 1:
+        print("[X] --engine async crawls a single URL, use the thread engine for several jobs")
+        return
+
+    if args.engine == 'async' and args.detail_links:
+        print("[X] --detail-links is only supported by the thread engine")
+        return
+
+    if args.detail_image and not args.detail_links:
+        print("[X] --detail-image requires --detail-links")
+        return
+
+    if args.prefetch < 0:
+        print("[X] --prefetch cannot be negative")
+        return
+
+    if args.rate <= 0 or args.max_rate <= 0:
+        print("[X] --rate and --max-rate must be greater than 0")
+        return
+
+    try:
+        retry_attempts = parse_retry_spec(args.retry)
+    except ValueError as e:
+        print(f"[X] --retry: {e}")
+        return
 
-    # 开始自动翻页抓取
-    current_url = url
-    total_images = 0
+    try:
+        filter_options = parse_filter_spec(args.filter)
+    except ValueError as e:
+        print(f"[X] --filter: {e}")
+        return
 
-    for page_num in range(1, total_pages + 1):
-        # 抓取当前页
-        soup, success_count = scrape_images(current_url, page_num, total_pages, save_dir)
-        total_images += success_count
+    if args.profile_top <= 0:
+        print("[X] --profile-top must be greater than 0")
+        return
 
-        if soup is None:
-            print(f"\n[!] Page {page_num} scraping failed, stopping pagination")
-            break
+    if args.profile_memory and args.profile is None:
+        print("[X] --profile-memory requires --profile")
+        return
 
-        # 如果还有下一页，查找下一页链接
-        if page_num < total_pages:
-            print(f"\n[?] Looking for next page link...")
-            next_url = find_next_page_link(soup, current_url)
+    if args.breaker_threshold <= 0 or args.breaker_cooldown < 0:
+        print("[X] --breaker-threshold must be greater than 0 and --breaker-cooldown cannot be negative")
+        return
 
-            if next_url:
-                print(f"[+] Found next page: {next_url}")
-                current_url = next_url
+    # 连接池至少要容纳单主机并发数，否则多余连接会被丢弃重建
+    configure_pool(pool_maxsize=max(args.pool_size, args.per_host))
+    configure_cache(enabled=not args.no_cache)
+    set_backend(args.parser)
+    configure_rate_limit(rate=args.rate, max_rate=args.max_rate)
+    configure_image_filter(**filter_options)
+    configure_retry(retry_attempts, failure_threshold=args.breaker_threshold, cooldown=args.breaker_cooldown)
 
-                # 防封印护盾：翻页前休息一下
-                wait_time = random.uniform(1.5, 3.0)
-                print(f"[Z] Resting {wait_time:.1f} seconds before continuing...")
-                time.sleep(wait_time)
-            else:
-                print(f"[!] No next page link found, stopped after {page_num} pages")
-                break
+    # 确保URL包含协议
+    urls = [url if url.startswith(('http://', 'https://')) else 'https://' + url for url in urls]
+
+    if args.detail_links:
+        try:
+            for url in urls:
+                detail_selectors(url, args.detail_links, args.detail_image)
+        except ValueError as e:
+            print(f"[X] --detail-links: {e}")
+            return
+
+    print(f"\n[*] Starting auto mode: will scrape {total_pages} pages"
+          f"{f' from each of {len(urls)} URLs' if len(urls) > 1 else ''}")
+    print("[*] Anti-ban shield activated, adaptive per-host rate limiting...")
+
+    # 创建保存目录：多个任务各自一个子目录，避免文件名与断点续爬日志互相覆盖
+    save_dir = 'images'
+
+    if args.engine == 'async':
+        try:
+            import async_engine
+        except ImportError as e:
+            print(f"[X] Async engine unavailable ({e}), install it with: pip install aiohttp")
+            return
+
+    profiler = None
+    if args.profile is not None:
+        profiler = RunProfiler(args.profile or default_prefix('img_scraper'), args.profile_top, args.profile_memory)
+        print(f"[*] Profiling enabled{' (with tracemalloc)' if args.profile_memory else ''}, "
+              f"expect the run to be slower")
+
+    scheduler = None
+    with profiler or nullcontext():
+        if args.engine == 'async':
+            total_images = async_engine.run(
+                urls[0],
+                total_pages,
+                save_dir,
+                max_connections=args.connections,
+                per_host=args.per_host,
+                chunk_size=args.chunk_size,
+                dedup=not args.no_dedup,
+                resume=args.resume,
+                prefetch=args.prefetch
+            )
+        else:
+            multiple = len(urls) > 1
+            scheduler = JobScheduler(args.jobs, args.download_budget, log=tqdm.write)
+
+            def make_target(url):
+                job_dir = job_save_dir(save_dir, url) if multiple else save_dir
+
+                def target(job):
+                    return crawl(
+                        url,
+                        total_pages,
+                        job_dir,
+                        args.workers,
+                        args.per_host,
+                        args.chunk_size,
+                        dedup=not args.no_dedup,
+                        resume=args.resume,
+                        prefetch=args.prefetch,
+                        control=job.control,
+                        log=job.log if multiple else print,
+                        show_progress=not multiple,
+                        progress_callback=job.report_progress,
+                        detail_links=args.detail_links,
+                        detail_image=args.detail_image,
+                        detail_queue=args.detail_queue
+                    )
+                return target
+
+            for url in urls:
+                job = scheduler.submit(url, make_target(url))
+                if multiple:
+                    print(f"[+] Job #{job.id}: {url} -> {job_save_dir(save_dir, url)}")
+
+            # 交互式终端才读取控制命令（重定向或后台运行时标准输入不可用）
+            if sys.stdin is not None and sys.stdin.isatty():
+                print(COMMAND_HELP)
+                threading.Thread(target=command_loop, args=(scheduler,), daemon=True).start()
+
+            run_jobs(scheduler, args.status_interval)
+            total_images = sum(job.result or 0 for job in scheduler.jobs())
 
     # 最终统计
     print(f"\n{'='*60}")
-    print(f"[OK] Auto mode completed!")
+    if scheduler is not None and any(job.state == JOB_CANCELLED for job in scheduler.jobs()):
+        print("[!] Auto mode stopped before all jobs finished")
+    else:
+        print("[OK] Auto mode completed!")
     print(f"[+] Total downloaded {total_images} images to {save_dir} directory")
+    if scheduler is not None:
+        if len(urls) > 1:
+            print_status(scheduler)
+        for job in scheduler.jobs():
+            if job.state == JOB_CANCELLED:
+                print(f"[!] Job #{job.id} was cancelled, run again with --resume to continue it")
+            elif job.state != JOB_DONE:
+                print(f"[X] Job #{job.id} failed: {job.error}")
     print(f"{'='*60}")
 
+    # 各阶段耗时：判断瓶颈在网络（fetch / download）、解析（parse）还是磁盘（disk_write）
+    for line in format_summary():
+        print(f"    {line}")
+
+    if args.metrics_json:
+        write_json(args.metrics_json)
+        print(f"[+] Metrics written to {args.metrics_json}")
+    if args.metrics_prom:
+        write_prometheus(args.metrics_prom)
+        print(f"[+] Prometheus metrics written to {args.metrics_prom}")
+
+    if profiler is not None:
+        print(f"[+] Profile written to {profiler.profile_path}, report: {profiler.report_path}")
+        for cumulative, func in profiler.top_lines():
+            print(f"    {cumulative:8.2f}s  {func}")
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,266 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# 同时运行的任务数 / 所有任务合计同时下载的图片数
+DEFAULT_MAX_JOBS = 2
+DEFAULT_DOWNLOAD_BUDGET = 16
+
+# 任务状态：排队 / 运行 / 暂停 / 取消中（等待进行中的下载收尾） / 完成 / 失败 / 已取消
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_PAUSED = 'paused'
+JOB_CANCELLING = 'cancelling'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobCancelled(BaseException):
+    """
+    任务被取消：在检查点抛出，一路穿过抓取代码直到调度器
+    与 KeyboardInterrupt 一样继承 BaseException，不会被各处的 except Exception 当成普通失败吞掉
+    """
+
+
+class JobControl:
+    """
+    一个任务的暂停 / 取消开关
+    抓取代码在每个列表页与每张图片开始前调用 checkpoint()：暂停时阻塞，取消时抛出 JobCancelled；
+    已经开始的下载不受影响，照常写完并记入断点续爬日志
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def pause(self):
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # 唤醒暂停中的线程，让它们在检查点看到取消
+        self._running.set()
+
+    def checkpoint(self):
+        self._running.wait()
+        if self.cancelled:
+            raise JobCancelled()
+
+    @contextmanager
+    def slot(self):
+        """占用一个全局下载名额；等待名额期间同样响应暂停与取消"""
+        if self.budget is None:
+            self.checkpoint()
+            yield
+            return
+
+        while True:
+            self.checkpoint()
+            if self.budget.acquire(timeout=0.2):
+                break
+        try:
+            yield
+        finally:
+            self.budget.release()
+
+
+def job_save_dir(base_dir, url):
+    """每个任务单独的保存目录（按起始网址生成，同一网址再次运行时目录不变，便于断点续爬）"""
+    parsed = urlparse(url)
+    name = f"{parsed.netloc}{parsed.path}".strip('/')
+    name = ''.join(ch if ch.isalnum() or ch in '-_.' else '_' for ch in name).strip('._') or 'job'
+    return os.path.join(base_dir, name[:80])
+
+
+class Job:
+    """调度器中的一个抓取任务"""
+
+    def __init__(self, job_id, name, target, control, log):
+        self.id = job_id
+        self.name = name
+        self.target = target
+        self.control = control
+        self.result = None
+        self.error = None
+        self.progress = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._state = JOB_QUEUED
+        self._log = log
+
+    @property
+    def state(self):
+        if self._state in FINISHED_STATES:
+            return self._state
+        if self.control.cancelled:
+            return JOB_CANCELLING if self._state == JOB_RUNNING else JOB_CANCELLED
+        if self.control.paused:
+            return JOB_PAUSED
+        return self._state
+
+    @property
+    def finished(self):
+        return self._state in FINISHED_STATES
+
+    def log(self, message):
+        """带任务编号前缀的日志（保留消息开头的空行）"""
+        body = message.lstrip('\n')
+        self._log(f"{message[:len(message) - len(body)]}[#{self.id}] {body}")
+
+    def report_progress(self, page_num, done, total):
+        """下载线程回调：只记录最新的 (页码, 已完成数, 图片总数)"""
+        self.progress = (page_num, done, total)
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def status(self):
+        """任务状态快照，供 GUI 与 CLI 展示"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'state': self.state,
+            'progress': self.progress,
+            'result': self.result,
+            'error': str(self.error) if self.error is not None else None,
+            'elapsed': round(self.elapsed(), 1),
+        }
+
+
+class JobScheduler:
+    """
+    多任务调度器：最多 max_jobs 个任务同时运行，其余排队；
+    所有任务共享 download_budget 个下载名额（JobControl.slot），任务再多也不会压垮网络与磁盘
+    每个任务的 target(job) 在独立线程中执行，返回值记为 job.result；暂停的任务仍占用运行名额
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, download_budget=DEFAULT_DOWNLOAD_BUDGET, log=print):
+        self.max_jobs = max(1, max_jobs)
+        self._budget = threading.BoundedSemaphore(download_budget) if download_budget else None
+        self._log = log
+        self._cond = threading.Condition()
+        self._jobs = []
+        self._pending = deque()
+        self._running = 0
+        self._next_id = 1
+
+    def submit(self, name, target):
+        """提交任务，返回 Job；有空闲名额时立即开始"""
+        with self._cond:
+            job = Job(self._next_id, name, target, JobControl(self._budget), self._log)
+            self._next_id += 1
+            self._jobs.append(job)
+            self._pending.append(job)
+            self._dispatch()
+        return job
+
+    def set_max_jobs(self, max_jobs):
+        with self._cond:
+            self.max_jobs = max(1, max_jobs)
+            self._dispatch()
+
+    def _dispatch(self):
+        # 调用方持有 self._cond
+        while self._pending and self._running < self.max_jobs:
+            job = self._pending.popleft()
+            if job.control.cancelled:
+                self._finish(job, JOB_CANCELLED)
+                continue
+            self._running += 1
+            job._state = JOB_RUNNING
+            job.started_at = time.time()
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _finish(self, job, state, result=None, error=None):
+        # 调用方持有 self._cond
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job._state = state
+        self._cond.notify_all()
+
+    def _run(self, job):
+        state, result, error = JOB_DONE, None, None
+        try:
+            result = job.target(job)
+        except JobCancelled:
+            state = JOB_CANCELLED
+        except Exception as e:
+            state, error = JOB_FAILED, e
+        with self._cond:
+            self._running -= 1
+            self._finish(job, state, result, error)
+            self._dispatch()
+
+    def get(self, job_id):
+        with self._cond:
+            for job in self._jobs:
+                if job.id == job_id:
+                    return job
+        return None
+
+    def jobs(self):
+        with self._cond:
+            return list(self._jobs)
+
+    def _select(self, job_ids):
+        """job_ids 为 None 时选中全部未结束的任务"""
+        with self._cond:
+            return [job for job in self._jobs
+                    if not job.finished and (job_ids is None or job.id in job_ids)]
+
+    def pause(self, job_ids=None):
+        jobs = self._select(job_ids)
+        for job in jobs:
+            job.control.pause()
+        return jobs
+
+    def resume(self, job_ids=None):
+        jobs = self._select(job_ids)
+        for job in jobs:
+            job.control.resume()
+        return jobs
+
+    def cancel(self, job_ids=None):
+        """取消任务：排队中的直接结束，运行中的在下一个检查点停止，进行中的下载照常写完"""
+        jobs = self._select(job_ids)
+        with self._cond:
+            for job in jobs:
+                job.control.cancel()
+                if job in self._pending:
+                    self._pending.remove(job)
+                    self._finish(job, JOB_CANCELLED)
+        return jobs
+
+    def active(self):
+        """是否还有未结束的任务"""
+        with self._cond:
+            return any(not job.finished for job in self._jobs)
+
+    def wait(self, timeout=None):
+        """等待全部任务结束，超时返回 False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: all(job.finished for job in self._jobs), timeout)
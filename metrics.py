@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# 各阶段耗时直方图的桶上界（秒），最后隐含一个 +Inf 桶
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prometheus 指标名前缀
+METRIC_PREFIX = 'scraper'
+
+# 流水线阶段：获取列表页 / 解析 / 找下一页 / 下载图片（含写盘） / 写盘 / 导出报表 / 限速等待
+# fetch 与 download 的耗时包含其中的限速等待，rate_wait 占比高说明瓶颈在限速器而不是网络
+STAGE_FETCH = 'fetch'
+STAGE_PARSE = 'parse'
+STAGE_NEXT_LINK = 'next_link'
+STAGE_DOWNLOAD = 'download'
+STAGE_DISK_WRITE = 'disk_write'
+STAGE_EXPORT = 'export'
+STAGE_RATE_WAIT = 'rate_wait'
+
+# 指标说明（写入 Prometheus 文本文件的 HELP 行）
+METRIC_HELP = {
+    'stage_seconds': 'Time spent per pipeline stage',
+    'http_requests_total': 'HTTP responses received, by status code',
+    'bytes_total': 'Bytes transferred or written, by kind',
+    'images_total': 'Images processed, by result',
+    'pages_total': 'Listing pages processed, by result',
+    'detail_pages_total': 'Detail pages fetched for full-resolution originals, by result',
+    'errors_total': 'Failed request attempts, by error class',
+    'records_total': 'Records exported, by dataset',
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """固定桶直方图：只保存每个桶的计数、总和与次数，内存占用与观测次数无关"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, fraction):
+        """按桶估算分位数，返回所在桶的上界（落在 +Inf 桶时返回最大的有限上界）"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[min(idx, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'p50': self.quantile(0.50),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class Metrics:
+    """
+    线程安全的指标登记处：计数器与耗时直方图，按标签区分
+    各模块在关键阶段调用 inc() / observe() / timer()，运行结束后导出 JSON 或 Prometheus 文本文件
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, stage):
+        """统计一个阶段的耗时（无论成功与否都会记录）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def total(self, name):
+        """某个计数器所有标签取值的合计"""
+        with self._lock:
+            return sum(value for (counter_name, _), value in self._counters.items() if counter_name == name)
+
+    def elapsed(self):
+        return time.perf_counter() - self._started
+
+    def snapshot(self):
+        """返回全部指标的字典快照（可直接 json.dump）"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, histogram.snapshot()) for key, histogram in self._histograms.items())
+
+        result = {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'elapsed_seconds': round(self.elapsed(), 3),
+            'counters': {},
+            'histograms': {},
+        }
+        for (name, key), value in counters:
+            result['counters'].setdefault(name, []).append({'labels': dict(key), 'value': value})
+        for (name, key), data in histograms:
+            result['histograms'].setdefault(name, []).append({'labels': dict(key), **data})
+        return result
+
+    def rates(self):
+        """运行至今的平均速率：列表页/秒、图片/秒、MB/秒（图片字节）"""
+        elapsed = max(self.elapsed(), 1e-9)
+        return (
+            self.counter('pages_total', result='ok') / elapsed,
+            self.counter('images_total', result='ok') / elapsed,
+            self.counter('bytes_total', kind='image') / (1024 * 1024) / elapsed,
+        )
+
+    def to_prometheus(self):
+        """渲染为 Prometheus 文本格式（node_exporter textfile collector 可直接读取）"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                ((key, (list(histogram.counts), histogram.total, histogram.count))
+                 for key, histogram in self._histograms.items()),
+                key=lambda item: item[0]
+            )
+
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {METRIC_PREFIX}_{name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+        for (name, key), value in counters:
+            declare(name, 'counter')
+            lines.append(f"{METRIC_PREFIX}_{name}{_format_labels(key)} {value}")
+
+        for (name, key), (counts, total, count) in histograms:
+            declare(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip([f"{bound:g}" for bound in self.buckets] + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f"{METRIC_PREFIX}_{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{METRIC_PREFIX}_{name}_sum{_format_labels(key)} {total:.6f}")
+            lines.append(f"{METRIC_PREFIX}_{name}_count{_format_labels(key)} {count}")
+
+        declare('run_seconds', 'gauge')
+        lines.append(f"{METRIC_PREFIX}_run_seconds {self.elapsed():.3f}")
+        return '\n'.join(lines) + '\n'
+
+    def stage_summary(self):
+        """按阶段汇总：[(阶段, 次数, 总耗时, p50, p99)]，按总耗时降序"""
+        with self._lock:
+            stages = [
+                (dict(key).get('stage'), histogram.count, histogram.total,
+                 histogram.quantile(0.50), histogram.quantile(0.99))
+                for (name, key), histogram in self._histograms.items() if name == 'stage_seconds'
+            ]
+        return sorted(stages, key=lambda stage: stage[2], reverse=True)
+
+
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json(path, metrics=None):
+    """把指标快照写成 JSON 文件"""
+    metrics = metrics or _metrics
+    _write_atomic(path, json.dumps(metrics.snapshot(), ensure_ascii=False, indent=2))
+
+
+def write_prometheus(path, metrics=None):
+    """把指标写成 Prometheus 文本文件（先写临时文件再替换，采集器不会读到半个文件）"""
+    metrics = metrics or _metrics
+    _write_atomic(path, metrics.to_prometheus())
+
+
+def format_summary(metrics=None):
+    """运行结束时打印的阶段耗时表，据此判断瓶颈在网络、解析还是磁盘"""
+    metrics = metrics or _metrics
+    stages = metrics.stage_summary()
+    if not stages:
+        return []
+
+    lines = [f"{'stage':<12}{'count':>8}{'total s':>10}{'p50 s':>9}{'p99 s':>9}"]
+    for stage, count, total, p50, p99 in stages:
+        lines.append(f"{stage:<12}{count:>8}{total:>10.2f}{p50:>9g}{p99:>9g}")
+
+    received = metrics.counter('bytes_total', kind='page') + metrics.counter('bytes_total', kind='image')
+    lines.append(
+        f"{metrics.total('http_requests_total')} requests, {metrics.total('errors_total')} failed attempts, "
+        f"{received / (1024 * 1024):.1f} MB received in {metrics.elapsed():.1f}s"
+    )
+    if metrics.total('images_total'):
+        pages_per_s, images_per_s, mb_per_s = metrics.rates()
+        lines.append(f"{pages_per_s:.2f} pages/s, {images_per_s:.2f} images/s, {mb_per_s:.2f} MB/s")
+    return lines
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    return _metrics
+
+
+def reset_metrics():
+    """开始新一轮运行前清空指标（GUI 多次运行时使用）"""
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
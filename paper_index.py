@@ -0,0 +1,66 @@
+import os
+import time
+import sqlite3
+import threading
+
+# 论文索引文件（放在情报输出目录下，以点开头隐藏）
+PAPER_INDEX_FILE = '.arxiv_index.db'
+
+
+class PaperIndex:
+    """
+    以 arXiv ID 为键的本地论文库
+    保存完整标题与摘要，每次运行只处理索引里没有的论文；
+    同一篇论文交叉发布在多个分类时只收录一次（记录最先见到它的分类）；
+    扫描期间只读，新论文在报表导出成功后才由 add_many 一次性收录，导出失败时下次运行仍算新论文
+    """
+
+    def __init__(self, path=PAPER_INDEX_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS papers (
+                arxiv_id TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                title TEXT NOT NULL,
+                abstract TEXT NOT NULL,
+                first_seen REAL NOT NULL
+            )
+        ''')
+
+    def known(self, arxiv_ids):
+        """返回 arxiv_ids 中已经收录的 ID 集合"""
+        arxiv_ids = list(arxiv_ids)
+        if not arxiv_ids:
+            return set()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT arxiv_id FROM papers WHERE arxiv_id IN ({','.join('?' * len(arxiv_ids))})",
+                arxiv_ids
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add_many(self, papers):
+        """
+        在一个事务中收录多篇论文（导出成功后调用），返回新收录的篇数
+        :param papers: (arxiv_id, category, title, abstract) 序列
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO papers VALUES (?, ?, ?, ?, ?)',
+                [(arxiv_id, category, title, abstract, now) for arxiv_id, category, title, abstract in papers]
+            )
+            return self._conn.total_changes - before
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM papers').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,146 @@
+import queue
+import threading
+
+from html_parser import LISTING_TAGS, parse_html
+from http_session import fetch
+from metrics import get_metrics
+
+# 默认预取深度：最多领先当前页多少个列表页
+DEFAULT_PREFETCH_DEPTH = 1
+
+_DONE = object()
+
+
+def fetch_document(url, timeout=10, tags=LISTING_TAGS):
+    """
+    获取并解析列表页（默认只保留 <img>、<picture> 与 <a>）
+    :param tags: 传 None 保留整棵树（详情页链接选择器可能依赖外层容器）
+    """
+    response = fetch(url, timeout=timeout)
+    response.raise_for_status()
+    doc = parse_html(response.content, tags)
+    get_metrics().inc('pages_total', result='ok')
+    return doc
+
+
+class PrefetchedPage:
+    """预取得到的列表页：已解析的 Document 与下一页链接，或预取时发生的异常"""
+
+    def __init__(self, page_num, url, doc=None, next_url=None, error=None, skipped=False):
+        self.page_num = page_num
+        self.url = url
+        self.next_url = next_url
+        self.skipped = skipped
+        self._doc = doc
+        self._error = error
+
+    def document(self):
+        """返回解析结果，预取失败时抛出当时的异常"""
+        if self._error is not None:
+            raise self._error
+        return self._doc
+
+
+class PagePrefetcher:
+    """
+    流水线翻页：后台线程沿着下一页链接提前获取并解析列表页，
+    当前页的图片仍在下载时，后续页面已经就绪；队列长度即预取深度，保证不会跑得太远
+    depth 为 0 时退化为串行：迭代到哪一页才获取哪一页
+    start_page 大于 1 时 start_url 即该页地址（收尾重试时从失败的页面继续翻页）
+    """
+
+    def __init__(self, start_url, total_pages, find_next, journal=None,
+                 depth=DEFAULT_PREFETCH_DEPTH, fetch_page=fetch_document, start_page=1):
+        self.start_url = start_url
+        self.start_page = start_page
+        self.total_pages = total_pages
+        self.find_next = find_next
+        self.journal = journal
+        self.depth = max(0, depth)
+        self.fetch_page = fetch_page
+
+        self._stop = threading.Event()
+        self._queue = queue.Queue(maxsize=self.depth) if self.depth else None
+        self._thread = None
+
+    def _walk(self):
+        """逐页产出 PrefetchedPage，直到页数用完、找不到下一页或抓取失败"""
+        url = self.start_url
+
+        for page_num in range(self.start_page, self.total_pages + 1):
+            if self._stop.is_set():
+                return
+
+            # 断点续爬：已完成的页面直接沿用记录的下一页链接，不发起网络请求
+            if self.journal is not None:
+                skip, next_url = self.journal.can_skip_page(page_num, self.total_pages)
+                if skip:
+                    yield PrefetchedPage(page_num, url, next_url=next_url, skipped=True)
+                    if not next_url:
+                        return
+                    url = next_url
+                    continue
+
+            try:
+                doc = self.fetch_page(url)
+            except Exception as e:
+                yield PrefetchedPage(page_num, url, error=e)
+                return
+
+            next_url = None
+            if page_num < self.total_pages:
+                next_url = self.find_next(doc, url)
+                if next_url and self.journal is not None:
+                    self.journal.record_next_url(page_num, url, next_url)
+
+            yield PrefetchedPage(page_num, url, doc=doc, next_url=next_url)
+
+            if not next_url:
+                return
+            url = next_url
+
+    def _produce(self):
+        try:
+            for page in self._walk():
+                # 队列满时阻塞，直到当前页被取走或收到停止信号
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put(page, timeout=0.2)
+                        break
+                    except queue.Full:
+                        continue
+        finally:
+            self._put_done()
+
+    def _put_done(self):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(_DONE, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        if not self.depth:
+            yield from self._walk()
+            return
+
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+        while True:
+            page = self._queue.get()
+            if page is _DONE:
+                return
+            yield page
+
+    def close(self):
+        """停止预取线程（提前结束翻页时调用）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,124 @@
+import os
+import time
+import sqlite3
+import threading
+
+# 价格历史文件（放在情报输出目录下，以点开头隐藏）
+PRICE_HISTORY_FILE = '.steam_prices.db'
+
+
+class PricePoint:
+    """某个商品在某一时刻的价格（单位与商店货币一致，折扣为百分比整数）"""
+
+    __slots__ = ('item_key', 'title', 'final', 'original', 'discount', 'ts')
+
+    def __init__(self, item_key, title, final, original, discount, ts=None):
+        self.item_key = item_key
+        self.title = title
+        self.final = final
+        self.original = original
+        self.discount = discount
+        self.ts = ts
+
+    def same_price(self, other):
+        return (self.final, self.original, self.discount) == (other.final, other.original, other.discount)
+
+
+class PriceHistory:
+    """
+    以商品键（App_123 / Sub_456 / Bundle_789）为键的本地价格时间序列
+    只在价格或折扣变化时追加一个点，价格不变的商品每次运行不增加任何行；
+    latest 表保存每个商品的最新价格，对比上次运行只需一次主键查询
+    """
+
+    def __init__(self, path=PRICE_HISTORY_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS price_points (
+                item_key TEXT NOT NULL,
+                ts REAL NOT NULL,
+                final REAL,
+                original REAL,
+                discount INTEGER NOT NULL,
+                PRIMARY KEY (item_key, ts)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS latest (
+                item_key TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                final REAL,
+                original REAL,
+                discount INTEGER NOT NULL,
+                ts REAL NOT NULL
+            );
+        ''')
+
+    def latest(self, item_keys):
+        """返回 {商品键: 最新的 PricePoint}，没有记录的商品不在结果中"""
+        item_keys = list(item_keys)
+        result = {}
+        with self._lock:
+            # 分批查询，避免超过 SQLite 单条语句的参数个数上限
+            for i in range(0, len(item_keys), 500):
+                batch = item_keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT item_key, title, final, original, discount, ts FROM latest "
+                    f"WHERE item_key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for row in rows:
+                    result[row[0]] = PricePoint(*row)
+        return result
+
+    def on_sale(self):
+        """返回上次记录时仍在打折的全部商品 {商品键: PricePoint}"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT item_key, title, final, original, discount, ts FROM latest WHERE discount > 0'
+            ).fetchall()
+        return {row[0]: PricePoint(*row) for row in rows}
+
+    def changes(self, points):
+        """
+        只读比较一批价格与最新价格，不写入
+        :return: [(本次价格, 上次价格或 None)]，只包含价格有变化或首次出现的商品
+        """
+        previous = self.latest(point.item_key for point in points)
+        changes = []
+        for point in points:
+            last = previous.get(point.item_key)
+            if last is None or not last.same_price(point):
+                changes.append((point, last))
+        return changes
+
+    def record(self, points, ts=None):
+        """
+        在一个事务中记录一批价格，与最新价格相同的点被跳过
+        :return: 同 changes
+        """
+        ts = time.time() if ts is None else ts
+        changes = self.changes(points)
+
+        with self._lock, self._conn:
+            for point, last in changes:
+                point.ts = ts
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO price_points VALUES (?, ?, ?, ?, ?)',
+                    (point.item_key, ts, point.final, point.original, point.discount)
+                )
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO latest VALUES (?, ?, ?, ?, ?, ?)',
+                    (point.item_key, point.title, point.final, point.original, point.discount, ts)
+                )
+        return changes
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM latest').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,176 @@
+import io
+import os
+import sys
+import time
+import threading
+
+# cProfile / pstats / tracemalloc 只在真正开启剖析时才导入（pstats 会连带导入 dataclasses、inspect），
+# 入口脚本引用本模块的常量不增加启动时间
+
+# 报告中列出的热点函数个数
+DEFAULT_TOP = 30
+
+# tracemalloc 记录的调用栈深度（越深越准，开销越大）
+TRACEMALLOC_FRAMES = 10
+
+# 控制台摘要只列出本项目自己的函数
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Python 3.12 起 cProfile 基于 sys.monitoring，同一时刻只允许一个剖析器，只能剖析主线程
+PER_THREAD_PROFILING = sys.version_info < (3, 12)
+
+# 报告中单独列出的关键路径：翻页抓取、找下一页、HTML 解析、报表导出
+FOCUS_FUNCTIONS = (
+    'scrape_images', 'find_next_page_link', 'find_next_link', 'parse_html', 'make_soup',
+    'select_nodes', 'download_image', 'write_excel', 'export',
+)
+
+
+def default_prefix(name):
+    """默认输出文件前缀，例如 profile_img_scraper_20250101-120000"""
+    return f"profile_{name}_{time.strftime('%Y%m%d-%H%M%S')}"
+
+
+class RunProfiler:
+    """
+    在原地剖析一次完整运行：主线程与运行期间新建的所有线程（下载线程池、预取线程、并发任务）
+    各自挂一个 cProfile，线程结束时停止，结束时合并已停止的统计；可选用 tracemalloc 记录内存分配热点
+    Python 3.12+ 只剖析主线程（见 PER_THREAD_PROFILING），报告中会注明
+    输出 <prefix>.prof（pstats 格式，可用 snakeviz 等工具打开）与 <prefix>.txt（热点函数报告）
+    """
+
+    def __init__(self, prefix, top=DEFAULT_TOP, trace_memory=False):
+        self.prefix = prefix
+        self.top = max(1, top)
+        self.trace_memory = trace_memory
+        self.profile_path = prefix + '.prof'
+        self.report_path = prefix + '.txt'
+        import cProfile
+
+        self._profile_class = cProfile.Profile
+        self._lock = threading.Lock()
+        self._main = self._profile_class()
+        self._thread_profiles = []
+        self._thread_run = None
+        self._snapshot = None
+        self._peak_memory = None
+        self._elapsed = 0.0
+
+    def _wrap_thread_run(self):
+        """
+        替换 Thread.run：运行期间新建的线程各挂一个 cProfile，线程退出时停止并交给合并；
+        仍在运行的剖析器不参与合并（统计还在变化）
+        """
+        profiler = self
+        original_run = self._thread_run = threading.Thread.run
+
+        def run(thread):
+            profile = profiler._profile_class()
+            profile.enable()
+            try:
+                original_run(thread)
+            finally:
+                profile.disable()
+                with profiler._lock:
+                    profiler._thread_profiles.append(profile)
+
+        threading.Thread.run = run
+
+    def __enter__(self):
+        if self.trace_memory:
+            import tracemalloc
+
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._started = time.perf_counter()
+        if PER_THREAD_PROFILING:
+            self._wrap_thread_run()
+        self._main.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._main.disable()
+        if self._thread_run is not None:
+            # 已经在运行的线程仍会执行包装后的 run，退出时照常停止自己的剖析器
+            threading.Thread.run = self._thread_run
+            self._thread_run = None
+        self._elapsed = time.perf_counter() - self._started
+
+        if self.trace_memory:
+            import tracemalloc
+
+            self._snapshot = tracemalloc.take_snapshot()
+            self._peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        self.write()
+        return False
+
+    def stats(self, stream=None):
+        """合并主线程与已结束的工作线程的统计"""
+        import pstats
+
+        stats = pstats.Stats(self._main, stream=stream)
+        with self._lock:
+            profiles = list(self._thread_profiles)
+        for profile in profiles:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # 线程还没执行到任何 Python 函数，没有可合并的数据
+                pass
+        return stats, len(profiles)
+
+    def write(self):
+        import pstats
+        import tracemalloc
+
+        os.makedirs(os.path.dirname(self.prefix) or '.', exist_ok=True)
+
+        stream = io.StringIO()
+        stats, threads = self.stats(stream)
+        stats.dump_stats(self.profile_path)
+
+        stream.write(f"Command: {' '.join(sys.argv)}\n")
+        stream.write(f"Wall time: {self._elapsed:.2f}s, profiled threads: {threads + 1} "
+                     f"(function times are summed across threads)\n")
+        if not PER_THREAD_PROFILING:
+            stream.write(f"Note: Python {sys.version_info.major}.{sys.version_info.minor} allows only one active "
+                         f"profiler, worker threads are not profiled (main thread only)\n")
+        else:
+            stream.write("Note: threads still running when the run ended are not included\n")
+        stream.write(f"Profile: {self.profile_path}\n\n")
+
+        stream.write(f"{'=' * 30} Top {self.top} by cumulative time {'=' * 30}\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+        stream.write(f"{'=' * 30} Top {self.top} by own time {'=' * 30}\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+
+        stream.write(f"{'=' * 30} Focus functions {'=' * 30}\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(
+            r'\((' + '|'.join(FOCUS_FUNCTIONS) + r')\)'
+        )
+
+        if self._snapshot is not None:
+            stream.write(f"{'=' * 30} Memory (tracemalloc) {'=' * 30}\n")
+            stream.write(f"Peak traced memory: {self._peak_memory / (1024 * 1024):.1f} MB\n\n")
+            snapshot = self._snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            ))
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                stream.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8} blocks  {stat.traceback[0]}\n")
+
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+
+    def top_lines(self, count=10):
+        """控制台摘要：本项目函数中累计耗时排名前 count 的 (累计秒数, 函数描述)"""
+        stats, _ = self.stats()
+        rows = []
+        for func, (_, _, _, cumulative, _) in stats.stats.items():
+            filename, lineno, name = func
+            if not os.path.abspath(filename).startswith(PACKAGE_DIR + os.sep) or filename.endswith('profiling.py'):
+                continue
+            rows.append((cumulative, f"{os.path.basename(filename)}:{lineno}({name})"))
+        return sorted(rows, reverse=True)[:count]
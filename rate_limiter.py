@@ -0,0 +1,118 @@
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from metrics import STAGE_RATE_WAIT, get_metrics
+
+# 每个主机的初始 / 最低 / 最高请求速率（次/秒）与允许的突发请求数
+DEFAULT_RATE = 2.0
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_MAX_RATE = 10.0
+DEFAULT_BURST = 4
+
+# 每次健康响应的速率增量，以及遇到限流时的速率乘数（加性增、乘性减）
+RAMP_STEP = 0.25
+BACKOFF_FACTOR = 0.5
+
+# 视为"被限流"的状态码
+THROTTLE_STATUS = (429, 503)
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头：秒数或 HTTP 日期，返回需要等待的秒数，无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostBucket:
+    """
+    单个主机的自适应令牌桶（GCRA 实现）
+    reserve() 预约下一个发送时刻并返回需要等待的秒数；
+    响应健康时速率逐步上调，遇到 429/503 时速率减半并遵守 Retry-After
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self._tat = 0.0
+        self._blocked_until = 0.0
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            send_at = max(now, self._tat - (self.burst - 1) * interval, self._blocked_until)
+            self._tat = max(self._tat, send_at) + interval
+            return send_at - now
+
+    def feedback(self, status_code, retry_after=None):
+        with self._lock:
+            if status_code in THROTTLE_STATUS:
+                self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+                wait = parse_retry_after(retry_after)
+                if wait is not None:
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + wait)
+                # 已预约但尚未发出的请求也按新速率重新排队
+                self._tat = max(self._tat, time.monotonic() + 1.0 / self.rate)
+            else:
+                self.rate = min(self.max_rate, self.rate + RAMP_STEP)
+
+
+class RateLimiter:
+    """按主机分桶的限速器，图片抓取与情报任务共用"""
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = HostBucket(self.rate, self.min_rate, self.max_rate, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def reserve(self, url):
+        """预约一次请求，返回发送前需要等待的秒数"""
+        return self.bucket(url).reserve()
+
+    def wait(self, url):
+        """阻塞直到可以向该主机发送请求"""
+        delay = self.reserve(url)
+        get_metrics().observe('stage_seconds', delay, stage=STAGE_RATE_WAIT)
+        if delay > 0:
+            time.sleep(delay)
+
+    def feedback(self, url, status_code, retry_after=None):
+        """根据响应调整该主机的速率"""
+        self.bucket(url).feedback(status_code, retry_after)
+
+
+_limiter = RateLimiter()
+
+
+def configure_rate_limit(rate=DEFAULT_RATE, min_rate=DEFAULT_MIN_RATE, max_rate=DEFAULT_MAX_RATE, burst=DEFAULT_BURST):
+    """替换共享限速器（已有的主机速率记录会被清空）"""
+    global _limiter
+    _limiter = RateLimiter(rate, min_rate, max_rate, burst)
+
+
+def get_rate_limiter():
+    return _limiter
@@ -0,0 +1,358 @@
+import sys
+import time
+import random
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+from metrics import get_metrics
+
+# 错误类别：超时 / 连接中断 / 被限流（429） / 服务器错误（5xx） / 客户端错误（4xx） / 其他
+ERROR_TIMEOUT = 'timeout'
+ERROR_CONNECTION = 'connection'
+ERROR_THROTTLED = 'throttled'
+ERROR_SERVER = 'server'
+ERROR_CLIENT = 'client'
+ERROR_OTHER = 'other'
+
+ERROR_CLASSES = (ERROR_TIMEOUT, ERROR_CONNECTION, ERROR_THROTTLED, ERROR_SERVER, ERROR_CLIENT, ERROR_OTHER)
+
+# 每类错误的最大尝试次数（含第一次），1 表示不重试
+DEFAULT_ATTEMPTS = {
+    ERROR_TIMEOUT: 4,
+    ERROR_CONNECTION: 4,
+    ERROR_THROTTLED: 5,
+    ERROR_SERVER: 3,
+    ERROR_CLIENT: 1,
+    ERROR_OTHER: 1,
+}
+
+# 指数退避：第 n 次重试前随机等待 [0, min(上限, 基数 * 2^(n-1))] 秒（全抖动，避免多线程同时重试）
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+
+# 熔断器：某主机连续失败多少次后熔断，熔断多少秒后放行一个试探请求
+DEFAULT_FAILURE_THRESHOLD = 10
+DEFAULT_COOLDOWN = 30.0
+
+# 计入熔断的错误类别（429 / 4xx 说明主机还活着，交给限速器处理或直接放弃）
+BREAKER_ERRORS = (ERROR_TIMEOUT, ERROR_CONNECTION, ERROR_SERVER)
+
+# 重试队列条目类型：列表页 / 图片 / 详情页（下载原图的第二阶段）
+RETRY_PAGE = 'page'
+RETRY_IMAGE = 'image'
+RETRY_DETAIL = 'detail'
+
+
+def _status_of(error):
+    """取出 HTTP 错误的状态码：requests 的 HTTPError 带 response，aiohttp 的 ClientResponseError 带 status"""
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None):
+        return response.status_code
+    return getattr(error, 'status', None)
+
+
+def classify_error(error):
+    """把 requests / aiohttp 抛出的异常归入错误类别"""
+    status = _status_of(error)
+    if isinstance(status, int):
+        if status == 429:
+            return ERROR_THROTTLED
+        if status >= 500:
+            return ERROR_SERVER
+        if status >= 400:
+            return ERROR_CLIENT
+
+    # asyncio / aiohttp 只有异步引擎用到：没加载过就不可能抛出它们的异常，不必为此导入
+    asyncio = sys.modules.get('asyncio')
+    aiohttp = sys.modules.get('aiohttp')
+
+    # ConnectTimeout 同时是 ConnectionError，先按超时处理
+    if isinstance(error, (requests.exceptions.Timeout, TimeoutError)):
+        return ERROR_TIMEOUT
+    if asyncio is not None and isinstance(error, asyncio.TimeoutError):
+        return ERROR_TIMEOUT
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                          ConnectionError)):
+        return ERROR_CONNECTION
+    if aiohttp is not None and isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+        return ERROR_CONNECTION
+    return ERROR_OTHER
+
+
+def parse_retry_spec(spec):
+    """
+    解析命令行重试配置，例如 "timeout=5,server=2,client=1"
+    :return: {错误类别: 最大尝试次数}
+    """
+    attempts = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.partition('=')
+        name = name.strip()
+        if not sep or name not in ERROR_CLASSES:
+            raise ValueError(f"invalid retry rule '{part}', expected CLASS=N with CLASS in {', '.join(ERROR_CLASSES)}")
+        try:
+            attempts[name] = int(value)
+        except ValueError:
+            raise ValueError(f"invalid attempt count in '{part}'")
+        if attempts[name] <= 0:
+            raise ValueError(f"attempt count in '{part}' must be greater than 0")
+    return attempts
+
+
+class RetryPolicy:
+    """按错误类别配置最大尝试次数，重试间隔为全抖动指数退避"""
+
+    def __init__(self, attempts=None, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+        self.attempts = dict(DEFAULT_ATTEMPTS)
+        if attempts:
+            self.attempts.update(attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def max_attempts(self, error_class):
+        return max(1, self.attempts.get(error_class, 1))
+
+    def backoff(self, retry_num):
+        """第 retry_num 次重试前需要等待的秒数"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry_num - 1)))
+
+
+class CircuitOpenError(Exception):
+    """主机已熔断，请求未发出"""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"circuit open for {host}, retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class _HostCircuit:
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+
+class CircuitBreaker:
+    """
+    按主机的熔断器
+    连续失败达到阈值后熔断：冷却期内该主机的请求直接失败，不再轰炸已经挂掉的 CDN；
+    冷却结束后放行一个试探请求，成功则恢复，失败则重新熔断；其他主机不受影响
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._circuits = {}
+
+    def _circuit(self, url):
+        host = urlparse(url).netloc
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _HostCircuit()
+        return host, circuit
+
+    def check(self, url):
+        """请求发出前调用：主机熔断中时抛出 CircuitOpenError，冷却结束时放行一个试探请求"""
+        with self._lock:
+            host, circuit = self._circuit(url)
+            if circuit.opened_at is None:
+                return
+            remaining = circuit.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(host, remaining)
+            if circuit.probing:
+                # 试探请求还没有结果，其余请求稍后再来
+                raise CircuitOpenError(host, 1.0)
+            circuit.probing = True
+
+    def remaining(self, url):
+        """距离该主机允许试探还有多少秒，未熔断时为 0"""
+        with self._lock:
+            _, circuit = self._circuit(url)
+            if circuit.opened_at is None:
+                return 0.0
+            return max(0.0, circuit.opened_at + self.cooldown - time.monotonic())
+
+    def wait(self, url):
+        """阻塞到该主机冷却结束"""
+        delay = self.remaining(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def release_probe(self, url):
+        """试探请求被中途放弃（任务取消等）：既不算成功也不算失败，让下一个请求重新试探"""
+        with self._lock:
+            _, circuit = self._circuit(url)
+            circuit.probing = False
+
+    def record_success(self, url):
+        with self._lock:
+            _, circuit = self._circuit(url)
+            circuit.failures = 0
+            circuit.opened_at = None
+            circuit.probing = False
+
+    def record_failure(self, url, error_class):
+        if error_class not in BREAKER_ERRORS:
+            # 主机有响应（例如 404）：说明连接正常，按成功处理
+            self.record_success(url)
+            return
+
+        with self._lock:
+            _, circuit = self._circuit(url)
+            circuit.failures += 1
+            if circuit.probing or circuit.failures >= self.failure_threshold:
+                circuit.opened_at = time.monotonic()
+                circuit.probing = False
+
+
+_policy = RetryPolicy()
+_breaker = CircuitBreaker()
+
+
+def configure_retry(attempts=None, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                    failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN):
+    """
+    替换共享的重试策略与熔断器
+    :param attempts: {错误类别: 最大尝试次数}，未给出的类别沿用默认值
+    """
+    global _policy, _breaker
+    _policy = RetryPolicy(attempts, base_delay, max_delay)
+    _breaker = CircuitBreaker(failure_threshold, cooldown)
+
+
+def get_retry_policy():
+    return _policy
+
+
+def get_circuit_breaker():
+    return _breaker
+
+
+def _next_delay(error, url, attempt, policy, breaker):
+    """记录一次失败；还能重试时返回退避秒数，否则返回 None"""
+    error_class = classify_error(error)
+    get_metrics().inc('errors_total', error_class=error_class)
+    breaker.record_failure(url, error_class)
+    if attempt >= policy.max_attempts(error_class):
+        return None
+    return policy.backoff(attempt)
+
+
+def call_with_retry(func, url, wait_for_circuit=False):
+    """
+    调用 func()，失败时按错误类别重试，主机熔断时抛出 CircuitOpenError
+    :param url: 请求地址，用于按主机熔断
+    :param wait_for_circuit: True 时遇到熔断则等待冷却结束再试（收尾重试队列使用）
+    """
+    policy, breaker = _policy, _breaker
+    attempt = 0
+
+    while True:
+        try:
+            breaker.check(url)
+        except CircuitOpenError as e:
+            if not wait_for_circuit:
+                raise
+            time.sleep(e.retry_in)
+            continue
+
+        attempt += 1
+        try:
+            result = func()
+        except Exception as e:
+            delay = _next_delay(e, url, attempt, policy, breaker)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        except BaseException:
+            breaker.release_probe(url)
+            raise
+
+        breaker.record_success(url)
+        return result
+
+
+async def async_call_with_retry(func, url, wait_for_circuit=False):
+    """call_with_retry 的协程版：func() 返回协程，退避期间不阻塞事件循环"""
+    import asyncio
+
+    policy, breaker = _policy, _breaker
+    attempt = 0
+
+    while True:
+        try:
+            breaker.check(url)
+        except CircuitOpenError as e:
+            if not wait_for_circuit:
+                raise
+            await asyncio.sleep(e.retry_in)
+            continue
+
+        attempt += 1
+        try:
+            result = await func()
+        except Exception as e:
+            delay = _next_delay(e, url, attempt, policy, breaker)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            breaker.release_probe(url)
+            raise
+
+        breaker.record_success(url)
+        return result
+
+
+class RetryItem:
+    """重试队列条目：失败的列表页，或失败的图片 / 详情页（idx 与 referer 用于还原文件名与防盗链头）"""
+
+    def __init__(self, kind, page_num, url, error=None, idx=None, referer=None):
+        self.kind = kind
+        self.page_num = page_num
+        self.url = url
+        self.error = error
+        self.idx = idx
+        self.referer = referer
+
+
+class RetryQueue:
+    """本轮抓取中重试用尽的页面与图片，整轮结束后统一再试一次"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = []
+
+    def add_page(self, page_num, url, error=None):
+        with self._lock:
+            self._items.append(RetryItem(RETRY_PAGE, page_num, url, error))
+
+    def add_image(self, page_num, url, idx, referer, error=None):
+        with self._lock:
+            self._items.append(RetryItem(RETRY_IMAGE, page_num, url, error, idx, referer))
+
+    def add_detail(self, page_num, url, idx, referer, error=None):
+        """失败的详情页：referer 为所在列表页的地址"""
+        with self._lock:
+            self._items.append(RetryItem(RETRY_DETAIL, page_num, url, error, idx, referer))
+
+    def take(self, kind):
+        """取出并移除指定类型的全部条目"""
+        with self._lock:
+            taken = [item for item in self._items if item.kind == kind]
+            self._items = [item for item in self._items if item.kind != kind]
+        return taken
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
@@ -0,0 +1,209 @@
+import os
+import csv
+import json
+import time
+import threading
+from importlib.util import find_spec
+
+from metrics import STAGE_EXPORT, get_metrics
+
+# 输出文件命名方式：
+#   overwrite  固定文件名，每次运行覆盖（JSONL 为追加）
+#   timestamp  文件名带运行时间戳，每次运行一个新文件
+#   partition  按日期分区目录：<数据集>/date=YYYY-MM-DD/<数据集>_HHMMSS.<扩展名>
+NAMING_MODES = ('overwrite', 'timestamp', 'partition')
+
+DEFAULT_FORMATS = ('excel',)
+DEFAULT_OUTPUT_DIR = '.'
+DEFAULT_NAMING = 'overwrite'
+
+
+def _has_module(name):
+    # 只查找不导入：pyarrow 很大，只在真正写 Parquet 时加载
+    try:
+        return find_spec(name) is not None
+    except ImportError:
+        return False
+
+
+def _atomic_replace(tmp_path, path):
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _truncated(records, truncate):
+    """渲染时截断过长的列（例如摘要），不修改原记录"""
+    for record in records:
+        record = dict(record)
+        for name, limit in truncate.items():
+            value = record.get(name)
+            if isinstance(value, str) and len(value) > limit:
+                record[name] = value[:limit] + "..."
+        yield record
+
+
+class ExcelSink:
+    """带排版的 Excel 报表（单次流式写出），供人阅读，长文本列按 truncate 截断"""
+
+    name = 'excel'
+    ext = 'xlsx'
+
+    def write(self, path, records, column_widths, run_time, truncate=None):
+        # openpyxl 在第一次导出时才加载，不拖慢启动
+        from excel_writer import write_excel
+
+        write_excel(path, _truncated(records, truncate) if truncate else records, column_widths)
+
+
+class CsvSink:
+    """CSV（UTF-8 带 BOM，Excel 直接打开中文不乱码）"""
+
+    name = 'csv'
+    ext = 'csv'
+
+    def write(self, path, records, column_widths, run_time, truncate=None):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(column_widths), extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(records)
+        _atomic_replace(tmp_path, path)
+
+
+class JsonlSink:
+    """
+    追加写入的 JSON Lines：每条记录一行，附带本次运行时间 scraped_at，
+    多次运行写入同一文件时可按时间区分
+    """
+
+    name = 'jsonl'
+    ext = 'jsonl'
+
+    def write(self, path, records, column_widths, run_time, truncate=None):
+        scraped_at = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(run_time))
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps({**record, 'scraped_at': scraped_at}, ensure_ascii=False) + '\n')
+
+
+class ParquetSink:
+    """Parquet 列式存储（需要 pyarrow），下游分析读取远快于 xlsx"""
+
+    name = 'parquet'
+    ext = 'parquet'
+
+    def write(self, path, records, column_widths, run_time, truncate=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = list(column_widths)
+        table = pa.Table.from_pylist([{name: record.get(name) for name in columns} for record in records])
+        tmp_path = path + '.tmp'
+        pq.write_table(table, tmp_path, compression='zstd')
+        _atomic_replace(tmp_path, path)
+
+
+SINKS = {
+    'excel': ExcelSink,
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'parquet': ParquetSink,
+}
+
+# 输出格式依赖的可选模块
+SINK_REQUIREMENTS = {
+    'parquet': 'pyarrow',
+}
+
+_lock = threading.Lock()
+_config = {
+    'formats': DEFAULT_FORMATS,
+    'output_dir': DEFAULT_OUTPUT_DIR,
+    'naming': DEFAULT_NAMING,
+}
+
+
+def configure_sinks(formats=None, output_dir=None, naming=None):
+    """
+    设置情报任务的输出格式与命名方式
+    :param formats: 输出格式序列，可选 excel / csv / jsonl / parquet
+    :param output_dir: 输出目录
+    :param naming: 命名方式，见 NAMING_MODES
+    """
+    if formats is not None:
+        formats = tuple(dict.fromkeys(formats))
+        if not formats:
+            raise ValueError("至少需要一种输出格式")
+        for name in formats:
+            if name not in SINKS:
+                raise ValueError(f"未知的输出格式: {name}，可选: {', '.join(SINKS)}")
+            module = SINK_REQUIREMENTS.get(name)
+            if module and not _has_module(module):
+                raise ValueError(f"输出格式 {name} 需要安装 {module}: pip install {module}")
+    if naming is not None and naming not in NAMING_MODES:
+        raise ValueError(f"未知的命名方式: {naming}，可选: {', '.join(NAMING_MODES)}")
+
+    with _lock:
+        if formats is not None:
+            _config['formats'] = formats
+        if output_dir is not None:
+            _config['output_dir'] = output_dir
+        if naming is not None:
+            _config['naming'] = naming
+
+
+def get_output_dir():
+    with _lock:
+        return _config['output_dir']
+
+
+def output_path(dataset, ext, output_dir=DEFAULT_OUTPUT_DIR, naming=DEFAULT_NAMING, run_time=None):
+    """按命名方式生成输出路径（自动创建目录）"""
+    run_time = time.time() if run_time is None else run_time
+    stamp = time.localtime(run_time)
+
+    if naming == 'timestamp':
+        path = os.path.join(output_dir, f"{dataset}_{time.strftime('%Y%m%d-%H%M%S', stamp)}.{ext}")
+    elif naming == 'partition':
+        path = os.path.join(
+            output_dir, dataset, f"date={time.strftime('%Y-%m-%d', stamp)}",
+            f"{dataset}_{time.strftime('%H%M%S', stamp)}.{ext}"
+        )
+    else:
+        path = os.path.join(output_dir, f"{dataset}.{ext}")
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    return path
+
+
+def export(dataset, records, column_widths, truncate=None):
+    """
+    把一批记录写入所有已配置的输出格式
+    :param dataset: 数据集名称，用作文件名前缀
+    :param records: 字典列表
+    :param column_widths: 字典，键为列名（决定列顺序），值为 Excel 列宽
+    :param truncate: 字典，键为列名，值为最大字符数；只在渲染给人看的 Excel 中截断，数据文件保留全文
+    :return: 写出的文件路径列表
+    """
+    with _lock:
+        formats, output_dir, naming = _config['formats'], _config['output_dir'], _config['naming']
+
+    metrics = get_metrics()
+    run_time = time.time()
+    paths = []
+    for name in formats:
+        sink = SINKS[name]()
+        path = output_path(dataset, sink.ext, output_dir, naming, run_time)
+        with metrics.timer(STAGE_EXPORT):
+            sink.write(path, records, column_widths, run_time, truncate=truncate)
+        if os.path.exists(path):
+            metrics.inc('bytes_total', os.path.getsize(path), kind=f'export_{name}')
+        paths.append(path)
+    metrics.inc('records_total', len(records), dataset=dataset)
+    return paths
@@ -0,0 +1,104 @@
+import pytest
+
+from crawl_journal import (IMAGE_DONE, IMAGE_FAILED, IMAGE_SKIPPED, PAGE_DONE, PAGE_FAILED, PAGE_PARTIAL,
+                           PAGE_PENDING, CrawlJournal)
+
+START = 'http://s.com/gallery/1'
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = CrawlJournal(str(tmp_path), START)
+    yield journal
+    journal.close()
+
+
+def page_url(page_num):
+    return f'http://s.com/gallery/{page_num}'
+
+
+def test_unknown_page_cannot_be_skipped(journal):
+    assert journal.get_page(1) is None
+    assert journal.can_skip_page(1, 3) == (False, None)
+
+
+def test_next_url_recorded_before_page_status(journal):
+    # 流水线模式：预取线程先记下一页链接，页面下载完才写状态
+    journal.record_next_url(1, page_url(1), page_url(2))
+    assert journal.get_page(1) == {'url': page_url(1), 'next_url': page_url(2), 'status': PAGE_PENDING}
+    assert journal.can_skip_page(1, 3) == (False, None)
+
+    journal.record_page(1, page_url(1), PAGE_DONE)
+    assert journal.get_page(1)['next_url'] == page_url(2)
+    assert journal.can_skip_page(1, 3) == (True, page_url(2))
+
+
+@pytest.mark.parametrize('status', [PAGE_PARTIAL, PAGE_FAILED, PAGE_PENDING])
+def test_unfinished_page_is_not_skipped(journal, status):
+    journal.record_next_url(1, page_url(1), page_url(2))
+    journal.record_page(1, page_url(1), status)
+    assert journal.can_skip_page(1, 3) == (False, None)
+
+
+def test_done_page_without_next_url(journal):
+    journal.record_page(2, page_url(2), PAGE_DONE)
+    # 不是最后一页：不知道下一页在哪，只能重新抓取
+    assert journal.can_skip_page(2, 3) == (False, None)
+    # 最后一页不需要下一页链接
+    assert journal.can_skip_page(2, 2) == (True, None)
+
+
+def test_resume_walks_recorded_pages(tmp_path):
+    journal = CrawlJournal(str(tmp_path), START)
+    for page_num in (1, 2):
+        journal.record_next_url(page_num, page_url(page_num), page_url(page_num + 1))
+        journal.record_page(page_num, page_url(page_num), PAGE_DONE)
+    journal.record_page(3, page_url(3), PAGE_PARTIAL)
+    journal.close()
+
+    resumed = CrawlJournal(str(tmp_path), START, resume=True)
+    try:
+        url, page_num, skipped = START, 1, []
+        while True:
+            skip, next_url = resumed.can_skip_page(page_num, 5)
+            if not skip:
+                break
+            skipped.append(url)
+            url, page_num = next_url, page_num + 1
+        assert skipped == [page_url(1), page_url(2)]
+        assert (page_num, url) == (3, page_url(3))
+    finally:
+        resumed.close()
+
+
+def test_fresh_run_clears_only_its_own_records(tmp_path):
+    other_start = 'http://other.com/list'
+    journal = CrawlJournal(str(tmp_path), START)
+    other = CrawlJournal(str(tmp_path), other_start)
+    journal.record_page(1, page_url(1), PAGE_DONE)
+    other.record_page(1, other_start, PAGE_DONE)
+    journal.close()
+    other.close()
+
+    restarted = CrawlJournal(str(tmp_path), START, resume=False)
+    other = CrawlJournal(str(tmp_path), other_start, resume=True)
+    try:
+        assert restarted.get_page(1) is None
+        assert other.get_page(1)['status'] == PAGE_DONE
+    finally:
+        restarted.close()
+        other.close()
+
+
+def test_done_images(journal):
+    journal.record_image(1, 'http://s.com/a.jpg', 'page1_a.jpg', IMAGE_DONE)
+    journal.record_image(1, 'http://s.com/b.jpg', None, IMAGE_SKIPPED, 'size 10 < 100 bytes')
+    journal.record_image(1, 'http://s.com/c.jpg', None, IMAGE_FAILED, 'timeout')
+    journal.record_image(2, 'http://s.com/d.jpg', 'page2_d.jpg', IMAGE_DONE)
+
+    assert journal.done_images(1) == {'http://s.com/a.jpg': IMAGE_DONE, 'http://s.com/b.jpg': IMAGE_SKIPPED}
+    assert journal.done_images(3) == {}
+
+    # 重试成功后覆盖失败记录
+    journal.record_image(1, 'http://s.com/c.jpg', 'page1_c.jpg', IMAGE_DONE)
+    assert journal.done_images(1)['http://s.com/c.jpg'] == IMAGE_DONE
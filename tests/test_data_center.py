@@ -0,0 +1,36 @@
+import pytest
+
+from data_center import parse_price
+
+
+@pytest.mark.parametrize('text, expected', [
+    # 美式：逗号千分位、点小数
+    ('$19.99', 19.99),
+    ('$1,234.56', 1234.56),
+    ('$1,234,567.5', 1234567.5),
+    # 欧元区：点或空格千分位、逗号小数
+    ('19,99€', 19.99),
+    ('12,5€', 12.5),
+    ('1.234,56€', 1234.56),
+    ('1 234,56 €', 1234.56),
+    ('1 234,56 €', 1234.56),
+    ('1 299,00 €', 1299.0),
+    # 巴西：点千分位、逗号小数
+    ('R$ 59,90', 59.9),
+    ('R$ 1.234,56', 1234.56),
+    ('R$ 1.234', 1234.0),
+    # 韩元 / 日元：没有小数，逗号千分位
+    ('₩ 12,000', 12000.0),
+    ('₩1,234,567', 1234567.0),
+    ('¥ 1,980', 1980.0),
+    ('¥1980', 1980.0),
+    # 卢布：空格千分位，货币缩写带点
+    ('1 299 pуб.', 1299.0),
+    ('Free', 0.0),
+    ('免费开玩', 0.0),
+    ('', None),
+    (None, None),
+    ('N/A', None),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
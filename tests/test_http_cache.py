@@ -0,0 +1,151 @@
+import os
+from datetime import timedelta
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_cache
+from http_cache import HttpCache
+
+URL = 'http://s.com/list?page=1'
+
+
+def make_response(status, body=b'', headers=None, url=URL):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.url = url
+    response.elapsed = timedelta(0)
+    return response
+
+
+class StubSession:
+    """按顺序返回预设响应，并记录每次请求携带的请求头"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.sent.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1.0
+        return self.now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HttpCache(str(tmp_path / 'cache'))
+
+
+def test_revalidates_with_etag_and_serves_304_from_cache(cache):
+    session = StubSession(
+        make_response(200, b'<html>v1</html>', {'ETag': '"v1"', 'Content-Type': 'text/html; charset=utf-8'}),
+        make_response(304, headers={'ETag': '"v1"'}),
+    )
+    first = cache.get(session, URL, timeout=5)
+    second = cache.get(session, URL, timeout=5)
+
+    assert session.sent[0] == {}
+    assert session.sent[1] == {'If-None-Match': '"v1"'}
+    assert first.content == second.content == b'<html>v1</html>'
+    assert second.status_code == 200
+    assert second.from_cache
+    assert second.headers['Content-Type'] == 'text/html; charset=utf-8'
+    assert second.encoding == 'utf-8'
+
+
+def test_304_updates_stored_validators(cache):
+    session = StubSession(
+        make_response(200, b'body', {'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}),
+        make_response(304, headers={'ETag': '"v2"'}),
+    )
+    cache.get(session, URL)
+    assert cache.validators(URL) == {'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+    cache.get(session, URL)
+    assert cache.validators(URL) == {'If-None-Match': '"v2"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+
+def test_responses_without_validators_are_not_cached(cache):
+    session = StubSession(make_response(200, b'body'), make_response(200, b'body'))
+    cache.get(session, URL)
+    cache.get(session, URL)
+    assert session.sent == [{}, {}]
+    assert cache.validators(URL) == {}
+
+
+def test_error_responses_are_not_cached(cache):
+    cache.get(StubSession(make_response(500, b'oops', {'ETag': '"e"'})), URL)
+    assert cache.validators(URL) == {}
+
+
+def test_304_with_missing_body_refetches_without_validators(cache, tmp_path):
+    session = StubSession(
+        make_response(200, b'v1', {'ETag': '"v1"'}),
+        make_response(304),
+        make_response(200, b'v2', {'ETag': '"v2"'}),
+    )
+    cache.get(session, URL)
+    for name in os.listdir(tmp_path / 'cache'):
+        if name.endswith('.body'):
+            os.unlink(tmp_path / 'cache' / name)
+
+    response = cache.get(session, URL)
+    assert response.content == b'v2'
+    assert session.sent[2] == {}
+
+
+def test_refetch_after_missing_body_is_cached_again(cache, tmp_path):
+    session = StubSession(
+        make_response(200, b'v1', {'ETag': '"v1"'}),
+        make_response(304),
+        make_response(200, b'v2', {'ETag': '"v2"'}),
+        make_response(304),
+    )
+    cache.get(session, URL)
+    for name in os.listdir(tmp_path / 'cache'):
+        if name.endswith('.body'):
+            os.unlink(tmp_path / 'cache' / name)
+    cache.get(session, URL)
+
+    assert cache.validators(URL) == {'If-None-Match': '"v2"'}
+    response = cache.get(session, URL)
+    assert session.sent[3] == {'If-None-Match': '"v2"'}
+    assert response.status_code == 200
+    assert response.content == b'v2'
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache.time, 'time', FakeTime().time)
+    cache = HttpCache(str(tmp_path / 'cache'), max_bytes=25)
+    urls = [f'http://s.com/{name}' for name in 'abc']
+
+    cache.put(urls[0], {'ETag': '"a"'}, b'a' * 10)
+    cache.put(urls[1], {'ETag': '"b"'}, b'b' * 10)
+    # 读取 a 之后 b 成为最久未访问的条目
+    assert cache.load(urls[0])[0] == b'a' * 10
+    cache.put(urls[2], {'ETag': '"c"'}, b'c' * 10)
+
+    assert cache.validators(urls[0]) == {'If-None-Match': '"a"'}
+    assert cache.validators(urls[1]) == {}
+    assert cache.validators(urls[2]) == {'If-None-Match': '"c"'}
+    assert len(os.listdir(tmp_path / 'cache')) == 4
+
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    HttpCache(cache_dir).put(URL, {'ETag': '"v1"'}, b'body')
+
+    reopened = HttpCache(cache_dir)
+    assert reopened.validators(URL) == {'If-None-Match': '"v1"'}
+    assert reopened.load(URL) == (b'body', {'ETag': '"v1"'})
@@ -0,0 +1,106 @@
+import pytest
+
+from image_filter import PICTURE_SRCSET, ImageFilter, ImageRejected, parse_filter_spec, parse_srcset
+
+BASE = 'http://s.com/p/'
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('a.jpg 1x, b.jpg 2x', [('a.jpg', None, 1.0), ('b.jpg', None, 2.0)]),
+    (' a.jpg 1.5x ,b.jpg', [('a.jpg', None, 1.5), ('b.jpg', None, None)]),
+    ('a.jpg 480w, b.jpg 800w', [('a.jpg', 480, None), ('b.jpg', 800, None)]),
+    ('a.jpg', [('a.jpg', None, None)]),
+    ('a.jpg, b.jpg', [('a.jpg', None, None), ('b.jpg', None, None)]),
+    ('a.jpg foo', [('a.jpg', None, None)]),
+    # 地址本身带逗号（CDN 变换参数、data: URI）时不能按逗号切分
+    ('https://x/img,w_100/a.jpg 1x, https://x/img,w_200/a.jpg 2x',
+     [('https://x/img,w_100/a.jpg', None, 1.0), ('https://x/img,w_200/a.jpg', None, 2.0)]),
+    ('data:image/png;base64,AA,BB= 1x, b.jpg 2x', [('data:image/png;base64,AA,BB=', None, 1.0), ('b.jpg', None, 2.0)]),
+    ('', []),
+    (None, []),
+])
+def test_parse_srcset(value, expected):
+    assert parse_srcset(value) == expected
+
+
+@pytest.mark.parametrize('image_filter, attrs, expected', [
+    (ImageFilter(), {'src': 'a.jpg'}, ('http://s.com/p/a.jpg', None)),
+    (ImageFilter(), {'src': 'a.jpg', 'srcset': 's.jpg 480w, l.jpg 1600w'}, ('http://s.com/p/l.jpg', None)),
+    (ImageFilter(), {'src': 'a.jpg', 'srcset': 'b.jpg 2x'}, ('http://s.com/p/b.jpg', None)),
+    (ImageFilter(), {'src': 'a.jpg', PICTURE_SRCSET: 'p.avif 1200w'}, ('http://s.com/p/p.avif', None)),
+    # 懒加载：src 是 data: 占位图，真实地址在 data-src
+    (ImageFilter(), {'src': 'data:image/gif;base64,R0', 'data-src': '/real.jpg'}, ('http://s.com/real.jpg', None)),
+    (ImageFilter(), {'alt': 'no source'}, (None, None)),
+    (ImageFilter(min_width=800), {'src': 'a.jpg', 'width': '100'}, (None, 'width 100 < 800')),
+    (ImageFilter(min_width=800), {'src': 'a.jpg', 'width': '100', 'srcset': 'big.jpg 1600w'},
+     ('http://s.com/p/big.jpg', None)),
+    (ImageFilter(min_width=800), {'src': 'a.jpg', 'width': '500', 'srcset': 'b.jpg 2x'},
+     ('http://s.com/p/b.jpg', None)),
+    # 没有声明尺寸时无从判断，不按尺寸过滤
+    (ImageFilter(min_width=800), {'src': 'a.jpg'}, ('http://s.com/p/a.jpg', None)),
+    (ImageFilter(min_height=500), {'src': 'a.jpg', 'width': '400', 'height': '300', 'srcset': 'b.jpg 800w'},
+     ('http://s.com/p/b.jpg', None)),
+    (ImageFilter(min_height=500), {'src': 'a.jpg', 'width': '400', 'height': '300'}, (None, 'height 300 < 500')),
+    (ImageFilter(exclude=['/icons/']), {'src': '/icons/x.png'}, (None, "excluded by '/icons/'")),
+    (ImageFilter(include=['/uploads/']), {'src': 'x.jpg'}, (None, 'not matched by include rules')),
+    (ImageFilter(mime_types=['image/png']), {'src': 'x.jpg'}, (None, 'type image/jpeg not allowed')),
+    # 扩展名推断不出类型时留到响应头再判断
+    (ImageFilter(mime_types=['image/png']), {'src': 'x.php?id=1'}, ('http://s.com/p/x.php?id=1', None)),
+])
+def test_select(image_filter, attrs, expected):
+    assert image_filter.select(attrs, BASE) == expected
+
+
+def test_select_urls_keeps_order_and_counts_filtered():
+    images = [{'src': 'b.jpg'}, {'src': 'a.jpg'}, {'src': 'b.jpg'}, {'src': '/icons/x.png'}, {'alt': 'x'}]
+    urls, filtered = ImageFilter(exclude=['/icons/']).select_urls(images, BASE)
+    assert urls == ['http://s.com/p/b.jpg', 'http://s.com/p/a.jpg']
+    assert filtered == 1
+
+
+def test_check_headers_and_size():
+    image_filter = ImageFilter(min_bytes=100, max_bytes=1000, mime_types=['image/jpeg'])
+    image_filter.check_headers({'Content-Length': '500', 'Content-Type': 'image/jpeg; charset=binary'})
+    with pytest.raises(ImageRejected):
+        image_filter.check_headers({'Content-Length': '50'})
+    with pytest.raises(ImageRejected):
+        image_filter.check_headers({'Content-Type': 'image/png'})
+    # 没有 Content-Length 时边下边查：途中只检查上限，写完才检查下限
+    image_filter.check_size(50)
+    with pytest.raises(ImageRejected):
+        image_filter.check_size(1001)
+    with pytest.raises(ImageRejected):
+        image_filter.check_size(50, complete=True)
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('', {}),
+    ('min-size=50k,min-width=800,types=jpg|png,exclude=qqonline|/icons/',
+     {'min_bytes': 51200, 'min_width': 800, 'mime_types': ['image/jpeg', 'image/png'],
+      'exclude': ['qqonline|/icons/']}),
+    ('max-size=2.5M, min-height=600,', {'max_bytes': 2621440, 'min_height': 600}),
+    # 逗号后面不是"规则名="时属于正则本身
+    (r'include=/\d{1,3}\.jpg$,min-size=5k', {'include': [r'/\d{1,3}\.jpg$'], 'min_bytes': 5120}),
+    ('exclude=a{1,2},exclude=b', {'exclude': ['a{1,2}', 'b']}),
+    # 多次传入 --filter 时合并解析
+    (['exclude=a', 'exclude=b,types=webp'], {'exclude': ['a', 'b'], 'mime_types': ['image/webp']}),
+    (['min-size=1k', 'min-size=2k'], {'min_bytes': 2048}),
+])
+def test_parse_filter_spec(spec, expected):
+    assert parse_filter_spec(spec) == expected
+
+
+@pytest.mark.parametrize('spec', [
+    'bogus=1',
+    'min-size',
+    'min-size=',
+    'min-size=abc',
+    'min-size=5q',
+    'min-width=wide',
+    'include=(',
+    'min-size=2M,max-size=1M',
+    'foo,min-size=5k',
+])
+def test_parse_filter_spec_rejects_bad_input(spec):
+    with pytest.raises(ValueError):
+        parse_filter_spec(spec)
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+import profiling
+from profiling import RunProfiler
+
+
+def busy_worker():
+    return sum(range(10000))
+
+
+def run_threads(count=3):
+    threads = [threading.Thread(target=busy_worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def profiled_functions(profiler):
+    stats, threads = profiler.stats()
+    return {name for _, _, name in stats.stats}, threads
+
+
+@pytest.mark.skipif(not profiling.PER_THREAD_PROFILING, reason='Python 3.12+ profiles the main thread only')
+def test_worker_threads_are_profiled_and_merged(tmp_path):
+    original_run = threading.Thread.run
+    with RunProfiler(str(tmp_path / 'run')) as profiler:
+        run_threads()
+
+    assert threading.Thread.run is original_run
+    names, threads = profiled_functions(profiler)
+    assert 'busy_worker' in names
+    assert threads == 3
+    assert (tmp_path / 'run.prof').exists()
+
+
+def test_main_thread_only_fallback(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PER_THREAD_PROFILING', False)
+    original_run = threading.Thread.run
+    with RunProfiler(str(tmp_path / 'run')) as profiler:
+        run_threads()
+        busy_worker()
+
+    assert threading.Thread.run is original_run
+    names, threads = profiled_functions(profiler)
+    assert 'busy_worker' in names
+    assert threads == 0
+    assert 'main thread only' in (tmp_path / 'run.txt').read_text(encoding='utf-8')
@@ -0,0 +1,172 @@
+import asyncio
+
+import pytest
+
+import retry_policy
+from job_scheduler import JobCancelled
+from retry_policy import (ERROR_CLIENT, ERROR_SERVER, ERROR_TIMEOUT, CircuitBreaker, CircuitOpenError,
+                          async_call_with_retry, call_with_retry, parse_retry_spec)
+
+URL = 'http://cdn.example.com/a.jpg'
+OTHER_URL = 'http://other.example.com/b.jpg'
+
+
+class FakeClock:
+    """替换 retry_policy 里的 time.monotonic，冷却期不用真的等待"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(retry_policy.time, 'monotonic', fake.monotonic)
+    return fake
+
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    """阈值 3、冷却 10 秒的熔断器，同时作为 call_with_retry 使用的共享熔断器"""
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=10.0)
+    monkeypatch.setattr(retry_policy, '_breaker', breaker)
+    return breaker
+
+
+def trip(breaker, url=URL):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(url, ERROR_TIMEOUT)
+
+
+def test_breaker_stays_closed_below_threshold(breaker):
+    breaker.record_failure(URL, ERROR_TIMEOUT)
+    breaker.record_failure(URL, ERROR_SERVER)
+    breaker.check(URL)
+    assert breaker.remaining(URL) == 0.0
+
+
+def test_breaker_opens_after_threshold(breaker):
+    trip(breaker)
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.check(URL)
+    assert info.value.host == 'cdn.example.com'
+    assert info.value.retry_in == pytest.approx(10.0)
+    # 其他主机不受影响
+    breaker.check(OTHER_URL)
+
+
+def test_client_error_resets_failure_count(breaker):
+    breaker.record_failure(URL, ERROR_TIMEOUT)
+    breaker.record_failure(URL, ERROR_TIMEOUT)
+    breaker.record_failure(URL, ERROR_CLIENT)
+    breaker.record_failure(URL, ERROR_TIMEOUT)
+    breaker.check(URL)
+
+
+def test_single_probe_after_cooldown(breaker, clock):
+    trip(breaker)
+    clock.advance(9.0)
+    with pytest.raises(CircuitOpenError):
+        breaker.check(URL)
+
+    clock.advance(1.0)
+    breaker.check(URL)
+    # 试探请求还没有结果时，其余请求仍被拒绝
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.check(URL)
+    assert info.value.retry_in == 1.0
+
+
+def test_successful_probe_closes_breaker(breaker, clock):
+    trip(breaker)
+    clock.advance(10.0)
+    breaker.check(URL)
+    breaker.record_success(URL)
+    breaker.check(URL)
+    breaker.check(URL)
+
+
+def test_failed_probe_reopens_breaker(breaker, clock):
+    trip(breaker)
+    clock.advance(10.0)
+    breaker.check(URL)
+
+    # 试探失败一次就重新熔断，不必再累计到阈值
+    breaker.record_failure(URL, ERROR_TIMEOUT)
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.check(URL)
+    assert info.value.retry_in == pytest.approx(10.0)
+
+
+def test_release_probe_lets_next_request_probe(breaker, clock):
+    trip(breaker)
+    clock.advance(10.0)
+    breaker.check(URL)
+    breaker.release_probe(URL)
+    breaker.check(URL)
+
+
+def test_call_with_retry_releases_probe_on_cancellation(breaker, clock):
+    trip(breaker)
+    clock.advance(10.0)
+
+    def cancelled():
+        raise JobCancelled()
+
+    with pytest.raises(JobCancelled):
+        call_with_retry(cancelled, URL)
+    # 被取消的试探既不算成功也不算失败：下一个请求可以重新试探
+    assert call_with_retry(lambda: 'ok', URL) == 'ok'
+    breaker.check(URL)
+
+
+def test_async_call_with_retry_releases_probe_on_cancellation(breaker, clock):
+    trip(breaker)
+    clock.advance(10.0)
+
+    async def cancelled():
+        raise asyncio.CancelledError()
+
+    async def ok():
+        return 'ok'
+
+    async def run():
+        with pytest.raises(asyncio.CancelledError):
+            await async_call_with_retry(cancelled, URL)
+        return await async_call_with_retry(ok, URL)
+
+    assert asyncio.run(run()) == 'ok'
+
+
+def test_call_with_retry_raises_while_circuit_open(breaker):
+    trip(breaker)
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(lambda: calls.append(1), URL)
+    assert calls == []
+
+
+def test_parse_retry_spec():
+    assert parse_retry_spec('timeout=5, server=2,client=1,') == {'timeout': 5, 'server': 2, 'client': 1}
+    assert parse_retry_spec('') == {}
+
+
+@pytest.mark.parametrize('spec', [
+    'timeout',
+    'timeout=',
+    'timeout=x',
+    'timeout=1.5',
+    'timeout=0',
+    'timeout=-1',
+    'unknown=3',
+    '=3',
+])
+def test_parse_retry_spec_rejects_bad_input(spec):
+    with pytest.raises(ValueError):
+        parse_retry_spec(spec)